@@ -0,0 +1,93 @@
+"""
+Access pipeline for MedTrust AI
+Overlaps the independent Firestore round trips of an access decision:
+the patient read and trust read run in parallel, and the access log and
+trust score writes are deferred off the request path. Deferred writes that
+are still queued when the process exits are finished by drain() (atexit).
+"""
+
+import atexit
+from concurrent.futures import ThreadPoolExecutor
+
+from firebase_init import db, firebase_admin_initialized
+from helpers import patient_doc_id
+from trust_logic import get_trust_score, update_trust_score, safe_log_access
+from encryption import decrypt_sensitive_data
+
+# ---------- CONFIGURATION ----------
+ACCESS_READ_WORKERS = 16
+ACCESS_WRITE_WORKERS = 4
+
+PATIENT_SENSITIVE_FIELDS = ["diagnosis", "treatment", "notes"]
+
+_read_pool = ThreadPoolExecutor(max_workers=ACCESS_READ_WORKERS, thread_name_prefix="access-read")
+_write_pool = ThreadPoolExecutor(max_workers=ACCESS_WRITE_WORKERS, thread_name_prefix="access-write")
+# Trust updates are read-modify-write; one thread keeps them from overwriting each other
+_trust_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="trust-write")
+
+
+def fetch_patient(pid):
+    """Single point read of patients/<pid>; returns the raw (still encrypted) dict or None"""
+    if not pid or not firebase_admin_initialized:
+        return None
+    pdoc = db.collection("patients").document(pid).get()
+    return pdoc.to_dict() if pdoc.exists else None
+
+
+class AccessPrefetch:
+    """
+    Starts the reads an access decision may need as soon as the request arrives.
+    Results are collected lazily, so a branch that never needs one only pays for
+    it in a background thread.
+    """
+
+    def __init__(self, name=None, patient_name=None, fetch_trust=True, fetch_patient_doc=True):
+        self.name = name
+        self.pid = patient_doc_id(patient_name) if patient_name else None
+        self._trust = _read_pool.submit(get_trust_score, name) if fetch_trust else None
+        self._patient = _read_pool.submit(fetch_patient, self.pid) if (fetch_patient_doc and self.pid) else None
+
+    def trust_score(self):
+        return self._trust.result() if self._trust else get_trust_score(self.name)
+
+    def raw_patient(self):
+        return self._patient.result() if self._patient else None
+
+    def patient(self):
+        """Patient dict with sensitive fields decrypted, or None if not found"""
+        patient_info = self.raw_patient()
+        if not patient_info:
+            return None
+        return decrypt_sensitive_data(patient_info, PATIENT_SENSITIVE_FIELDS)
+
+    @property
+    def pdf_link(self):
+        return f"/generate_patient_pdf/{self.pid}" if self.pid else None
+
+
+def _log_errors(future):
+    error = future.exception()
+    if error:
+        print(f"⚠️ Deferred access write failed (non-fatal): {error}")
+
+
+def defer_write(fn, *args, **kwargs):
+    """Run a non-critical Firestore write off the request path"""
+    _write_pool.submit(fn, *args, **kwargs).add_done_callback(_log_errors)
+
+
+def record_decision(log_data, name, trust_delta, flag_priority=None):
+    """Queue the access log write (and review queue entry if flagged) and the trust score update for a decision"""
+    if log_data is not None:
+        defer_write(safe_log_access, log_data, None, flag_priority)
+    if name and trust_delta:
+        _trust_pool.submit(update_trust_score, name, trust_delta).add_done_callback(_log_errors)
+
+
+def drain():
+    """Wait for every queued log and trust write; the decisions were already answered, so they must not be dropped"""
+    for pool in (_write_pool, _trust_pool):
+        pool.shutdown(wait=True)
+
+
+atexit.register(drain)
@@ -0,0 +1,227 @@
+"""
+Admin background jobs for MedTrust AI
+Firestore maintenance tasks registered with the job runner (see jobs.py).
+Each one pages through a collection by document id and checkpoints the last
+id it finished, so an interrupted run resumes where it stopped.
+"""
+
+from datetime import datetime, timedelta
+
+from firebase_init import db, firebase_admin_initialized
+from helpers import iter_document_pages
+from encryption import encrypt_string
+from jobs import register_job
+import patient_index
+import response_cache
+import log_store
+import patient_timeline
+from log_archive import log_archive, LOG_ARCHIVE_AFTER_DAYS
+
+# ---------- CONFIGURATION ----------
+PATIENT_SENSITIVE_FIELDS = ["diagnosis", "treatment", "notes"]
+FERNET_PREFIX = "gAAAAA"
+BATCH_LIMIT = 500  # Firestore batch write limit
+# Per-role copies written before log_store day buckets: (collection, role, name field)
+LEGACY_CLINICIAN_LOGS = [(name, role, field) for role, (name, field) in log_store.LEGACY_CLINICIAN_LOGS.items()]
+
+
+def _require_firebase():
+    if not firebase_admin_initialized:
+        raise RuntimeError("Firebase is not initialized")
+
+
+@register_job("encrypt_legacy_patients")
+def encrypt_legacy_patients(ctx, page_size=200):
+    """Encrypt sensitive patient fields still stored as plain text"""
+    _require_firebase()
+    patients = db.collection("patients")
+    if ctx.total is None:
+        ctx.set_total(patients.count().get()[0][0].value)
+
+    encrypted = ctx.checkpoint.get("encrypted", 0)
+    for page in iter_document_pages(patients, page_size, ctx.checkpoint.get("last_doc_id")):
+        batch, writes = db.batch(), 0
+        for doc in page:
+            p = doc.to_dict()
+            updates = {
+                field: encrypt_string(p[field])
+                for field in PATIENT_SENSITIVE_FIELDS
+                if isinstance(p.get(field), str) and p[field] and p[field] != "—"
+                and not p[field].startswith(FERNET_PREFIX)
+            }
+            if updates:
+                batch.update(doc.reference, updates)
+                writes += 1
+        if writes:
+            batch.commit()
+            response_cache.invalidate("patients")
+        encrypted += writes
+        ctx.advance(len(page))
+        ctx.save_checkpoint({"last_doc_id": page[-1].id, "encrypted": encrypted})
+        ctx.check_cancelled()
+
+
+@register_job("rebuild_patient_index")
+def rebuild_patient_index(ctx):
+    """Rebuild the patient_index lookup documents (see patient_index.py)"""
+    _require_firebase()
+    ctx.set_total(patient_index.rebuild())
+    ctx.advance(ctx.total)
+
+
+@register_job("backfill_clinician_logs")
+def backfill_clinician_logs(ctx, page_size=BATCH_LIMIT):
+    """Copy the legacy DoctorAccessLog / NurseAccessLog entries into clinician day buckets"""
+    _require_firebase()
+    if ctx.total is None:
+        ctx.set_total(sum(db.collection(name).count().get()[0][0].value for name, _, _ in LEGACY_CLINICIAN_LOGS))
+
+    copied = ctx.checkpoint.get("copied", 0)
+    for i in range(ctx.checkpoint.get("source", 0), len(LEGACY_CLINICIAN_LOGS)):
+        name, role, name_field = LEGACY_CLINICIAN_LOGS[i]
+        start_after = ctx.checkpoint.get("last_doc_id") if ctx.checkpoint.get("source", 0) == i else None
+        for page in iter_document_pages(db.collection(name), page_size, start_after):
+            batch = db.batch()
+            events = []
+            for doc in page:
+                log = doc.to_dict()
+                events.append((doc.id, log, role, log.get(name_field)))
+            # Bucket entries are keyed by log id, so replaying a page is harmless
+            staged = log_store.stage_events(batch, events)
+            if staged:
+                batch.commit()
+            copied += staged
+            ctx.advance(len(page))
+            ctx.save_checkpoint({"source": i, "last_doc_id": page[-1].id, "copied": copied})
+            ctx.check_cancelled()
+        # Readers stop merging the legacy copies in only once every entry is in a bucket
+        log_store.mark_migrated(name)
+
+
+@register_job("bucket_access_logs")
+def bucket_access_logs(ctx, page_size=BATCH_LIMIT // 3):
+    """Move events from the flat access_logs collection into day buckets (see log_store.py)"""
+    _require_firebase()
+    legacy = db.collection(log_store.LEGACY_LOG_COLLECTION)
+    if ctx.total is None:
+        ctx.set_total(legacy.count().get()[0][0].value)
+
+    moved = ctx.checkpoint.get("moved", 0)
+    for page in iter_document_pages(legacy, page_size, ctx.checkpoint.get("last_doc_id")):
+        # 2 writes per event plus at most one manifest write per event stays under BATCH_LIMIT
+        batch, days = db.batch(), set()
+        for doc in page:
+            log = doc.to_dict()
+            date = log_store.log_date(log)
+            # Same document id, so a replayed page overwrites instead of duplicating
+            batch.set(log_store.event_ref(db, date, doc.id), log)
+            batch.delete(doc.reference)
+            days.add(date)
+        for date in days:
+            batch.set(db.collection(log_store.DAY_COLLECTION).document(date), {"date": date}, merge=True)
+        batch.commit()
+        moved += len(page)
+        ctx.advance(len(page))
+        ctx.save_checkpoint({"last_doc_id": page[-1].id, "moved": moved})
+        ctx.check_cancelled()
+    log_store.mark_migrated(log_store.LEGACY_LOG_COLLECTION)
+
+
+def _delete_refs(refs):
+    batch, pending = db.batch(), 0
+    for ref in refs:
+        batch.delete(ref)
+        pending += 1
+        if pending == BATCH_LIMIT:
+            batch.commit()
+            batch, pending = db.batch(), 0
+    if pending:
+        batch.commit()
+
+
+@register_job("archive_access_logs")
+def archive_access_logs(ctx, older_than_days=LOG_ARCHIVE_AFTER_DAYS):
+    """Move day buckets older than older_than_days from Firestore to the cold archive (see log_archive.py)"""
+    _require_firebase()
+    cutoff = (datetime.utcnow() - timedelta(days=older_than_days)).strftime("%Y-%m-%d")
+    days = sorted(date for date in log_store.log_days(end_date=cutoff) if date < cutoff)
+    if ctx.total is None:
+        ctx.set_total(len(days))
+
+    archived = ctx.checkpoint.get("archived", 0)
+    for date in days:
+        event_docs = list(log_store.day_events(date))
+        clinician_docs = list(log_store.clinician_days_on(date))
+        log_archive.write_partition(
+            date,
+            [{**doc.to_dict(), "id": log_store.make_log_id(date, doc.id)} for doc in event_docs],
+            [doc.to_dict() for doc in clinician_docs],
+        )
+        # write_partition returns the merged partition's size; count only what this run moved
+        archived += len(event_docs)
+        # The manifest entry goes last: after a crash the day is found again and re-archived (merged by id)
+        _delete_refs([doc.reference for doc in event_docs + clinician_docs])
+        db.collection(log_store.DAY_COLLECTION).document(date).delete()
+        ctx.advance()
+        ctx.save_checkpoint({"last_date": date, "archived": archived})
+        ctx.check_cancelled()
+
+
+@register_job("backfill_patient_timelines")
+def backfill_patient_timelines(ctx):
+    """Add events logged before patient timelines existed, oldest day first (see patient_timeline.py)"""
+    _require_firebase()
+    # One projected scan: patients doc id -> patient_id
+    patient_ids = {doc.id: doc.to_dict().get("patient_id")
+                   for doc in db.collection("patients").select(["patient_id"]).stream()}
+    dates = sorted(date for date, _ in log_store.tiered_dates())
+    if ctx.total is None:
+        ctx.set_total(len(dates))
+
+    added = ctx.checkpoint.get("added", 0)
+    resume_after = ctx.checkpoint.get("last_date", "")
+    for date in (d for d in dates if d > resume_after):
+        events = [event for page in log_store.iter_event_pages(date, date) for event in page]
+        timelines = {}
+        for event in sorted(events, key=lambda e: e.get("timestamp", "")):
+            patient_id = event.get("patient_id") or patient_ids.get(patient_timeline.patient_key(event))
+            if patient_id:
+                timelines.setdefault(patient_id, []).append(patient_timeline.timeline_entry(event["id"], event))
+        for patient_id, entries in timelines.items():
+            added += patient_timeline.backfill_day(patient_id, date, entries)
+        ctx.advance()
+        ctx.save_checkpoint({"last_date": date, "added": added})
+        ctx.check_cancelled()
+
+
+@register_job("rebuild_interaction_summaries")
+def rebuild_interaction_summaries(ctx):
+    """
+    Recompute every doctor-patient interaction summary from the doctors' day
+    buckets (both tiers), see log_store.py. Overwrites the summaries, so it also
+    repairs drift; events logged while it runs may be missed, so run it when quiet.
+    """
+    _require_firebase()
+    summaries = {}
+    for page in log_store.iter_clinician_pages("doctor"):
+        for event in page:
+            doctor, patient = event.get("doctor_name"), (event.get("patient_name") or "").strip()
+            if not doctor or not patient or patient.lower() == "n/a":
+                continue
+            summary = summaries.setdefault(log_store.summary_id(doctor, patient), {
+                "doctor_name": doctor, "patient_name": patient, "access_count": 0, "last_access": "", "statuses": {}})
+            status = event.get("status") or "Unknown"
+            summary["access_count"] += 1
+            summary["statuses"][status] = summary["statuses"].get(status, 0) + 1
+            if event.get("timestamp", "") > summary["last_access"]:
+                summary["last_access"], summary["patient_name"] = event["timestamp"], patient
+    ctx.set_total(len(summaries))
+
+    items = list(summaries.items())
+    for i in range(0, len(items), BATCH_LIMIT):
+        batch = db.batch()
+        for summary_id, summary in items[i:i + BATCH_LIMIT]:
+            batch.set(db.collection(log_store.SUMMARY_COLLECTION).document(summary_id), summary)
+        batch.commit()
+        ctx.advance(len(items[i:i + BATCH_LIMIT]))
+        ctx.check_cancelled()
@@ -15,6 +15,14 @@ warnings.filterwarnings("ignore", ".*Google will stop supporting.*", category=Fu
 
 from limiter import limiter
 from ml_logic import load_ml_model, ml_model
+from firebase_init import db, firebase_admin_initialized
+from firestore_manager import warm_up, WARMUP_ON_START
+from token_cache import start_cert_prefetcher
+from network_utils import host_ip_resolver, start_trusted_networks_watcher
+from jobs import job_runner
+from json_provider import init_json
+from response_compression import init_compression
+from metrics import init_metrics, current_route, RATE_LIMIT_REJECTIONS
 
 # Import Blueprints
 from routes.auth_routes import auth_bp
@@ -23,9 +31,18 @@ from routes.patient_routes import patient_bp
 from routes.access_routes import access_bp
 from routes.logs_routes import logs_bp
 from routes.general_routes import general_bp
+from routes.export_routes import export_bp
+from routes.job_routes import job_bp
 
 app = Flask(__name__)
 
+# ✅ Per-route request counts and latency, served from /metrics (registered first so it times everything below)
+init_metrics(app)
+
+# ✅ orjson-backed jsonify, and gzip/brotli for large JSON responses
+init_json(app)
+init_compression(app)
+
 # ✅ Initialize rate limiter
 limiter.init_app(app)
 
@@ -49,6 +66,7 @@ CORS(app, origins="*")
 # ✅ Rate limit error handler
 @app.errorhandler(429)
 def ratelimit_handler(e):
+    RATE_LIMIT_REJECTIONS.inc(route=current_route()[1])
     return jsonify({
         "success": False,
         "error": "❌ Too many requests. Please try again later.",
@@ -62,11 +80,40 @@ app.register_blueprint(user_bp)
 app.register_blueprint(patient_bp)
 app.register_blueprint(access_bp)
 app.register_blueprint(logs_bp)
+app.register_blueprint(export_bp)
+app.register_blueprint(job_bp)
 
 # ✅ LOAD ML MODEL AT STARTUP (eager loading)
 print("\n🧠 Loading ML model at startup...")
 load_ml_model()
 
+# ✅ Resolve the host address once here (and refresh in background) instead of per request
+host_ip_resolver.start()
+start_trusted_networks_watcher()
+
+# ✅ Resume background jobs interrupted by a previous shutdown (see jobs.py), from the first
+#    request each serving process handles: at import it would run in the gunicorn master or reloader
+@app.before_request
+def start_job_runner():
+    try:
+        job_runner.ensure_started()
+    except Exception as e:
+        print(f"⚠️ Job runner not started: {e}")
+
+# ✅ Open the Firestore channels now rather than on the first request of each worker
+if firebase_admin_initialized and WARMUP_ON_START:
+    try:
+        warm_up(db)
+    except Exception as e:
+        print(f"⚠️ Firestore warm-up failed: {e}")
+
+# ✅ Keep Google signing certs warm so admin token checks never block on a fetch
+if firebase_admin_initialized:
+    try:
+        start_cert_prefetcher()
+    except Exception as e:
+        print(f"⚠️ Cert prefetcher not started: {e}")
+
 if __name__ == "__main__":
     # Get port from environment variable or default to 5000
     port = int(os.getenv("PORT", 5000))
@@ -0,0 +1,402 @@
+"""
+Async access service for MedTrust AI
+ASGI variant of the access endpoints (normal, restricted, emergency, temp access)
+built on google.cloud.firestore.AsyncClient. Independent reads and writes run
+concurrently with asyncio.gather, and ML inference runs in an executor, so one
+worker can hold thousands of in-flight access requests.
+
+Run alongside (or instead of) the Flask access routes:
+    uvicorn async_access:app --host 0.0.0.0 --port 5001
+"""
+
+import asyncio
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask
+from google.cloud.firestore import AsyncClient, FieldFilter, async_transactional
+from limits import parse, parse_many
+from limits.storage import storage_from_string
+from limits.strategies import STRATEGIES
+
+from firebase_init import cred, firebase_admin_initialized
+from limiter import RATELIMIT_STORAGE_URI, RATELIMIT_STRATEGY, RATELIMIT_KEY_FUNC, DEFAULT_LIMITS
+from helpers import patient_doc_id
+from ml_logic import analyze_justification
+from encryption import encrypt_sensitive_data, decrypt_sensitive_data
+from network_utils import client_ip_from_headers
+from utils import is_ip_in_network, TRUST_THRESHOLD
+from access_pipeline import PATIENT_SENSITIVE_FIELDS
+import log_store
+import patient_timeline
+from flag_queue import flag_priority
+import metrics
+
+# ---------- CONFIGURATION ----------
+ML_WORKERS = 4
+RATE_LIMIT_WORKERS = 4  # limiter storage calls block (redis/mmap), so they run off the event loop
+FIRESTORE_TIMEOUT = 5   # seconds per RPC
+
+_ml_pool = ThreadPoolExecutor(max_workers=ML_WORKERS, thread_name_prefix="ml-inference")
+_limit_pool = ThreadPoolExecutor(max_workers=RATE_LIMIT_WORKERS, thread_name_prefix="rate-limit")
+_rate_limiter = STRATEGIES[RATELIMIT_STRATEGY](storage_from_string(RATELIMIT_STORAGE_URI))
+# Only provides a request context for RATELIMIT_KEY_FUNC; never serves requests
+_key_app = Flask(__name__)
+_background = set()
+async_db = None
+
+
+# ---------- Firestore helpers ----------
+async def _find_user(name):
+    if async_db is None or not name:
+        return None
+    query = async_db.collection("users").where(filter=FieldFilter("name", "==", name)).limit(1)
+    async for doc in query.stream(timeout=FIRESTORE_TIMEOUT):
+        return doc
+    return None
+
+
+async def get_trust_score(name):
+    try:
+        doc = await _find_user(name)
+        if doc is not None:
+            return doc.to_dict().get("trust_score", 80)
+    except Exception as e:
+        print("get_trust_score (async) error:", e)
+    return 80
+
+
+async def update_trust_score(name, delta):
+    try:
+        doc = await _find_user(name)
+        if doc is None:
+            return None
+        current = doc.to_dict().get("trust_score", 80)
+        new_score = max(0, min(100, current + delta))
+        await doc.reference.update({
+            "trust_score": new_score,
+            "last_update": datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+        }, timeout=FIRESTORE_TIMEOUT)
+        return new_score
+    except Exception as e:
+        print("update_trust_score (async) error:", e)
+    return None
+
+
+async def _patient_id(log_data):
+    """Same resolution as patient_timeline.resolve_patient_id, with an async read"""
+    if log_data.get("patient_id"):
+        return log_data["patient_id"]
+    doc_id = patient_timeline.patient_key(log_data)
+    if not doc_id:
+        return None
+    patient_id = patient_timeline.cached_patient_id(doc_id)
+    if patient_id:
+        return patient_id
+    snapshot = await async_db.collection("patients").document(doc_id).get(field_paths=["patient_id"], timeout=FIRESTORE_TIMEOUT)
+    return patient_timeline.remember_patient_id(doc_id, snapshot.get("patient_id") if snapshot.exists else None)
+
+
+@async_transactional
+async def _append_timeline(transaction, patient_id, entries):
+    snapshot = await patient_timeline.head_ref(async_db, patient_id).get(transaction=transaction)
+    head = snapshot.to_dict() if snapshot.exists else {}
+    for ref, data, merge in patient_timeline.append_writes(async_db, head, patient_id, entries):
+        transaction.set(ref, data, merge=merge)
+
+
+async def safe_log_access(log_data, clinician=None, flag_priority=None):
+    """One day-bucketed event write, plus the clinician day bucket entry when clinician=(role, name)
+    and the review queue entry when flag_priority is given; then the patient timeline append"""
+    if async_db is None:
+        return
+    try:
+        log_id, writes = log_store.event_writes(async_db, log_data, clinician, flag_priority)
+        batch = async_db.batch()
+        for ref, data, merge in writes:
+            batch.set(ref, data, merge=merge)
+        await batch.commit(timeout=FIRESTORE_TIMEOUT)
+        log_store.day_written(log_id)
+        patient_id = await _patient_id(log_data)
+        if patient_id:
+            await _append_timeline(async_db.transaction(), patient_id, [patient_timeline.timeline_entry(log_id, log_data)])
+    except Exception as e:
+        print(f"⚠️ Logging failed (non-fatal): {e}")
+
+
+async def fetch_patient(pid):
+    if async_db is None or not pid:
+        return None
+    pdoc = await async_db.collection("patients").document(pid).get(timeout=FIRESTORE_TIMEOUT)
+    if not pdoc.exists:
+        return None
+    return decrypt_sensitive_data(pdoc.to_dict(), PATIENT_SENSITIVE_FIELDS)
+
+
+def defer(*coros):
+    """Run writes in the background; keep a reference so tasks are not garbage collected"""
+    for coro in coros:
+        task = asyncio.ensure_future(coro)
+        _background.add(task)
+        task.add_done_callback(_background.discard)
+
+
+def record_decision(log_data, name, trust_delta, priority=None):
+    writes = []
+    if log_data is not None:
+        writes.append(safe_log_access(log_data, flag_priority=priority))
+    if name and trust_delta:
+        writes.append(update_trust_score(name, trust_delta))
+    defer(*writes)
+
+
+async def run_ml(text):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_ml_pool, analyze_justification, text)
+
+
+def _now():
+    return datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _pdf_link(pid):
+    return f"/generate_patient_pdf/{pid}"
+
+
+def _not_found():
+    return 404, {"success": False, "message": "❌ Patient not found", "patient_data": {}, "pdf_link": None}
+
+
+# ---------- Endpoints (same contracts as routes/access_routes.py) ----------
+async def normal_access(data, ip):
+    name, role = data.get("name"), data.get("role")
+    pid = patient_doc_id((data.get("patient_name") or "").strip())
+    if not is_ip_in_network(ip):
+        record_decision({"doctor_name": name, "doctor_role": role, "action": "Normal Access (Outside Network)",
+                         "ip": ip, "status": "Denied", "timestamp": _now()}, name, -5)
+        return 403, {"success": False, "message": "❌ Access denied — outside hospital network.", "patient_data": {}, "pdf_link": None}
+
+    record_decision({"doctor_name": name, "doctor_role": role, "action": "Normal Access (In-Network)",
+                     "ip": ip, "status": "Granted", "timestamp": _now()}, name, +2)
+    patient_info = await fetch_patient(pid)
+    if not patient_info:
+        return _not_found()
+    return 200, {"success": True, "message": f"✅ Normal access granted from {ip}.", "patient_data": patient_info, "pdf_link": _pdf_link(pid)}
+
+
+async def restricted_access(data, ip):
+    name, role = data.get("name"), data.get("role")
+    justification = (data.get("justification") or "").strip()
+    pid = patient_doc_id((data.get("patient_name") or "").strip())
+
+    if is_ip_in_network(ip):
+        record_decision({"doctor_name": name, "doctor_role": role, "action": "Restricted Access (In-Network)",
+                         "ip": ip, "status": "Granted", "timestamp": _now()}, name, +1)
+        patient_info = await fetch_patient(pid)
+        if not patient_info:
+            return _not_found()
+        return 200, {"success": True, "message": "⚠️ Restricted access granted (inside hospital).", "patient_data": patient_info, "pdf_link": _pdf_link(pid)}
+
+    # Trust read, patient read and ML inference are independent: run them together
+    ml = run_ml(justification) if justification else asyncio.sleep(0, result=("invalid", 0.0))
+    user_trust, patient_info, (label, score) = await asyncio.gather(get_trust_score(name), fetch_patient(pid), ml)
+
+    if user_trust < TRUST_THRESHOLD:
+        record_decision({"doctor_name": name, "doctor_role": role, "action": "Restricted Access (Low Trust)",
+                         "ip": ip, "status": "Denied", "timestamp": _now()}, name, -5)
+        return 403, {"success": False, "message": "❌ Low trust — access denied.", "patient_data": {}, "pdf_link": None}
+
+    if not justification:
+        return 400, {"success": False, "message": "📝 Justification required for outside access.", "patient_data": {}, "pdf_link": None}
+
+    is_valid = (label in ["emergency", "restricted"]) and (score > 0.55)
+    log_data = encrypt_sensitive_data({
+        "doctor_name": name, "doctor_role": role, "action": "Restricted Access (Outside Network)",
+        "justification": justification, "ai_label": label, "ai_confidence": score, "ip": ip,
+        "status": "Granted" if is_valid else "Flagged", "timestamp": _now()
+    }, ["justification"])
+    priority = None if is_valid else flag_priority(label, score, user_trust, ["emergency", "restricted"])
+    record_decision(log_data, name, +2 if is_valid else -3, priority)
+
+    if not patient_info:
+        return _not_found()
+    return (200 if is_valid else 403), {"success": is_valid, "message": ("🌐 Restricted Access Granted ✅" if is_valid else "⚠️ Access flagged for review."), "patient_data": patient_info, "pdf_link": _pdf_link(pid)}
+
+
+async def emergency_access(data, ip):
+    name, role = data.get("name"), data.get("role")
+    justification = (data.get("justification") or "").strip()
+    patient_name = (data.get("patient_name") or "").strip()
+    pid = patient_doc_id(patient_name) if patient_name else None
+
+    if not justification:
+        record_decision(None, name, -2)
+        return 400, {"success": False, "message": "❌ Justification required!", "patient_data": {}, "pdf_link": None}
+
+    (label, score), patient_info, user_trust = await asyncio.gather(run_ml(justification), fetch_patient(pid), get_trust_score(name))
+    genuine = (label == "emergency" and score > 0.70)
+
+    log_data = encrypt_sensitive_data({
+        "doctor_name": name, "doctor_role": role, "patient_name": patient_name, "action": "Emergency Access",
+        "justification": justification, "ai_label": label, "confidence": score, "ip": ip,
+        "status": "Approved" if genuine else "Flagged", "timestamp": _now()
+    }, ["justification"])
+    priority = None if genuine else flag_priority(label, score, user_trust, ["emergency"])
+    record_decision(log_data, name, +3 if genuine else -10, priority)
+    msg = "🚑 Emergency access approved ✅" if genuine else "⚠️ Suspicious justification — logged."
+
+    if not patient_info and patient_name:
+        return _not_found()
+    return (200 if genuine else 403), {"success": genuine, "message": msg, "patient_data": patient_info or {},
+                                       "pdf_link": _pdf_link(pid) if patient_info else None}
+
+
+async def request_temp_access(data, ip):
+    name, role = data.get("name"), data.get("role")
+    patient_name = (data.get("patient_name") or "").strip()
+    if (role or "").strip().lower() != "nurse":
+        return 403, {"success": False, "message": "❌ Only nurses can request temporary access"}
+    if not is_ip_in_network(ip):
+        record_decision(None, name, -3)
+        return 403, {"success": False, "message": "❌ Temporary access only available inside hospital network"}
+
+    pid = patient_doc_id(patient_name)
+    patient_info = await fetch_patient(pid)
+    if not patient_info:
+        return _not_found()
+
+    defer(safe_log_access({"doctor_name": name, "doctor_role": role, "action": "Temporary Access Request",
+                           "patient_name": patient_name, "ip": ip, "status": "Granted",
+                           "duration": "30 minutes", "timestamp": _now()}, ("nurse", name)))
+    record_decision(None, name, +1)
+    return 200, {"success": True, "message": "✅ Temporary access granted for 30 minutes", "patient_data": patient_info, "pdf_link": _pdf_link(pid)}
+
+
+# Same limits and Flask-Limiter scopes (blueprint endpoint names) as routes/access_routes.py,
+# so with a shared RATELIMIT_STORAGE_URI both apps draw from one quota per client and route
+ROUTES = {
+    "/normal_access": (normal_access, "access_routes.normal_access", [parse("30 per hour")]),
+    "/restricted_access": (restricted_access, "access_routes.restricted_access", [parse("20 per hour")]),
+    "/emergency_access": (emergency_access, "access_routes.emergency_access", [parse("15 per hour")]),
+    "/request_temp_access": (request_temp_access, "access_routes.request_temp_access",
+                             [limit for spec in DEFAULT_LIMITS for limit in parse_many(spec)]),
+}
+
+
+# ---------- ASGI plumbing ----------
+def _headers(scope):
+    return {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope.get("headers", [])}
+
+
+def _limit_key(scope, headers, peer):
+    """The key Flask-Limiter would use for this request (RATELIMIT_KEY_FUNC in a Flask request context)"""
+    with _key_app.test_request_context(scope["path"], method=scope["method"], headers=headers,
+                                       environ_base={"REMOTE_ADDR": peer}):
+        return RATELIMIT_KEY_FUNC()
+
+
+def _hit_limits(limits, key, endpoint):
+    # Flask-Limiter checks the tightest limit first and stops at the first breach
+    return all(_rate_limiter.hit(limit, key, endpoint) for limit in sorted(limits))
+
+
+async def _within_limits(scope, headers, peer, limits, endpoint):
+    if not limits:
+        return True
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_limit_pool, _hit_limits, limits, _limit_key(scope, headers, peer), endpoint)
+
+
+async def _read_body(receive):
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return body
+
+
+async def _respond_metrics(send, authorization):
+    if not metrics.authorized(authorization):
+        return await _respond(send, 401, {"error": "Unauthorized"})
+    await send({"type": "http.response.start", "status": 200,
+                "headers": [(b"content-type", metrics.CONTENT_TYPE.encode())]})
+    await send({"type": "http.response.body", "body": metrics.registry.render().encode()})
+    return 200
+
+
+async def _respond(send, status, payload=None):
+    body = json.dumps(payload, default=str).encode() if payload is not None else b""
+    await send({"type": "http.response.start", "status": status, "headers": [
+        (b"content-type", b"application/json"),
+        (b"access-control-allow-origin", b"*"),
+        (b"access-control-allow-headers", b"Content-Type, Authorization"),
+        (b"access-control-allow-methods", b"POST, OPTIONS"),
+    ]})
+    await send({"type": "http.response.body", "body": body})
+    return status
+
+
+async def _lifespan(receive, send):
+    global async_db
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            if firebase_admin_initialized:
+                async_db = AsyncClient(project=cred.project_id, credentials=cred.get_credential())
+                print("✅ Async Firestore client ready")
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            if _background:
+                await asyncio.gather(*_background, return_exceptions=True)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        return await _lifespan(receive, send)
+    if scope["type"] != "http":
+        return
+    if scope["path"] == "/metrics" and scope["method"] == "GET":
+        return await _respond_metrics(send, _headers(scope).get("authorization"))
+
+    start = time.perf_counter()
+    status = await _dispatch(scope, receive, send)
+    route = scope["path"] if scope["path"] in ROUTES else metrics.UNMATCHED_ROUTE
+    metrics.HTTP_LATENCY.observe(time.perf_counter() - start, blueprint="async", route=route, method=scope["method"])
+    metrics.HTTP_REQUESTS.inc(blueprint="async", route=route, method=scope["method"], status=status)
+
+
+async def _dispatch(scope, receive, send):
+    route = ROUTES.get(scope["path"])
+    if route is None:
+        return await _respond(send, 404, {"success": False, "error": "Not found"})
+    if scope["method"] == "OPTIONS":
+        return await _respond(send, 204)
+    if scope["method"] != "POST":
+        return await _respond(send, 405, {"success": False, "error": "Method not allowed"})
+
+    headers = _headers(scope)
+    peer = (scope.get("client") or ("0.0.0.0", 0))[0]
+    ip = client_ip_from_headers(peer, headers.get("x-forwarded-for"))
+    handler, endpoint, limits = route
+    if not await _within_limits(scope, headers, peer, limits, endpoint):
+        metrics.RATE_LIMIT_REJECTIONS.inc(route=scope["path"])
+        return await _respond(send, 429, {"success": False, "error": "❌ Too many requests. Please try again later."})
+
+    try:
+        data = json.loads(await _read_body(receive) or b"{}")
+        status, payload = await handler(data, ip)
+    except Exception as e:
+        print(f"❌ async {scope['path']} error:", e)
+        traceback.print_exc()
+        status, payload = 500, {"success": False, "message": str(e)}
+    return await _respond(send, status, payload)
@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark: bulk export throughput (reports/s) by process pool size
+
+Usage:
+    python benchmarks/bench_export.py [--reports 200] [--max-workers N]
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from encryption import encrypt_sensitive_data
+from report_export import create_export_job, stream_reports_zip, render_patient_report
+
+PATIENT = encrypt_sensitive_data({
+    "name": "Jane Doe", "age": 42, "gender": "Female", "email": "jane.doe@example.com",
+    "diagnosis": "Community-acquired pneumonia, right lower lobe",
+    "treatment": "Amoxicillin 1g TID for 7 days", "notes": "No known drug allergies.",
+}, ["diagnosis", "treatment", "notes"])
+
+
+def run(workers, reports):
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        # Warm every worker so spawn/import time is not counted
+        list(pool.map(render_patient_report, [PATIENT] * workers))
+        job = create_export_job("bench")
+        start = time.perf_counter()
+        size = sum(len(chunk) for chunk in stream_reports_zip(job, [PATIENT] * reports, reports, pool=pool))
+        elapsed = time.perf_counter() - start
+    return reports / elapsed, size
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reports", type=int, default=200)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    print(f"\n📦 Bulk export benchmark ({args.reports} reports, {os.cpu_count()} CPUs)")
+    baseline = None
+    workers = 1
+    while workers <= args.max_workers:
+        rate, size = run(workers, args.reports)
+        baseline = baseline or rate
+        print(f"   {workers:3d} workers: {rate:8.1f} reports/s   scaling {rate / baseline:5.2f}x   zip {size / 1024:8.0f} KiB")
+        workers *= 2
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark: serialization time and payload size of an admin log response (500 entries)
+
+Usage:
+    python benchmarks/bench_json.py [--entries 500] [--rounds 200]
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from google.api_core.datetime_helpers import DatetimeWithNanoseconds
+
+from encryption import encrypt_sensitive_data
+from json_provider import OrjsonProvider, orjson
+from response_compression import ENCODERS
+
+
+def access_logs(entries):
+    """Shaped like /access_logs/admin: encrypted justification, Firestore datetimes"""
+    start = DatetimeWithNanoseconds(2026, 10, 1, 8, 0, 0, tzinfo=timezone.utc)
+    logs = []
+    for i in range(entries):
+        at = start + timedelta(minutes=7 * i)
+        logs.append(encrypt_sensitive_data({
+            "id": f"{at:%Y-%m-%d}/{i:020d}",
+            "doctor_name": f"Dr. Clinician {i % 40}",
+            "doctor_role": "doctor" if i % 3 else "nurse",
+            "patient_name": f"patient {i % 150}",
+            "action": "Restricted Access (Outside Network)",
+            "justification": "Patient presented with acute chest pain; reviewing prior ECG and troponin results.",
+            "ai_label": "emergency",
+            "ai_confidence": 0.87,
+            "ip": f"10.0.{i % 256}.{i % 200}",
+            "status": "Granted" if i % 5 else "Flagged",
+            "timestamp": f"{at:%Y-%m-%d %H:%M:%S}",
+            "created_at": at,
+        }, ["justification"]))
+    return {"success": True, "logs": logs, "count": len(logs),
+            "filters": {"start_date": None, "end_date": None, "status": None}}
+
+
+def measure(provider, payload, rounds):
+    with provider._app.app_context():
+        provider.response(payload)  # warm up
+        start = time.perf_counter()
+        for _ in range(rounds):
+            body = provider.response(payload).get_data()
+        return (time.perf_counter() - start) / rounds * 1000, body
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    payload = access_logs(args.entries)
+    print(f"\n🧾 JSON response benchmark ({args.entries} log entries, {args.rounds} rounds)")
+    providers = [("json (Flask default)", DefaultJSONProvider(app))]
+    if orjson is not None:
+        providers.append(("orjson", OrjsonProvider(app)))
+    for name, provider in providers:
+        ms, body = measure(provider, payload, args.rounds)
+        print(f"   {name:22s} {ms:7.2f} ms/response   {len(body) / 1024:7.1f} KiB")
+
+    print()
+    for encoding, encode in ENCODERS.items():
+        start = time.perf_counter()
+        encoded = encode(body)
+        ms = (time.perf_counter() - start) * 1000
+        print(f"   {encoding:22s} {ms:7.2f} ms          {len(encoded) / 1024:7.1f} KiB   ({len(encoded) / len(body):.0%} of raw)")
+    print()
+
+
+if __name__ == "__main__":
+    main()
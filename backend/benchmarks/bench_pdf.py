@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark: per-report CPU time and allocations for the patient PDF
+
+"rebuild" constructs a fresh ReportTemplate for every report, which is what
+create_patient_pdf_bytes used to do (styles, table styles and static flowables
+per call). "cached" reuses the process-wide template.
+
+Usage:
+    python benchmarks/bench_pdf.py [--reports 200]
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pdf_report import ReportTemplate, get_report_template
+
+PATIENT = {
+    "name": "Jane Doe",
+    "age": 42,
+    "gender": "Female",
+    "email": "jane.doe@example.com",
+    "diagnosis": "Community-acquired pneumonia, right lower lobe",
+    "treatment": "Amoxicillin 1g TID for 7 days; follow-up chest X-ray in 6 weeks",
+    "notes": "Patient reports improvement after 48h. No known drug allergies.",
+}
+
+
+def cpu_ms_per_report(render, reports):
+    start = time.process_time()
+    for _ in range(reports):
+        render()
+    return (time.process_time() - start) / reports * 1000
+
+
+def peak_kib_per_report(render, reports):
+    """Average tracemalloc peak while rendering one report"""
+    tracemalloc.start()
+    total = 0
+    for _ in range(reports):
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        render()
+        _, peak = tracemalloc.get_traced_memory()
+        total += peak - base
+    tracemalloc.stop()
+    return total / reports / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reports", type=int, default=200)
+    args = parser.parse_args()
+
+    rebuild = lambda: ReportTemplate().render(PATIENT)
+    cached = lambda: get_report_template().render(PATIENT)
+    cached()  # build the shared template and this thread's static flowables
+
+    print(f"\n📄 PDF report benchmark ({args.reports} reports)")
+    results = {}
+    for label, render in (("rebuild", rebuild), ("cached", cached)):
+        cpu = cpu_ms_per_report(render, args.reports)
+        peak = peak_kib_per_report(render, max(args.reports // 10, 1))
+        results[label] = cpu
+        print(f"   {label:8s} {cpu:8.2f} ms CPU/report   {peak:8.1f} KiB peak allocations/report")
+    print(f"   speedup: {results['rebuild'] / results['cached']:.2f}x\n")
+
+
+if __name__ == "__main__":
+    main()
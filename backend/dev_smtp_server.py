@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Local SMTP stand-in for MedTrust AI
+Accepts any login, keeps delivered messages in memory and never relays them.
+
+Usage:
+    python dev_smtp_server.py --port 1025
+"""
+
+import argparse
+import socketserver
+import threading
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """Speaks just enough SMTP for smtplib: EHLO, AUTH, MAIL, RCPT, DATA, RSET, NOOP, QUIT"""
+
+    def _reply(self, line):
+        self.wfile.write((line + "\r\n").encode())
+
+    def _readline(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        return line.decode("utf-8", "replace").rstrip("\r\n")
+
+    def handle(self):
+        server = self.server
+        server.connections += 1
+        self._reply("220 localhost MedTrust dev SMTP ready")
+        mail_from, rcpt_to = None, []
+        while True:
+            line = self._readline()
+            if line is None:
+                return
+            cmd = line[:4].upper()
+            if cmd in ("EHLO", "HELO"):
+                self.wfile.write(b"250-localhost\r\n250 AUTH PLAIN LOGIN\r\n")
+            elif cmd == "AUTH":
+                if line.upper().startswith("AUTH LOGIN") and len(line.split()) == 2:
+                    # Username and password prompts, both accepted unchecked
+                    self._reply("334 VXNlcm5hbWU6")
+                    self._readline()
+                    self._reply("334 UGFzc3dvcmQ6")
+                    self._readline()
+                server.logins += 1
+                self._reply("235 Authentication successful")
+            elif cmd == "MAIL":
+                mail_from, rcpt_to = line.split(":", 1)[1].strip(" <>"), []
+                self._reply("250 OK")
+            elif cmd == "RCPT":
+                rcpt_to.append(line.split(":", 1)[1].strip(" <>"))
+                self._reply("250 OK")
+            elif cmd == "DATA":
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                body = []
+                while True:
+                    data_line = self._readline()
+                    if data_line is None or data_line == ".":
+                        break
+                    body.append(data_line[1:] if data_line.startswith("..") else data_line)
+                server.record(mail_from, rcpt_to, "\n".join(body))
+                mail_from, rcpt_to = None, []
+                self._reply("250 OK queued")
+            elif cmd == "RSET":
+                mail_from, rcpt_to = None, []
+                self._reply("250 OK")
+            elif cmd == "NOOP":
+                self._reply("250 OK")
+            elif cmd == "QUIT":
+                self._reply("221 Bye")
+                return
+            else:
+                self._reply("502 Command not implemented")
+
+
+class LocalSMTPServer(socketserver.ThreadingTCPServer):
+    """In-memory SMTP sink, usable from tests or as a standalone dev server"""
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, verbose=False):
+        super().__init__((host, port), _SMTPHandler)
+        self.messages = []
+        self.connections = 0
+        self.logins = 0
+        self.verbose = verbose
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def record(self, mail_from, rcpt_to, data):
+        with self._lock:
+            self.messages.append({"from": mail_from, "to": rcpt_to, "data": data})
+        if self.verbose:
+            print(f"📨 Message from {mail_from} to {', '.join(rcpt_to)} ({len(data)} bytes)")
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name="dev-smtp", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local SMTP stand-in for MedTrust AI")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1025)
+    args = parser.parse_args()
+
+    server = LocalSMTPServer(args.host, args.port, verbose=True)
+    print(f"📬 Dev SMTP server listening on {args.host}:{server.port} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
@@ -4,9 +4,12 @@ Handles encryption/decryption of sensitive medical data using Fernet
 """
 
 import os
+import time
 from cryptography.fernet import Fernet
 import base64
 
+from metrics import ENCRYPTION_LATENCY
+
 class EncryptionHandler:
     """Handles encryption and decryption of sensitive data"""
     
@@ -68,6 +71,7 @@ class EncryptionHandler:
         if not data:
             return None
         
+        start = time.perf_counter()
         try:
             # Convert to string if not already
             data_str = str(data) if not isinstance(data, str) else data
@@ -77,6 +81,8 @@ class EncryptionHandler:
         except Exception as e:
             print(f"❌ Encryption error: {e}")
             raise
+        finally:
+            ENCRYPTION_LATENCY.observe(time.perf_counter() - start, op="encrypt")
     
     def decrypt(self, encrypted_data):
         """
@@ -91,6 +97,7 @@ class EncryptionHandler:
         if not encrypted_data:
             return None
         
+        start = time.perf_counter()
         try:
             # Convert to bytes if string, decrypt, then decode
             encrypted_bytes = encrypted_data.encode() if isinstance(encrypted_data, str) else encrypted_data
@@ -108,6 +115,8 @@ class EncryptionHandler:
             else:
                 # Likely legacy plain text, return as-is without error log
                 return encrypted_data if isinstance(encrypted_data, str) else str(encrypted_data)
+        finally:
+            ENCRYPTION_LATENCY.observe(time.perf_counter() - start, op="decrypt")
     
     def encrypt_dict(self, data, fields_to_encrypt):
         """
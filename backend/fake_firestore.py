@@ -0,0 +1,657 @@
+"""
+In-memory Firestore for MedTrust AI tests
+A small stand-in for google.cloud.firestore.Client (and AsyncClient, see
+FakeFirestore.async_client) that keeps documents in a dict, so the modules
+built on firebase_init.db can be tested without credentials or an emulator.
+
+It covers what the backend uses: documents and subcollections, collection
+group queries, where / order_by / cursors / limit / select / count, batches,
+BulkWriter, transactions (driven by the real @transactional decorators) and
+the ArrayUnion, ArrayRemove, Increment, SERVER_TIMESTAMP and DELETE_FIELD
+transforms. Index requirements are not checked.
+
+    fake = fake_firestore.install()   # before importing the module under test
+    fake.reset()                      # at the start of each test
+"""
+
+import copy
+import random
+import string
+import sys
+import threading
+import types
+from datetime import datetime, timezone
+
+from google.api_core.exceptions import AlreadyExists, NotFound
+from google.cloud.firestore import (ArrayRemove, ArrayUnion, DELETE_FIELD, FieldFilter, Increment, Query,
+                                    SERVER_TIMESTAMP)
+
+NAME = "__name__"
+RANGE_OPS = ("<", "<=", ">", ">=")
+
+
+def _auto_id():
+    return "".join(random.choice(string.ascii_letters + string.digits) for _ in range(20))
+
+
+def _lookup(data, field):
+    """Value of a dotted field path; KeyError if absent"""
+    for part in field.split("."):
+        if not isinstance(data, dict) or part not in data:
+            raise KeyError(field)
+        data = data[part]
+    return data
+
+
+def _rank(value):
+    """Sort key following Firestore's cross-type value ordering"""
+    if value is None:
+        return (0, 0)
+    if isinstance(value, bool):
+        return (1, value)
+    if isinstance(value, (int, float)):
+        return (2, value)
+    if isinstance(value, datetime):
+        return (3, value.timestamp() if value.tzinfo else value.replace(tzinfo=timezone.utc).timestamp())
+    if isinstance(value, str):
+        return (4, value)
+    if isinstance(value, bytes):
+        return (5, value)
+    if isinstance(value, DocumentReference):
+        return (6, value.path)
+    if isinstance(value, (list, tuple)):
+        return (8, tuple(_rank(v) for v in value))
+    if isinstance(value, dict):
+        return (9, tuple(sorted((k, _rank(v)) for k, v in value.items())))
+    return (10, str(value))
+
+
+def _transform(current, value):
+    if value is SERVER_TIMESTAMP:
+        return datetime.now(timezone.utc)
+    if isinstance(value, Increment):
+        base = current if isinstance(current, (int, float)) and not isinstance(current, bool) else 0
+        return base + value.value
+    if isinstance(value, ArrayUnion):
+        items = list(current) if isinstance(current, list) else []
+        items.extend(v for v in value.values if v not in items)
+        return copy.deepcopy(items)
+    if isinstance(value, ArrayRemove):
+        return [v for v in (current if isinstance(current, list) else []) if v not in value.values]
+    if isinstance(value, dict):
+        return _merge({}, value)
+    return copy.deepcopy(value)
+
+
+def _merge(target, data):
+    """Apply a set() payload to target; nested maps merge field by field, as with merge=True"""
+    for key, value in data.items():
+        if value is DELETE_FIELD:
+            target.pop(key, None)
+        elif isinstance(value, dict) and value:
+            current = target.get(key)
+            target[key] = _merge(dict(current) if isinstance(current, dict) else {}, value)
+        else:
+            target[key] = _transform(target.get(key), value)
+    return target
+
+
+def _update(target, data):
+    """Apply an update() payload: keys are dotted field paths, map values replace"""
+    for path, value in data.items():
+        *parents, leaf = path.split(".")
+        node = target
+        for part in parents:
+            if not isinstance(node.get(part), dict):
+                node[part] = {}
+            node = node[part]
+        if value is DELETE_FIELD:
+            node.pop(leaf, None)
+        else:
+            node[leaf] = _transform(node.get(leaf), value)
+    return target
+
+
+def _project(data, field_paths):
+    projected = {}
+    for field in field_paths:
+        try:
+            value = _lookup(data, field)
+        except KeyError:
+            continue
+        *parents, leaf = field.split(".")
+        node = projected
+        for part in parents:
+            node = node.setdefault(part, {})
+        node[leaf] = copy.deepcopy(value)
+    return projected
+
+
+class DocumentSnapshot:
+    def __init__(self, reference, data):
+        self.reference = reference
+        self.id = reference.id
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self):
+        return copy.deepcopy(self._data) if self.exists else None
+
+    def get(self, field_path):
+        if not self.exists:
+            return None
+        return copy.deepcopy(_lookup(self._data, field_path))
+
+
+class DocumentReference:
+    def __init__(self, client, path):
+        self._client = client
+        self.path = path
+        self.id = path.rsplit("/", 1)[-1]
+
+    def __eq__(self, other):
+        return isinstance(other, DocumentReference) and other.path == self.path
+
+    def __hash__(self):
+        return hash(self.path)
+
+    def __repr__(self):
+        return f"<DocumentReference {self.path}>"
+
+    @property
+    def parent(self):
+        return CollectionReference(self._client, self.path.rsplit("/", 1)[0])
+
+    def collection(self, collection_id):
+        return CollectionReference(self._client, f"{self.path}/{collection_id}")
+
+    def get(self, field_paths=None, transaction=None, **kwargs):
+        return self._client._snapshot(self, field_paths)
+
+    def set(self, document_data, merge=False, **kwargs):
+        self._client._apply([("set", self, document_data, merge)])
+
+    def create(self, document_data, **kwargs):
+        self._client._apply([("create", self, document_data, False)])
+
+    def update(self, field_updates, **kwargs):
+        self._client._apply([("update", self, field_updates, False)])
+
+    def delete(self, **kwargs):
+        self._client._apply([("delete", self, None, False)])
+
+
+class FakeQuery:
+    def __init__(self, client, parent_path=None, collection_id=None, all_descendants=False):
+        self._client = client
+        self._parent_path = parent_path
+        self._collection_id = collection_id
+        self._all_descendants = all_descendants
+        self._filters = []
+        self._orders = []
+        self._limit = None
+        self._start = None   # (values or snapshot, inclusive)
+        self._end = None
+        self._projection = None
+
+    def _copy(self, **changes):
+        query = FakeQuery.__new__(FakeQuery)
+        query.__dict__.update(self.__dict__)
+        query._filters = list(self._filters)
+        query._orders = list(self._orders)
+        for key, value in changes.items():
+            setattr(query, key, value)
+        return query
+
+    def where(self, field_path=None, op_string=None, value=None, *, filter=None):
+        if isinstance(filter, FieldFilter):
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        return self._copy(_filters=self._filters + [(field_path, op_string, value)])
+
+    def order_by(self, field_path, direction=Query.ASCENDING):
+        return self._copy(_orders=self._orders + [(field_path, direction == Query.DESCENDING)])
+
+    def limit(self, count):
+        return self._copy(_limit=count)
+
+    def select(self, field_paths):
+        return self._copy(_projection=list(field_paths))
+
+    def start_at(self, document_fields_or_snapshot):
+        return self._copy(_start=(document_fields_or_snapshot, True))
+
+    def start_after(self, document_fields_or_snapshot):
+        return self._copy(_start=(document_fields_or_snapshot, False))
+
+    def end_at(self, document_fields_or_snapshot):
+        return self._copy(_end=(document_fields_or_snapshot, True))
+
+    def end_before(self, document_fields_or_snapshot):
+        return self._copy(_end=(document_fields_or_snapshot, False))
+
+    def count(self, alias=None):
+        return _CountQuery(self, alias)
+
+    def stream(self, transaction=None, **kwargs):
+        return iter(self._run())
+
+    def get(self, transaction=None, **kwargs):
+        return self._run()
+
+    # ---------- evaluation ----------
+    def _name(self, path):
+        # Collection queries compare document ids, collection group queries full paths
+        return path if self._all_descendants else path.rsplit("/", 1)[-1]
+
+    def _value(self, path, data, field):
+        return self._name(path) if field == NAME else _lookup(data, field)
+
+    def _matches(self, path, data, condition):
+        field, op, expected = condition
+        if field == NAME and isinstance(expected, DocumentReference):
+            expected = self._name(expected.path)
+        try:
+            actual = self._value(path, data, field)
+        except KeyError:
+            return False
+        same = lambda a, b: _rank(a) == _rank(b)
+        if op == "==":
+            return same(actual, expected)
+        if op == "!=":
+            return actual is not None and not same(actual, expected)
+        if op == "in":
+            return any(same(actual, v) for v in expected)
+        if op == "not-in":
+            return actual is not None and not any(same(actual, v) for v in expected)
+        if op == "array-contains":
+            return isinstance(actual, list) and any(same(item, expected) for item in actual)
+        if op == "array-contains-any":
+            return isinstance(actual, list) and any(same(item, v) for item in actual for v in expected)
+        if op in RANGE_OPS:
+            a, b = _rank(actual), _rank(expected)
+            if a[0] != b[0]:
+                return False   # range filters only match values of the same type
+            return {"<": a < b, "<=": a <= b, ">": a > b, ">=": a >= b}[op]
+        raise ValueError(f"Unsupported operator {op}")
+
+    def _orderings(self):
+        orders = list(self._orders)
+        if not orders:
+            orders = [(field, False) for field, op, _ in self._filters if op in RANGE_OPS][:1]
+        if not any(field == NAME for field, _ in orders):
+            orders.append((NAME, orders[-1][1] if orders else False))
+        return orders
+
+    def _cursor(self, cursor, orders):
+        values, inclusive = cursor
+        if isinstance(values, DocumentSnapshot):
+            path, data = values.reference.path, values._data or {}
+            return [self._value(path, data, field) for field, _ in orders], inclusive
+        if isinstance(values, dict):
+            return [values[field] for field, _ in orders if field in values], inclusive
+        return list(values), inclusive
+
+    @staticmethod
+    def _compare(row, cursor, orders):
+        """-1, 0 or 1: where the row sits relative to the cursor, in query order"""
+        for value, bound, (_, descending) in zip(row, cursor, orders):
+            a, b = _rank(value), _rank(bound)
+            if a != b:
+                result = -1 if a < b else 1
+                return -result if descending else result
+        return 0
+
+    def _candidates(self):
+        for path, data in self._client.docs.items():
+            parent = path.rsplit("/", 1)[0]
+            if self._all_descendants:
+                if parent.rsplit("/", 1)[-1] != self._collection_id:
+                    continue
+            elif parent != self._parent_path:
+                continue
+            yield path, data
+
+    def _run(self):
+        with self._client._lock:
+            orders = self._orderings()
+            rows = []
+            for path, data in self._candidates():
+                if not all(self._matches(path, data, condition) for condition in self._filters):
+                    continue
+                try:
+                    key = [self._value(path, data, field) for field, _ in orders]
+                except KeyError:
+                    continue   # documents without an order_by field are left out
+                rows.append((key, path, data))
+            for index in reversed(range(len(orders))):
+                rows.sort(key=lambda row: _rank(row[0][index]), reverse=orders[index][1])
+            if self._start:
+                bound, inclusive = self._cursor(self._start, orders)
+                rows = [r for r in rows if self._compare(r[0], bound, orders) > (-1 if inclusive else 0)]
+            if self._end:
+                bound, inclusive = self._cursor(self._end, orders)
+                rows = [r for r in rows if self._compare(r[0], bound, orders) < (1 if inclusive else 0)]
+            if self._limit is not None:
+                rows = rows[:self._limit]
+            return [DocumentSnapshot(DocumentReference(self._client, path),
+                                     _project(data, self._projection) if self._projection is not None
+                                     else copy.deepcopy(data))
+                    for _, path, data in rows]
+
+
+class _CountQuery:
+    def __init__(self, query, alias):
+        self._query = query
+        self._alias = alias or "field_1"
+
+    def get(self, transaction=None, **kwargs):
+        return [[types.SimpleNamespace(alias=self._alias, value=len(self._query._run()))]]
+
+
+class CollectionReference(FakeQuery):
+    def __init__(self, client, path):
+        super().__init__(client, parent_path=path)
+        self.path = path
+        self.id = path.rsplit("/", 1)[-1]
+
+    @property
+    def parent(self):
+        return DocumentReference(self._client, self.path.rsplit("/", 1)[0]) if "/" in self.path else None
+
+    def document(self, document_id=None):
+        return DocumentReference(self._client, f"{self.path}/{document_id or _auto_id()}")
+
+    def add(self, document_data, document_id=None, **kwargs):
+        ref = self.document(document_id)
+        ref.create(document_data)
+        return datetime.now(timezone.utc), ref
+
+    def list_documents(self, **kwargs):
+        with self._client._lock:
+            return [DocumentReference(self._client, path) for path, _ in self._candidates()]
+
+
+class FakeWriteBatch:
+    def __init__(self, client):
+        self._client = client
+        self._writes = []
+
+    def __len__(self):
+        return len(self._writes)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.commit()
+
+    def set(self, reference, document_data, merge=False):
+        self._writes.append(("set", reference, document_data, merge))
+
+    def create(self, reference, document_data):
+        self._writes.append(("create", reference, document_data, False))
+
+    def update(self, reference, field_updates, option=None):
+        self._writes.append(("update", reference, field_updates, False))
+
+    def delete(self, reference, option=None):
+        self._writes.append(("delete", reference, None, False))
+
+    def commit(self, retry=None, timeout=None):
+        writes, self._writes = self._writes, []
+        self._client._apply(writes)
+        self._client.commits += 1
+        return [types.SimpleNamespace(update_time=datetime.now(timezone.utc)) for _ in writes]
+
+
+class FakeBulkWriter(FakeWriteBatch):
+    def on_write_error(self, callback):
+        self._on_error = callback
+
+    def on_write_result(self, callback):
+        self._on_result = callback
+
+    def flush(self):
+        if self._writes:
+            self.commit()
+
+    def close(self):
+        self.flush()
+
+
+class FakeTransaction(FakeWriteBatch):
+    """Buffers writes until the real @transactional wrapper commits them"""
+    _read_only = False
+    _max_attempts = 1
+
+    def __init__(self, client):
+        super().__init__(client)
+        self._id = None
+
+    @property
+    def in_progress(self):
+        return self._id is not None
+
+    def _clean_up(self):
+        self._writes = []
+        self._id = None
+
+    def _begin(self, retry_id=None):
+        self._id = b"fake-transaction"
+
+    def _commit(self):
+        self.commit()
+        self._id = None
+        return []
+
+    def _rollback(self):
+        self._clean_up()
+
+    def get(self, ref_or_query, **kwargs):
+        if isinstance(ref_or_query, DocumentReference):
+            return iter([ref_or_query.get()])
+        return ref_or_query.stream()
+
+    def get_all(self, references, **kwargs):
+        return self._client.get_all(references)
+
+
+class FakeFirestore:
+    """In-memory client; `docs` maps document paths to their data"""
+
+    def __init__(self, project="test-project"):
+        self.project = project
+        self.docs = {}
+        self.commits = 0
+        self._lock = threading.RLock()
+
+    def module(self, initialized=True):
+        """Stand-in for the firebase_init module"""
+        return types.SimpleNamespace(db=self, firebase_admin_initialized=initialized, cred=None)
+
+    def reset(self):
+        with self._lock:
+            self.docs.clear()
+            self.commits = 0
+
+    def collection(self, *path):
+        return CollectionReference(self, "/".join(path))
+
+    def document(self, *path):
+        return DocumentReference(self, "/".join(path))
+
+    def collection_group(self, collection_id):
+        return FakeQuery(self, collection_id=collection_id, all_descendants=True)
+
+    def get_all(self, references, field_paths=None, transaction=None, **kwargs):
+        return [self._snapshot(ref, field_paths) for ref in references]
+
+    def batch(self):
+        return FakeWriteBatch(self)
+
+    def bulk_writer(self, **kwargs):
+        return FakeBulkWriter(self)
+
+    def transaction(self, **kwargs):
+        return FakeTransaction(self)
+
+    def async_client(self):
+        """AsyncClient-shaped view of the same documents"""
+        return AsyncFakeFirestore(self)
+
+    def _snapshot(self, reference, field_paths=None):
+        with self._lock:
+            data = self.docs.get(reference.path)
+            if data is not None:
+                data = _project(data, field_paths) if field_paths is not None else copy.deepcopy(data)
+            return DocumentSnapshot(DocumentReference(self, reference.path), data)
+
+    def _apply(self, writes):
+        """Apply writes atomically; a failing precondition leaves every document unchanged"""
+        with self._lock:
+            staged = {}
+            for kind, reference, data, merge in writes:
+                path = reference.path
+                current = staged[path] if path in staged else self.docs.get(path)
+                if kind == "create" and current is not None:
+                    raise AlreadyExists(f"Document already exists: {path}")
+                if kind == "update" and current is None:
+                    raise NotFound(f"No document to update: {path}")
+                if kind == "delete":
+                    staged[path] = None
+                elif kind == "update":
+                    staged[path] = _update(copy.deepcopy(current), data)
+                elif merge:
+                    staged[path] = _merge(copy.deepcopy(current or {}), data)
+                else:
+                    staged[path] = _merge({}, data)
+            for path, data in staged.items():
+                if data is None:
+                    self.docs.pop(path, None)
+                else:
+                    self.docs[path] = data
+
+
+def install():
+    """
+    Register a FakeFirestore as the firebase_init module and return it. Test
+    files share one instance, since modules keep the `db` they imported.
+    """
+    module = sys.modules.get("firebase_init")
+    if module is None or not isinstance(getattr(module, "db", None), FakeFirestore):
+        module = sys.modules["firebase_init"] = FakeFirestore().module()
+    return module.db
+
+
+# ---------- AsyncClient ----------
+class AsyncDocumentReference(DocumentReference):
+    @property
+    def parent(self):
+        return AsyncCollectionReference(self._client, self.path.rsplit("/", 1)[0])
+
+    def collection(self, collection_id):
+        return AsyncCollectionReference(self._client, f"{self.path}/{collection_id}")
+
+    async def get(self, field_paths=None, transaction=None, **kwargs):
+        snapshot = self._client._store._snapshot(self, field_paths)
+        snapshot.reference = self
+        return snapshot
+
+    async def set(self, document_data, merge=False, **kwargs):
+        self._client._store._apply([("set", self, document_data, merge)])
+
+    async def create(self, document_data, **kwargs):
+        self._client._store._apply([("create", self, document_data, False)])
+
+    async def update(self, field_updates, **kwargs):
+        self._client._store._apply([("update", self, field_updates, False)])
+
+    async def delete(self, **kwargs):
+        self._client._store._apply([("delete", self, None, False)])
+
+
+class AsyncQuery:
+    def __init__(self, client, query):
+        self._client = client
+        self._query = query
+
+    def __getattr__(self, name):
+        method = getattr(self._query, name)
+        return lambda *args, **kwargs: AsyncQuery(self._client, method(*args, **kwargs))
+
+    def _wrap(self, snapshot):
+        snapshot.reference = AsyncDocumentReference(self._client, snapshot.reference.path)
+        return snapshot
+
+    async def stream(self, transaction=None, **kwargs):
+        for snapshot in self._query._run():
+            yield self._wrap(snapshot)
+
+    async def get(self, transaction=None, **kwargs):
+        return [self._wrap(snapshot) for snapshot in self._query._run()]
+
+
+class AsyncCollectionReference(AsyncQuery):
+    def __init__(self, client, path):
+        super().__init__(client, CollectionReference(client._store, path))
+        self.path = path
+        self.id = path.rsplit("/", 1)[-1]
+
+    def document(self, document_id=None):
+        return AsyncDocumentReference(self._client, f"{self.path}/{document_id or _auto_id()}")
+
+
+class AsyncFakeWriteBatch(FakeWriteBatch):
+    async def commit(self, retry=None, timeout=None):
+        return FakeWriteBatch.commit(self, retry, timeout)
+
+
+class AsyncFakeTransaction(AsyncFakeWriteBatch):
+    _read_only = False
+    _max_attempts = 1
+
+    def __init__(self, client):
+        super().__init__(client)
+        self._id = None
+
+    def _clean_up(self):
+        self._writes = []
+        self._id = None
+
+    async def _begin(self, retry_id=None):
+        self._id = b"fake-transaction"
+
+    async def _commit(self):
+        await self.commit()
+        self._id = None
+        return []
+
+    async def _rollback(self):
+        self._clean_up()
+
+
+class AsyncFakeFirestore:
+    """AsyncClient-shaped view of a FakeFirestore"""
+
+    def __init__(self, store):
+        self._store = store
+        self.project = store.project
+        # Async references and snapshots go through the shared store
+        self._lock = store._lock
+        self.docs = store.docs
+
+    def collection(self, *path):
+        return AsyncCollectionReference(self, "/".join(path))
+
+    def document(self, *path):
+        return AsyncDocumentReference(self, "/".join(path))
+
+    def batch(self):
+        return AsyncFakeWriteBatch(self._store)
+
+    def transaction(self, **kwargs):
+        return AsyncFakeTransaction(self._store)
+
+    def close(self):
+        pass
@@ -1,8 +1,9 @@
 import os
 import json
 import firebase_admin
-from firebase_admin import credentials, firestore, auth
+from firebase_admin import credentials, auth
 from config import FIREBASE_CONFIG_PATH
+from firestore_manager import create_pool
 
 # Priority 1: Check for FIREBASE_CONFIG environment variable (for Render)
 firebase_config_env = os.getenv("FIREBASE_CONFIG")
@@ -24,7 +25,8 @@ else:
 
 try:
 	firebase_admin.initialize_app(cred)
-	db = firestore.client()
+	# Pool of tuned, instrumented channels (see firestore_manager.py) instead of firestore.client()
+	db = create_pool(cred)
 	firebase_admin_initialized = True
 	print("✅ Firebase initialized successfully!")
 except Exception as e:
@@ -0,0 +1,339 @@
+"""
+Firestore client manager for MedTrust AI
+Builds the app's Firestore clients on tuned gRPC channels:
+  - a pool of FIRESTORE_CHANNEL_POOL_SIZE channels, assigned to threads
+    round-robin, so busy workers are not capped by the ~100 concurrent streams
+    of one HTTP/2 connection
+  - consistent per-operation deadlines and retry policies (the library
+    defaults allow 60-300 s per call, which would pin a request thread far
+    longer than any client waits)
+  - per-RPC latency metrics by operation and collection, collected by a
+    channel interceptor into metrics.py
+  - warm_up(), a cheap read on every channel at startup so the first request
+    on a worker does not pay for channel setup and the TLS handshake
+"""
+
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import grpc
+from google.api_core import exceptions as core_exceptions
+from google.api_core import gapic_v1
+from google.api_core import retry as retries
+from google.cloud import firestore
+from google.cloud.firestore_v1.services.firestore import client as firestore_client
+from google.cloud.firestore_v1.services.firestore.transports.grpc import FirestoreGrpcTransport
+
+import metrics
+
+# ---------- CONFIGURATION ----------
+CHANNEL_POOL_SIZE = max(1, int(os.getenv("FIRESTORE_CHANNEL_POOL_SIZE", "1")))
+LOOKUP_DEADLINE = float(os.getenv("FIRESTORE_LOOKUP_DEADLINE", "10"))   # seconds; document gets / get_all, transaction begin/rollback
+QUERY_DEADLINE = float(os.getenv("FIRESTORE_QUERY_DEADLINE", "30"))     # seconds; whole query stream
+WRITE_DEADLINE = float(os.getenv("FIRESTORE_WRITE_DEADLINE", "5"))      # seconds; commits and single-doc writes
+WARMUP_ON_START = os.getenv("FIRESTORE_WARMUP", "true").lower() == "true"
+WARMUP_COLLECTION = "users"
+WARMUP_DOC = "_warmup"
+
+# Same keepalive and message limits the library sets on its own channel, plus a
+# local subchannel pool: without it gRPC de-duplicates channels with identical
+# arguments onto one shared connection and the pool would not spread any load.
+CHANNEL_OPTIONS = [
+    ("grpc.max_send_message_length", -1),
+    ("grpc.max_receive_message_length", -1),
+    ("grpc.keepalive_time_ms", 30000),
+    ("grpc.use_local_subchannel_pool", 1),
+]
+
+def _retry(deadline, *errors):
+    return retries.Retry(initial=0.1, maximum=2.0, multiplier=1.3,
+                         predicate=retries.if_exception_type(*errors), deadline=deadline)
+
+
+# Reads are idempotent and retried on any transient error. Writes keep the
+# library's narrower predicate (the server rejected the call before applying
+# it) and are never retried on DeadlineExceeded, which may hide an applied write.
+_READ_ERRORS = (core_exceptions.DeadlineExceeded, core_exceptions.InternalServerError,
+                core_exceptions.ResourceExhausted, core_exceptions.ServiceUnavailable)
+_WRITE_ERRORS = (core_exceptions.ResourceExhausted, core_exceptions.ServiceUnavailable)
+
+RPC_POLICIES = {
+    # transport method: (deadline, retry)
+    "get_document": (LOOKUP_DEADLINE, _retry(LOOKUP_DEADLINE, *_READ_ERRORS)),
+    "list_collection_ids": (LOOKUP_DEADLINE, _retry(LOOKUP_DEADLINE, *_READ_ERRORS)),
+    "begin_transaction": (LOOKUP_DEADLINE, _retry(LOOKUP_DEADLINE, *_READ_ERRORS)),
+    "rollback": (LOOKUP_DEADLINE, _retry(LOOKUP_DEADLINE, *_READ_ERRORS)),
+    "batch_get_documents": (LOOKUP_DEADLINE, _retry(LOOKUP_DEADLINE, *_READ_ERRORS)),
+    "run_query": (QUERY_DEADLINE, _retry(QUERY_DEADLINE, *_READ_ERRORS)),
+    "run_aggregation_query": (QUERY_DEADLINE, _retry(QUERY_DEADLINE, *_READ_ERRORS)),
+    "list_documents": (QUERY_DEADLINE, _retry(QUERY_DEADLINE, *_READ_ERRORS)),
+    "partition_query": (QUERY_DEADLINE, _retry(QUERY_DEADLINE, *_READ_ERRORS)),
+    "commit": (WRITE_DEADLINE, _retry(WRITE_DEADLINE, *_WRITE_ERRORS)),
+    "batch_write": (WRITE_DEADLINE, _retry(WRITE_DEADLINE, core_exceptions.Aborted, *_WRITE_ERRORS)),
+    "create_document": (WRITE_DEADLINE, _retry(WRITE_DEADLINE, *_WRITE_ERRORS)),
+    "update_document": (WRITE_DEADLINE, _retry(WRITE_DEADLINE, *_WRITE_ERRORS)),
+    "delete_document": (WRITE_DEADLINE, _retry(WRITE_DEADLINE, *_WRITE_ERRORS)),
+}
+
+
+class RpcStats:
+    """Firestore RPC latency and errors by operation (RPC method) and collection"""
+
+    def __init__(self, latency=None, errors=None):
+        # Unregistered metrics by default, so a standalone RpcStats stays out of /metrics
+        self.latency = latency or metrics.Histogram("firestore_rpc_duration_seconds", "Firestore RPC latency",
+                                                    ("operation", "collection"), registry=None)
+        self.errors = errors or metrics.Counter("firestore_rpc_errors_total", "Failed Firestore RPCs",
+                                                ("operation", "collection", "code"), registry=None)
+
+    def record(self, method, seconds, code=grpc.StatusCode.OK, collection="-"):
+        self.latency.observe(seconds, operation=method, collection=collection)
+        if code not in (grpc.StatusCode.OK, grpc.StatusCode.CANCELLED):
+            self.errors.inc(operation=method, collection=collection, code=code.name)
+
+    def snapshot(self):
+        """
+        Current figures per RPC method, over all collections
+
+        Returns:
+            {"RunQuery": {"count", "errors", "avg_ms",
+                          "buckets": {"5": n, ..., "+Inf": n}}, ...}
+            with cumulative bucket counts, as in a Prometheus histogram
+        """
+        per_method = {}
+        for (method, _), series in self.latency.collect().items():
+            total = per_method.get(method)
+            per_method[method] = list(series) if total is None else [a + b for a, b in zip(total, series)]
+        errors = {}
+        for (method, _, _), count in self.errors.collect().items():
+            errors[method] = errors.get(method, 0) + count
+
+        bounds = [f"{bound * 1000:g}" for bound in self.latency.buckets] + ["+Inf"]
+        result = {}
+        for method, series in per_method.items():
+            summary = self.latency.summarize(series)
+            result[method] = {
+                "count": summary["count"],
+                "errors": errors.get(method, 0),
+                "avg_ms": round(summary["sum"] * 1000 / summary["count"], 2),
+                "buckets": dict(zip(bounds, summary["buckets"])),
+            }
+        return result
+
+
+rpc_stats = RpcStats(metrics.FIRESTORE_LATENCY, metrics.FIRESTORE_ERRORS)
+
+
+def _collection_path(path):
+    """Collection ids of a resource path: ".../documents/patient_timelines/p1/pages/0-1" -> "patient_timelines/pages" """
+    _, _, rest = path.partition("/documents/")
+    return "/".join(rest.split("/")[::2]) if rest else "-"
+
+
+def _query_paths(parent, query):
+    return [f"{parent}/{selector.collection_id}" for selector in query.from_]
+
+
+def _write_paths(writes):
+    return [write.update.name or write.delete or write.transform.document for write in writes]
+
+
+_REQUEST_PATHS = {
+    "GetDocument": lambda r: [r.name],
+    "DeleteDocument": lambda r: [r.name],
+    "UpdateDocument": lambda r: [r.document.name],
+    "CreateDocument": lambda r: [f"{r.parent}/{r.collection_id}"],
+    "ListDocuments": lambda r: [f"{r.parent}/{r.collection_id}"],
+    "BatchGetDocuments": lambda r: r.documents,
+    "RunQuery": lambda r: _query_paths(r.parent, r.structured_query),
+    "RunAggregationQuery": lambda r: _query_paths(r.parent, r.structured_aggregation_query.structured_query),
+    "Commit": lambda r: _write_paths(r.writes),
+    "BatchWrite": lambda r: _write_paths(r.writes),
+}
+
+
+def request_collection(method, request):
+    """
+    Collection an RPC touches, for metric labels
+
+    Returns:
+        e.g. "users" or "patient_timelines/pages"; "multi" for a commit
+        spanning several collections; "-" when there is none
+    """
+    paths = _REQUEST_PATHS.get(method)
+    if paths is None:
+        return "-"
+    try:
+        collections = {_collection_path(path) for path in paths(request)}
+    except Exception:
+        return "-"
+    if len(collections) > 1:
+        return "multi"
+    return collections.pop() if collections else "-"
+
+
+class RpcMetricsInterceptor(grpc.UnaryUnaryClientInterceptor, grpc.UnaryStreamClientInterceptor):
+    """
+    Times every RPC on a channel into an RpcStats. Streaming calls (queries,
+    document gets) are timed until the stream ends, i.e. the full read.
+    """
+
+    def __init__(self, stats=None):
+        self.stats = stats or rpc_stats
+
+    def _track(self, details, request, call, start):
+        method = details.method
+        if isinstance(method, bytes):
+            method = method.decode()
+        method = method.rsplit("/", 1)[-1]
+        collection = request_collection(method, request)
+
+        def done(*_):
+            self.stats.record(method, time.perf_counter() - start, call.code(), collection)
+        return done
+
+    def intercept_unary_unary(self, continuation, client_call_details, request):
+        start = time.perf_counter()
+        call = continuation(client_call_details, request)
+        call.add_done_callback(self._track(client_call_details, request, call, start))
+        return call
+
+    def intercept_unary_stream(self, continuation, client_call_details, request):
+        start = time.perf_counter()
+        call = continuation(client_call_details, request)
+        done = self._track(client_call_details, request, call, start)
+        if not call.add_callback(done):
+            done()  # already finished (e.g. failed before the first message)
+        return call
+
+
+class TunedFirestoreTransport(FirestoreGrpcTransport):
+    """gRPC transport whose default deadlines and retries come from RPC_POLICIES"""
+
+    def _prep_wrapped_messages(self, client_info):
+        super()._prep_wrapped_messages(client_info)
+        for name, (deadline, retry) in RPC_POLICIES.items():
+            method = getattr(self, name)
+            self._wrapped_methods[method] = gapic_v1.method.wrap_method(
+                method, default_retry=retry, default_timeout=deadline, client_info=client_info)
+
+
+def create_client(cred, stats=None):
+    """
+    Firestore client on its own tuned, instrumented channel
+
+    Args:
+        cred: firebase_admin credentials.Certificate
+        stats: RpcStats to record into (default: module-wide rpc_stats)
+
+    Returns:
+        google.cloud.firestore.Client
+    """
+    client = firestore.Client(project=cred.project_id, credentials=cred.get_credential())
+    if client._emulator_host is not None:
+        return client  # the library builds an insecure emulator channel itself
+
+    channel = FirestoreGrpcTransport.create_channel(client._target, credentials=client._credentials,
+                                                    options=CHANNEL_OPTIONS)
+    return install_channel(client, channel, stats)
+
+
+def install_channel(client, channel, stats=None):
+    """Route a Client's RPCs through `channel` with the tuned transport and metrics interceptor"""
+    channel = grpc.intercept_channel(channel, RpcMetricsInterceptor(stats))
+    transport = TunedFirestoreTransport(host=client._target, channel=channel, client_info=client._client_info)
+    # Client builds its GAPIC API lazily on first use (BaseClient._firestore_api_helper);
+    # installing it up front is the only hook for a custom channel and transport.
+    client._transport = transport
+    client._firestore_api_internal = firestore_client.FirestoreClient(
+        transport=transport, client_options=client._client_options)
+    return client
+
+
+class FirestorePool:
+    """
+    Pool of Firestore clients with the Client interface the app uses
+    (collection, batch, transaction, ...). Each thread is assigned one client,
+    round-robin on first use, and keeps it: the references a request builds
+    and the batch or transaction it writes them through always share a client,
+    so @transactional code behaves as with a single client.
+    """
+
+    def __init__(self, clients):
+        if not clients:
+            raise ValueError("FirestorePool needs at least one client")
+        self.clients = list(clients)
+        self._counter = itertools.count()
+        self._local = threading.local()
+
+    def __len__(self):
+        return len(self.clients)
+
+    def client(self):
+        """The calling thread's client"""
+        try:
+            return self._local.client
+        except AttributeError:
+            client = self._local.client = self.clients[next(self._counter) % len(self.clients)]
+            return client
+
+    def collection(self, *path):
+        return self.client().collection(*path)
+
+    def collection_group(self, collection_id):
+        return self.client().collection_group(collection_id)
+
+    def document(self, *path):
+        return self.client().document(*path)
+
+    def get_all(self, references, **kwargs):
+        return self.client().get_all(references, **kwargs)
+
+    def batch(self):
+        return self.client().batch()
+
+    def transaction(self, **kwargs):
+        return self.client().transaction(**kwargs)
+
+    def bulk_writer(self, **kwargs):
+        return self.client().bulk_writer(**kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.clients[0], name)
+
+
+def create_pool(cred, size=CHANNEL_POOL_SIZE, stats=None):
+    """FirestorePool of `size` clients, each on its own channel"""
+    return FirestorePool([create_client(cred, stats) for _ in range(max(1, size))])
+
+
+def warm_up(pool, timeout=LOOKUP_DEADLINE):
+    """
+    Open every channel in the pool with a cheap read (a field-less get of one
+    document), concurrently
+
+    Args:
+        pool: FirestorePool
+        timeout: deadline per warm-up read, seconds
+
+    Returns:
+        Number of channels that answered
+    """
+    def ping(client):
+        start = time.perf_counter()
+        try:
+            client.collection(WARMUP_COLLECTION).document(WARMUP_DOC).get(field_paths=[], timeout=timeout)
+            return (time.perf_counter() - start) * 1000
+        except Exception as e:
+            print(f"⚠️ Firestore channel warm-up failed: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=len(pool.clients), thread_name_prefix="firestore-warmup") as executor:
+        timings = [ms for ms in executor.map(ping, pool.clients) if ms is not None]
+    if timings:
+        print(f"🔥 Firestore channels warm: {len(timings)}/{len(pool.clients)} "
+              f"(slowest {max(timings):.0f} ms)")
+    return len(timings)
@@ -0,0 +1,186 @@
+"""
+Flagged-event review queue for MedTrust AI
+restricted_access / emergency_access decisions with status "Flagged" get a
+queue entry in the same batch as their access log event (see log_store).
+Entries carry a priority derived from the AI confidence and the clinician's
+trust score, and one `queue_key` field ("<state>|<inverted priority>|<timestamp>|<id>")
+that orders them, so "open items, highest priority first" is a single-field
+range scan and needs no composite index.
+
+Reviewers claim entries for FLAG_LEASE_SECONDS; an expired lease can be
+claimed by anyone. Status updates (single or bulk) are one transaction that
+updates the log events and closes their queue entries together. An event
+whose day has since moved to the cold archive can no longer be updated, but
+its queue entry is still closed (and records the review status).
+"""
+
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from google.cloud.firestore import FieldFilter, transactional
+
+from firebase_init import db, firebase_admin_initialized
+import log_store
+
+# ---------- CONFIGURATION ----------
+FLAG_LEASE_SECONDS = int(os.getenv("FLAG_LEASE_SECONDS", "900"))
+FLAG_PAGE_SIZE = 50
+MAX_BULK_UPDATE = 100   # up to 4 writes per event keeps one commit under Firestore's 500-write limit
+QUEUE_STATES = ("open", "claimed", "resolved")
+
+
+def flag_priority(ai_label, confidence, trust_score, accepted_labels):
+    """
+    Review priority for a flagged decision, 0 (low) to 100 (urgent)
+
+    Args:
+        ai_label: Label from analyze_justification
+        confidence: Model confidence for that label (0-1)
+        trust_score: Clinician trust score (0-100)
+        accepted_labels: Labels that would have allowed the access
+
+    A confident non-medical justification from a low-trust user ranks highest.
+    """
+    confidence = max(0.0, min(1.0, float(confidence or 0)))
+    suspicion = (1 - confidence) if ai_label in accepted_labels else confidence
+    distrust = 1 - max(0, min(100, trust_score if trust_score is not None else 80)) / 100
+    return int(round(100 * (0.6 * suspicion + 0.4 * distrust)))
+
+
+def _queue():
+    return db.collection(log_store.FLAG_COLLECTION)
+
+
+def _state_range(state):
+    return (_queue().order_by("queue_key")
+            .start_at({"queue_key": f"{state}|"})
+            .end_at({"queue_key": f"{state}|\uf8ff"}))
+
+
+def _item(snapshot):
+    return {**snapshot.to_dict(), "id": snapshot.get("log_id")}
+
+
+def list_flags(state="open", limit=FLAG_PAGE_SIZE, cursor=None):
+    """
+    One page of the review queue, highest priority first
+
+    Args:
+        state: "open", "claimed" or "resolved"
+        limit: Page size
+        cursor: next_cursor from the previous page
+
+    Returns:
+        (entries, next_cursor or None)
+    """
+    if not firebase_admin_initialized:
+        return [], None
+    query = _state_range(state)
+    if cursor:
+        query = query.start_after({"queue_key": cursor})
+    docs = list(query.limit(limit).stream())
+    next_cursor = docs[-1].get("queue_key") if len(docs) == limit else None
+    return [_item(doc) for doc in docs], next_cursor
+
+
+def _requeue(entry, state):
+    fid = log_store.flag_id(entry["log_id"])
+    return log_store.queue_key(state, entry.get("priority", 0), entry.get("timestamp", ""), fid)
+
+
+@transactional
+def _claim_txn(transaction, reviewer, limit, lease_seconds, now):
+    candidates = list(transaction.get(_state_range("open").limit(limit)))
+    if len(candidates) < limit:
+        # Only claimed entries have a nonzero lease; one range on it reads just the expired ones
+        expired = (_queue().where(filter=FieldFilter("lease_expires", ">", 0))
+                   .where(filter=FieldFilter("lease_expires", "<", now))
+                   .order_by("lease_expires").limit(limit - len(candidates)))
+        candidates += list(transaction.get(expired))
+    claimed = []
+    for doc in candidates:
+        entry = doc.to_dict()
+        updates = {
+            "state": "claimed",
+            "lease_owner": reviewer,
+            "lease_expires": now + lease_seconds,
+            "queue_key": _requeue(entry, "claimed"),
+        }
+        transaction.update(doc.reference, updates)
+        claimed.append({**entry, **updates, "id": entry["log_id"]})
+    return claimed
+
+
+def claim(reviewer, limit=10, lease_seconds=FLAG_LEASE_SECONDS):
+    """Lease up to `limit` of the highest-priority open (or lease-expired) entries to a reviewer"""
+    if not firebase_admin_initialized:
+        return []
+    return _claim_txn(db.transaction(), reviewer, limit, lease_seconds, time.time())
+
+
+@transactional
+def _set_status_txn(transaction, log_ids, status, reviewer, force, now):
+    log_refs = [log_store.log_ref(log_id) for log_id in log_ids]
+    flag_refs = [_queue().document(log_store.flag_id(log_id)) for log_id in log_ids]
+    # One round trip for every log event and queue entry involved
+    snapshots = {snap.reference.path: snap for snap in transaction.get_all(log_refs + flag_refs)}
+
+    result = {"updated": [], "archived": [], "missing": [], "conflicts": []}
+    changes = []
+    for log_id, log_ref, flag_ref in zip(log_ids, log_refs, flag_refs):
+        log_snap, flag_snap = snapshots.get(log_ref.path), snapshots.get(flag_ref.path)
+        entry = flag_snap.to_dict() if flag_snap is not None and flag_snap.exists else None
+        if not force and entry and entry.get("state") == "claimed" \
+                and entry.get("lease_owner") != reviewer and entry.get("lease_expires", 0) > now:
+            result["conflicts"].append(log_id)
+            continue
+        hot = log_snap is not None and log_snap.exists
+        if not hot and not entry:
+            result["missing"].append(log_id)
+            continue
+        changes.append((log_id, log_ref, flag_ref, entry, log_snap.to_dict() if hot else None))
+
+    # The clinician buckets and summaries that counted these events are read before any write
+    followups = log_store.status_change_writes(db, transaction, [(c[0], c[4]) for c in changes if c[4]], status)
+    for log_id, log_ref, flag_ref, entry, log_data in changes:
+        if log_data is not None:
+            transaction.update(log_ref, {"status": status})
+        if entry:
+            transaction.update(flag_ref, {
+                "state": "resolved",
+                "review_status": status,
+                "reviewed_by": reviewer,
+                "reviewed_at": now,
+                "lease_owner": None,
+                "lease_expires": 0,
+                "queue_key": _requeue(entry, "resolved"),
+            })
+        # Without the hot event (archived since it was flagged) only the queue entry is closed
+        result["updated" if log_data is not None else "archived"].append(log_id)
+    for ref, data, merge in followups:
+        transaction.set(ref, data, merge=merge)
+    return result
+
+
+def set_status(log_ids, status, reviewer=None, force=False):
+    """
+    Set the status of access log events and close their queue entries, in one commit;
+    the events' clinician day bucket entries and interaction summaries follow
+
+    Args:
+        log_ids: Up to MAX_BULK_UPDATE log ids
+        status: New status, e.g. "Resolved" or "Dismissed"
+        reviewer: Reviewer name; entries leased to someone else are skipped
+        force: Ignore leases (admin override)
+
+    Returns:
+        {"updated": [...], "archived": [...], "missing": [...], "conflicts": [...]} log ids;
+        "archived" events are no longer in Firestore, only their queue entries were closed
+    """
+    log_ids = list(dict.fromkeys(log_ids))
+    if len(log_ids) > MAX_BULK_UPDATE:
+        raise ValueError(f"At most {MAX_BULK_UPDATE} log ids per update")
+    return _set_status_txn(db.transaction(), log_ids, status, reviewer, force, time.time())
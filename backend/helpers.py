@@ -5,3 +5,42 @@ def patient_doc_id(name):
     if not name:
         return ""
     return re.sub(r"[^a-z0-9_\-]", "_", name.strip().lower())
+
+def iter_document_pages(collection_ref, page_size=200, start_after_id=None):
+    """
+    Yield pages (lists) of document snapshots ordered by document id.
+    Resumable: pass the id of the last document already processed as start_after_id.
+    """
+    while True:
+        query = collection_ref.order_by("__name__").limit(page_size)
+        if start_after_id:
+            query = query.start_after({"__name__": start_after_id})
+        page = list(query.stream())
+        if not page:
+            return
+        yield page
+        if len(page) < page_size:
+            return
+        start_after_id = page[-1].id
+
+def open_bulk_writer(db, max_attempts=5):
+    """
+    BulkWriter that records writes which still fail after max_attempts.
+    Returns (writer, failures); check failures after writer.flush() before checkpointing.
+    """
+    failures = []
+    writer = db.bulk_writer()
+
+    def on_error(failure, bulk_writer):
+        if failure.attempts < max_attempts:
+            return True
+        failures.append(failure)
+        return False
+
+    writer.on_write_error(on_error)
+    return writer, failures
+
+def raise_on_write_failures(failures):
+    if failures:
+        first = failures[0]
+        raise RuntimeError(f"{len(failures)} Firestore write(s) failed, first: {first.operation.reference.path}: {first.message}")
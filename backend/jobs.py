@@ -0,0 +1,421 @@
+"""
+Background job runner for MedTrust AI
+Runs long admin operations (migrations, re-encryption, backfills) on a bounded
+worker pool off the request path. Job state, progress and checkpoints live in a
+local SQLite file, so a job interrupted by a crash or restart resumes from its
+last checkpoint instead of starting over.
+
+Handlers are registered by kind:
+
+    @register_job("encrypt_legacy_patients")
+    def encrypt_legacy_patients(ctx, page_size=200):
+        cursor = ctx.checkpoint.get("last_doc_id")
+        ...
+        ctx.advance(len(page))
+        ctx.save_checkpoint({"last_doc_id": last_id})
+        ctx.check_cancelled()
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# ---------- CONFIGURATION ----------
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "jobs.sqlite3"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_PROGRESS_INTERVAL = 1.0   # seconds between progress writes (checkpoints are always written)
+JOB_HISTORY_LIMIT = 200       # finished jobs kept in the state file
+
+ACTIVE_STATUSES = ("pending", "running")
+
+_registry = {}
+
+
+def register_job(kind):
+    """Decorator registering handler(ctx, **params) for a job kind"""
+    def decorator(fn):
+        _registry[kind] = fn
+        return fn
+    return decorator
+
+
+def registered_kinds():
+    return sorted(_registry)
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobStore:
+    """Job rows in a SQLite file (WAL mode), shared by every worker process on the host"""
+
+    COLUMNS = ("id", "kind", "params", "status", "requested_by", "total", "done", "checkpoint",
+               "error", "cancel_requested", "owner_pid", "created_at", "started_at", "updated_at",
+               "finished_at", "run_started_at", "run_start_done")
+
+    def __init__(self, path=JOB_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY,"
+            " kind TEXT NOT NULL,"
+            " params TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " requested_by TEXT,"
+            " total INTEGER,"
+            " done INTEGER NOT NULL DEFAULT 0,"
+            " checkpoint TEXT,"
+            " error TEXT,"
+            " cancel_requested INTEGER NOT NULL DEFAULT 0,"
+            " owner_pid INTEGER,"
+            " created_at REAL NOT NULL,"
+            " started_at REAL,"
+            " updated_at REAL,"
+            " finished_at REAL,"
+            " run_started_at REAL,"
+            " run_start_done INTEGER)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status)")
+
+    def _conn(self):
+        # sqlite3 connections must stay on the thread (and process) that created them
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def _row(self, row):
+        if row is None:
+            return None
+        job = dict(zip(self.COLUMNS, row))
+        job["params"] = json.loads(job["params"])
+        job["checkpoint"] = json.loads(job["checkpoint"]) if job["checkpoint"] else {}
+        job["cancel_requested"] = bool(job["cancel_requested"])
+        return job
+
+    def create(self, kind, params, requested_by=None):
+        job_id = uuid.uuid4().hex[:12]
+        self._conn().execute(
+            "INSERT INTO jobs (id, kind, params, status, requested_by, created_at) VALUES (?, ?, ?, 'pending', ?, ?)",
+            (job_id, kind, json.dumps(params), requested_by, time.time())
+        )
+        return job_id
+
+    def get(self, job_id):
+        return self._row(self._conn().execute(
+            f"SELECT {', '.join(self.COLUMNS)} FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone())
+
+    def list(self, status=None, limit=50):
+        sql = f"SELECT {', '.join(self.COLUMNS)} FROM jobs"
+        args = ()
+        if status:
+            sql += " WHERE status = ?"
+            args = (status,)
+        sql += " ORDER BY created_at DESC LIMIT ?"
+        return [self._row(r) for r in self._conn().execute(sql, args + (limit,)).fetchall()]
+
+    def claim(self, job_id):
+        """Atomically move a pending job to running for this process; False if someone else has it"""
+        now = time.time()
+        cur = self._conn().execute(
+            "UPDATE jobs SET status = 'running', owner_pid = ?, started_at = COALESCE(started_at, ?),"
+            " run_started_at = ?, run_start_done = done, updated_at = ?"
+            " WHERE id = ? AND status = 'pending'",
+            (os.getpid(), now, now, now, job_id)
+        )
+        return cur.rowcount == 1
+
+    def progress(self, job_id, done, total):
+        row = self._conn().execute(
+            "UPDATE jobs SET done = ?, total = COALESCE(?, total), updated_at = ? WHERE id = ? RETURNING cancel_requested",
+            (done, total, time.time(), job_id)
+        ).fetchone()
+        return bool(row and row[0])
+
+    def checkpoint(self, job_id, state, done, total):
+        self._conn().execute(
+            "UPDATE jobs SET checkpoint = ?, done = ?, total = COALESCE(?, total), updated_at = ? WHERE id = ?",
+            (json.dumps(state), done, total, time.time(), job_id)
+        )
+
+    def finish(self, job_id, status, error=None):
+        now = time.time()
+        self._conn().execute(
+            "UPDATE jobs SET status = ?, error = ?, finished_at = ?, updated_at = ?, owner_pid = NULL WHERE id = ?",
+            (status, error, now, now, job_id)
+        )
+
+    def request_cancel(self, job_id):
+        """Flag a job for cancellation; pending jobs are cancelled immediately"""
+        now = time.time()
+        cur = self._conn().execute(
+            "UPDATE jobs SET cancel_requested = 1, updated_at = ?,"
+            " finished_at = CASE WHEN status = 'pending' THEN ? ELSE finished_at END,"
+            " status = CASE WHEN status = 'pending' THEN 'cancelled' ELSE status END"
+            " WHERE id = ? AND status IN ('pending', 'running')",
+            (now, now, job_id)
+        )
+        return cur.rowcount == 1
+
+    def requeue_orphans(self):
+        """Return running jobs whose owner process is gone to pending (they resume from their checkpoint)"""
+        orphans = []
+        for job_id, pid in self._conn().execute("SELECT id, owner_pid FROM jobs WHERE status = 'running'").fetchall():
+            # start() runs before this process claims anything, so our own pid here is a previous
+            # incarnation (containers restart as the same pid)
+            if pid == os.getpid() or not _pid_alive(pid):
+                self._conn().execute(
+                    "UPDATE jobs SET status = 'pending', owner_pid = NULL WHERE id = ? AND status = 'running'", (job_id,)
+                )
+                orphans.append(job_id)
+        return orphans
+
+    def pending_ids(self):
+        return [r[0] for r in self._conn().execute(
+            "SELECT id FROM jobs WHERE status = 'pending' ORDER BY created_at"
+        ).fetchall()]
+
+    def prune(self, keep=JOB_HISTORY_LIMIT):
+        self._conn().execute(
+            "DELETE FROM jobs WHERE status NOT IN ('pending', 'running') AND id NOT IN ("
+            " SELECT id FROM jobs WHERE status NOT IN ('pending', 'running') ORDER BY finished_at DESC LIMIT ?)",
+            (keep,)
+        )
+
+
+def _pid_alive(pid):
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobContext:
+    """Handed to a job handler: checkpoint state, progress reporting and cancellation"""
+
+    def __init__(self, store, job):
+        self.store = store
+        self.job_id = job["id"]
+        self.params = job["params"]
+        self.checkpoint = job["checkpoint"]
+        self.done = job["done"] or 0
+        self.total = job["total"]
+        self._cancel = threading.Event()
+        if job["cancel_requested"]:
+            self._cancel.set()
+        self._last_write = 0.0
+
+    def set_total(self, total):
+        self.total = total
+        self.store.progress(self.job_id, self.done, total)
+
+    def advance(self, n=1):
+        """Record n more units of work; progress is written at most every JOB_PROGRESS_INTERVAL"""
+        self.done += n
+        now = time.monotonic()
+        if now - self._last_write >= JOB_PROGRESS_INTERVAL:
+            self._last_write = now
+            if self.store.progress(self.job_id, self.done, self.total):
+                self._cancel.set()
+
+    def save_checkpoint(self, state):
+        """Persist resume state; the handler reads it back from ctx.checkpoint after a restart"""
+        self.checkpoint = state
+        self.store.checkpoint(self.job_id, state, self.done, self.total)
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def check_cancelled(self):
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+
+def job_summary(job):
+    """Public view of a job row with progress percentage and ETA"""
+    now = time.time()
+    total, done = job["total"], job["done"] or 0
+    eta = None
+    rate = 0.0
+    if job["status"] == "running" and job["run_started_at"]:
+        elapsed = now - job["run_started_at"]
+        run_done = done - (job["run_start_done"] or 0)
+        rate = run_done / elapsed if elapsed > 0 else 0.0
+        if rate > 0 and total:
+            eta = round(max(total - done, 0) / rate, 1)
+    return {
+        "job_id": job["id"],
+        "kind": job["kind"],
+        "params": job["params"],
+        "status": job["status"],
+        "requested_by": job["requested_by"],
+        "done": done,
+        "total": total,
+        "percent": round(done * 100.0 / total, 1) if total else None,
+        "rate_per_second": round(rate, 2),
+        "eta_seconds": eta,
+        "error": job["error"],
+        "cancel_requested": job["cancel_requested"],
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+    }
+
+
+class JobRunner:
+    """Bounded thread pool executing registered jobs recorded in a JobStore"""
+
+    def __init__(self, store=None, workers=JOB_WORKERS):
+        self._store = store
+        self.workers = workers
+        self._pool = None
+        self._pool_pid = None
+        self._started_pid = None
+        self._contexts = {}
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+
+    @property
+    def store(self):
+        # Opened lazily so importing this module never touches the filesystem
+        if self._store is None:
+            with self._lock:
+                if self._store is None:
+                    self._store = JobStore()
+        return self._store
+
+    def _executor(self):
+        with self._lock:
+            # A pool inherited through fork has no worker threads in this process
+            if self._pool is None or self._pool_pid != os.getpid():
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job-worker")
+                self._pool_pid = os.getpid()
+            return self._pool
+
+    def start(self):
+        """Resume jobs left pending or orphaned by a previous process"""
+        orphans = self.store.requeue_orphans()
+        pending = self.store.pending_ids()
+        for job_id in pending:
+            self._executor().submit(self._run, job_id)
+        if pending:
+            print(f"🧰 Job runner resumed {len(pending)} job(s) ({len(orphans)} interrupted)")
+
+    def ensure_started(self):
+        """
+        start() once per process. Called from the app's first request rather than at
+        import, so a gunicorn --preload master or the Werkzeug reloader's watcher never
+        claims jobs (under its own pid) that no serving process would then run.
+        """
+        if self._started_pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._started_pid == os.getpid():
+                return
+            # Marked first: a failing start is reported once, not on every request
+            self._started_pid = os.getpid()
+            self.start()
+
+    def submit(self, kind, params=None, requested_by=None):
+        """Queue a job; returns its id. Raises KeyError for an unknown kind"""
+        if kind not in _registry:
+            raise KeyError(f"Unknown job kind '{kind}'")
+        job_id = self.store.create(kind, params or {}, requested_by)
+        self._executor().submit(self._run, job_id)
+        return job_id
+
+    def cancel(self, job_id):
+        ok = self.store.request_cancel(job_id)
+        ctx = self._contexts.get(job_id)
+        if ctx:
+            ctx._cancel.set()
+        return ok
+
+    def get(self, job_id):
+        job = self.store.get(job_id)
+        return job_summary(job) if job else None
+
+    def list(self, status=None, limit=50):
+        return [job_summary(j) for j in self.store.list(status, limit)]
+
+    def _run(self, job_id):
+        store = self.store
+        if not store.claim(job_id):
+            return
+        job = store.get(job_id)
+        handler = _registry.get(job["kind"])
+        if handler is None:
+            store.finish(job_id, "failed", f"Unknown job kind '{job['kind']}'")
+            return
+        ctx = JobContext(store, job)
+        self._contexts[job_id] = ctx
+        print(f"🧰 Job {job_id} ({job['kind']}) started")
+        try:
+            ctx.check_cancelled()
+            handler(ctx, **job["params"])
+            store.progress(job_id, ctx.done, ctx.total)
+            store.finish(job_id, "completed")
+            print(f"✅ Job {job_id} ({job['kind']}) completed: {ctx.done} processed")
+        except JobCancelled:
+            store.progress(job_id, ctx.done, ctx.total)
+            store.finish(job_id, "cancelled")
+            print(f"🛑 Job {job_id} ({job['kind']}) cancelled at {ctx.done}")
+        except Exception as e:
+            store.progress(job_id, ctx.done, ctx.total)
+            store.finish(job_id, "failed", str(e))
+            print(f"❌ Job {job_id} ({job['kind']}) failed: {e}")
+            traceback.print_exc()
+        finally:
+            self._contexts.pop(job_id, None)
+            store.prune()
+
+    def wait(self, job_id, timeout=None, poll=0.05):
+        """Block until a job leaves pending/running (scripts and tests)"""
+        deadline = time.monotonic() + timeout if timeout else None
+        while True:
+            job = self.store.get(job_id)
+            if job is None or job["status"] not in ACTIVE_STATUSES:
+                return job_summary(job) if job else None
+            if deadline and time.monotonic() > deadline:
+                return job_summary(job)
+            time.sleep(poll)
+
+
+job_runner = JobRunner()
+
+
+def run_job_cli(kind, params=None, poll=2.0):
+    """
+    Run a job from a command-line script and print progress until it finishes.
+    An unfinished job of the same kind (e.g. the script crashed) is resumed
+    from its checkpoint instead of starting a new one.
+    """
+    job_runner.start()
+    active = [j for j in job_runner.list(limit=JOB_HISTORY_LIMIT) if j["kind"] == kind and j["status"] in ACTIVE_STATUSES]
+    job_id = active[-1]["job_id"] if active else job_runner.submit(kind, params or {}, "cli")
+    print(f"🧰 {'Resuming' if active else 'Started'} job {job_id} ({kind})")
+    while True:
+        job = job_runner.wait(job_id, timeout=poll)
+        total = job["total"] if job["total"] is not None else "?"
+        eta = f", ETA {job['eta_seconds']}s" if job["eta_seconds"] is not None else ""
+        print(f"   {job['status']}: {job['done']}/{total}{eta}")
+        if job["status"] not in ACTIVE_STATUSES:
+            return job
@@ -0,0 +1,63 @@
+"""
+JSON serialization for MedTrust AI
+Flask JSON provider backed by orjson, which serializes the large patient and
+log lists several times faster than the standard library and writes bytes
+straight into the response. datetimes (including Firestore's
+DatetimeWithNanoseconds) become ISO 8601 strings. Without orjson installed the
+app keeps Flask's default provider.
+"""
+
+from datetime import datetime
+
+from flask.json.provider import DefaultJSONProvider, _default as flask_default
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(o):
+    # orjson handles datetime itself but not subclasses such as DatetimeWithNanoseconds
+    if isinstance(o, datetime):
+        return o.isoformat()
+    if isinstance(o, (set, frozenset)):
+        return list(o)
+    return flask_default(o)
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """DefaultJSONProvider with orjson for dumps, loads and jsonify responses"""
+
+    def _option(self, indent=False):
+        option = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            # json.dumps-specific arguments (cls, separators, ...): keep the standard behaviour
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=_default, option=self._option()).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        body = orjson.dumps(obj, default=_default, option=self._option(indent) | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def init_json(app):
+    """Use the orjson provider for the app when orjson is available"""
+    if orjson is None:
+        print("ℹ️ orjson not installed - using the standard JSON provider")
+        return
+    app.json = OrjsonProvider(app)
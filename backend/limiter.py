@@ -1,8 +1,27 @@
+import os
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 
+# memory:// keeps separate counters per worker; use a shared backend in production:
+#   mmap:///tmp/medtrust_ratelimit.bin  - counter table shared by all workers on this host
+#   redis://localhost:6379              - shared across hosts (needs the redis package)
+RATELIMIT_STORAGE_URI = os.getenv("RATELIMIT_STORAGE_URI", "memory://")
+# fixed-window, moving-window, or sliding-window-counter (moving window without per-hit entries).
+# mmap:// keeps one counter per key, so it supports fixed-window and sliding-window-counter only
+RATELIMIT_STRATEGY = os.getenv("RATELIMIT_STRATEGY", "fixed-window")
+# Shared with async_access.py, so both apps count a client against the same quota
+RATELIMIT_KEY_FUNC = get_remote_address
+DEFAULT_LIMITS = ["2000 per day", "500 per hour"]
+
+if RATELIMIT_STORAGE_URI.startswith("mmap://"):
+    if RATELIMIT_STRATEGY == "moving-window":
+        raise ValueError("RATELIMIT_STRATEGY=moving-window needs per-hit entries, which mmap:// storage does not keep; "
+                         "use sliding-window-counter (or fixed-window) with mmap://")
+    import limiter_storage  # noqa: F401  registers the mmap:// scheme (POSIX only)
+
 limiter = Limiter(
-    key_func=get_remote_address,
-    default_limits=["2000 per day", "500 per hour"],
-    storage_uri="memory://" 
+    key_func=RATELIMIT_KEY_FUNC,
+    default_limits=DEFAULT_LIMITS,
+    storage_uri=RATELIMIT_STORAGE_URI,
+    strategy=RATELIMIT_STRATEGY
 )
@@ -0,0 +1,199 @@
+"""
+Shared rate limit storage for MedTrust AI
+A fixed-size counter table in a memory-mapped file, shared by every worker on the host
+
+Importing this module registers the ``mmap://`` scheme with the limits library, e.g.
+    RATELIMIT_STORAGE_URI=mmap:///tmp/medtrust_ratelimit.bin?slots=65536
+"""
+
+import fcntl
+import hashlib
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+import urllib.parse
+
+from limits.storage import Storage
+from limits.storage.base import SlidingWindowCounterSupport, TimestampedSlidingWindow
+
+# Slot layout: key hash (0 = never used), expiry timestamp, counter, padding
+_SLOT = struct.Struct("<Qdq8x")
+DEFAULT_SLOTS = 65536
+MAX_PROBE = 32
+
+
+class MmapStorage(Storage, SlidingWindowCounterSupport, TimestampedSlidingWindow):
+    """
+    Open-addressed table of (key hash, expiry, count) slots in an mmap'd file.
+    Every operation touches a bounded number of fixed slots, so hits never allocate.
+    An flock on the file serialises workers; a thread lock serialises threads.
+    """
+
+    STORAGE_SCHEME = ["mmap"]
+
+    def __init__(self, uri=None, wrap_exceptions=False, **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        parsed = urllib.parse.urlparse(uri or "mmap:///tmp/medtrust_ratelimit.bin")
+        self.path = parsed.netloc + parsed.path
+        query = urllib.parse.parse_qs(parsed.query)
+        slots = int(query.get("slots", [options.get("slots", DEFAULT_SLOTS)])[0])
+
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            size = os.fstat(self._fd).st_size
+            if size < _SLOT.size:
+                os.ftruncate(self._fd, slots * _SLOT.size)
+                size = slots * _SLOT.size
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        # An existing table keeps its size so all workers agree on the slot count
+        self.slots = size // _SLOT.size
+        self._map = mmap.mmap(self._fd, self.slots * _SLOT.size)
+        self._guard = _FileLock(threading.Lock(), self._fd)
+
+    @property
+    def base_exceptions(self):
+        return OSError
+
+    # ---------- table primitives (call with self._guard held) ----------
+    @staticmethod
+    def _hash(key):
+        h = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little")
+        return h or 1
+
+    def _read(self, index):
+        return _SLOT.unpack_from(self._map, index * _SLOT.size)
+
+    def _write(self, index, key_hash, expiry, count):
+        _SLOT.pack_into(self._map, index * _SLOT.size, key_hash, expiry, count)
+
+    def _find(self, key_hash, now, create):
+        """
+        Return (slot index, expiry, live count) for key_hash, or None if absent and not creating.
+        Expired slots keep their hash so probe chains stay intact; they are reused on insert.
+        """
+        start = key_hash % self.slots
+        reusable = None
+        oldest = None
+        for i in range(MAX_PROBE):
+            index = (start + i) % self.slots
+            slot_hash, expiry, count = self._read(index)
+            if slot_hash == key_hash:
+                if expiry <= now:
+                    return index, 0.0, 0
+                return index, expiry, count
+            if slot_hash == 0:
+                if reusable is None:
+                    reusable = index
+                break
+            if expiry <= now and reusable is None:
+                reusable = index
+            if oldest is None or expiry < oldest[1]:
+                oldest = (index, expiry)
+        if not create:
+            return None
+        # Table region is full of live keys: evict the one closest to expiring
+        index = reusable if reusable is not None else oldest[0]
+        self._write(index, key_hash, 0.0, 0)
+        return index, 0.0, 0
+
+    def _incr(self, key, expiry, amount, now):
+        key_hash = self._hash(key)
+        index, slot_expiry, count = self._find(key_hash, now, create=True)
+        if count == 0:
+            slot_expiry = now + expiry
+        count += amount
+        self._write(index, key_hash, slot_expiry, count)
+        return count
+
+    def _get(self, key, now):
+        found = self._find(self._hash(key), now, create=False)
+        return found[2] if found else 0
+
+    # ---------- limits.storage.Storage ----------
+    def incr(self, key, expiry, amount=1):
+        with self._guard:
+            return self._incr(key, expiry, amount, time.time())
+
+    def get(self, key):
+        with self._guard:
+            return self._get(key, time.time())
+
+    def get_expiry(self, key):
+        now = time.time()
+        with self._guard:
+            found = self._find(self._hash(key), now, create=False)
+        return found[1] if found and found[2] else now
+
+    def check(self):
+        return not self._map.closed
+
+    def reset(self):
+        with self._guard:
+            now = time.time()
+            live = sum(1 for i in range(self.slots) if self._read(i)[1] > now)
+            self._map[:] = bytes(len(self._map))
+        return live
+
+    def clear(self, key):
+        key_hash = self._hash(key)
+        with self._guard:
+            found = self._find(key_hash, time.time(), create=False)
+            if found:
+                self._write(found[0], key_hash, 0.0, 0)
+
+    # ---------- sliding window counter (moving-window approximation without per-hit entries) ----------
+    def _sliding_window_info(self, key, expiry, now):
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+        previous_count = self._get(previous_key, now)
+        current_count = self._get(current_key, now)
+        previous_ttl = 0.0
+        if previous_count:
+            previous_ttl = (1 - (((now - expiry) / expiry) % 1)) * expiry
+        current_ttl = (1 - ((now / expiry) % 1)) * expiry + expiry
+        return previous_count, previous_ttl, current_count, current_ttl
+
+    def acquire_sliding_window_entry(self, key, limit, expiry, amount=1):
+        if amount > limit:
+            return False
+        now = time.time()
+        with self._guard:
+            previous_count, previous_ttl, current_count, _ = self._sliding_window_info(key, expiry, now)
+            weighted = previous_count * previous_ttl / expiry + current_count
+            if math.floor(weighted) + amount > limit:
+                return False
+            # Check and increment under one lock, so no revert step is needed
+            _, current_key = self.sliding_window_keys(key, expiry, now)
+            self._incr(current_key, 2 * expiry, amount, now)
+            return True
+
+    def get_sliding_window(self, key, expiry):
+        with self._guard:
+            return self._sliding_window_info(key, expiry, time.time())
+
+    def clear_sliding_window(self, key, expiry):
+        previous_key, current_key = self.sliding_window_keys(key, expiry, time.time())
+        self.clear(previous_key)
+        self.clear(current_key)
+
+
+class _FileLock:
+    """Thread lock plus an exclusive flock, held for one table operation"""
+
+    __slots__ = ("_lock", "_fd")
+
+    def __init__(self, lock, fd):
+        self._lock = lock
+        self._fd = fd
+
+    def __enter__(self):
+        self._lock.acquire()
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+
+    def __exit__(self, *exc):
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._lock.release()
@@ -0,0 +1,189 @@
+"""
+Cold audit log archive for MedTrust AI
+Access events older than LOG_ARCHIVE_AFTER_DAYS are moved out of Firestore by
+the archive_access_logs job into date-partitioned, gzip-compressed NDJSON:
+
+    <LOG_ARCHIVE_DIR>/date=<YYYY-MM-DD>/events.ndjson.gz            access events (with "id")
+    <LOG_ARCHIVE_DIR>/date=<YYYY-MM-DD>/clinician_days.ndjson.gz    clinician day buckets
+    <LOG_ARCHIVE_DIR>/date=<YYYY-MM-DD>/index.json                  counts and distinct values
+
+Readers prune partitions by date from the directory names and by
+clinician, patient or status from index.json, so only partitions that can
+match are decompressed. The directory can be a mounted object storage bucket.
+log_store unions these results with the hot Firestore tier.
+"""
+
+import gzip
+import json
+import os
+import tempfile
+import threading
+
+# ---------- CONFIGURATION ----------
+LOG_ARCHIVE_DIR = os.getenv("LOG_ARCHIVE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "log_archive"))
+LOG_ARCHIVE_AFTER_DAYS = int(os.getenv("LOG_ARCHIVE_AFTER_DAYS", "90"))
+
+EVENTS_FILE = "events.ndjson.gz"
+CLINICIAN_FILE = "clinician_days.ndjson.gz"
+INDEX_FILE = "index.json"
+PARTITION_PREFIX = "date="
+
+
+def _clinician(role, name):
+    return f"{(role or '').lower()}:{(name or '').strip().lower()}"
+
+
+class LogArchive:
+    """Date-partitioned compressed NDJSON store for archived access logs"""
+
+    def __init__(self, directory=LOG_ARCHIVE_DIR):
+        self.directory = directory
+        self._indexes = {}   # date -> (index.json mtime, index)
+        self._lock = threading.Lock()
+
+    def _path(self, date, filename):
+        return os.path.join(self.directory, PARTITION_PREFIX + date, filename)
+
+    def dates(self, start_date=None, end_date=None):
+        """Archived dates, newest first; bounds are inclusive YYYY-MM-DD"""
+        if not os.path.isdir(self.directory):
+            return []
+        dates = []
+        for entry in os.listdir(self.directory):
+            if not entry.startswith(PARTITION_PREFIX):
+                continue
+            date = entry[len(PARTITION_PREFIX):]
+            if (start_date and date < start_date) or (end_date and date > end_date):
+                continue
+            if os.path.exists(self._path(date, INDEX_FILE)):
+                dates.append(date)
+        return sorted(dates, reverse=True)
+
+    def _iter_rows(self, date, filename):
+        """Rows of a partition file, decompressed and parsed one line at a time"""
+        path = self._path(date, filename)
+        if not os.path.exists(path):
+            return
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    # ---------- writing ----------
+    def _read_rows(self, date, filename):
+        return list(self._iter_rows(date, filename))
+
+    def _write_atomic(self, date, filename, data):
+        directory = os.path.dirname(self._path(date, filename))
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, self._path(date, filename))
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def write_partition(self, date, events, clinician_days=()):
+        """
+        Add events and clinician day buckets to a date partition
+
+        Args:
+            date: YYYY-MM-DD
+            events: Event dicts, each with its log "id"
+            clinician_days: Clinician day bucket dicts (role, clinician_name, date, events)
+
+        Merges with anything already archived for the date (events by id,
+        buckets by clinician), so re-archiving a day is harmless. index.json
+        is replaced last; a partition without it is ignored by readers.
+        """
+        os.makedirs(os.path.dirname(self._path(date, INDEX_FILE)), exist_ok=True)
+        merged = {e["id"]: e for e in self._read_rows(date, EVENTS_FILE)}
+        merged.update((e["id"], e) for e in events)
+        rows = sorted(merged.values(), key=lambda e: e.get("timestamp", ""), reverse=True)
+
+        buckets = {_clinician(b.get("role"), b.get("clinician_name")): b for b in self._read_rows(date, CLINICIAN_FILE)}
+        for bucket in clinician_days:
+            key = _clinician(bucket.get("role"), bucket.get("clinician_name"))
+            if key in buckets:
+                known = {e.get("log_id") for e in buckets[key].get("events", [])}
+                buckets[key]["events"] += [e for e in bucket.get("events", []) if e.get("log_id") not in known]
+            else:
+                buckets[key] = bucket
+
+        for filename, items in ((EVENTS_FILE, rows), (CLINICIAN_FILE, list(buckets.values()))):
+            body = "".join(json.dumps(item, default=str, sort_keys=True) + "\n" for item in items)
+            self._write_atomic(date, filename, gzip.compress(body.encode("utf-8")))
+
+        index = {
+            "date": date,
+            "events": len(rows),
+            "statuses": sorted({str(e.get("status", "")) for e in rows}),
+            "patients": sorted({str(e.get("patient_name", "")).strip().lower() for e in rows}),
+            "clinicians": sorted(buckets),
+        }
+        self._write_atomic(date, INDEX_FILE, json.dumps(index, sort_keys=True).encode("utf-8"))
+        return len(rows)
+
+    # ---------- reading ----------
+    def index(self, date):
+        path = self._path(date, INDEX_FILE)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return None
+        with self._lock:
+            cached = self._indexes.get(date)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        with open(path, encoding="utf-8") as f:
+            index = json.load(f)
+        with self._lock:
+            self._indexes[date] = (mtime, index)
+        return index
+
+    def events(self, start_date=None, end_date=None, status=None, patient_names=None, limit=None):
+        """
+        Archived access events, newest first
+
+        Args:
+            start_date, end_date: Optional inclusive YYYY-MM-DD bounds
+            status: Only events with this status
+            patient_names: Only events for these patient names (any case)
+            limit: Stop after this many events
+        """
+        names = {n.strip().lower() for n in patient_names} if patient_names else None
+        found = 0
+        for date in self.dates(start_date, end_date):
+            index = self.index(date) or {}
+            if status and status not in index.get("statuses", []):
+                continue
+            if names and not names.intersection(index.get("patients", [])):
+                continue
+            for event in self._iter_rows(date, EVENTS_FILE):
+                if status and event.get("status") != status:
+                    continue
+                if names and str(event.get("patient_name", "")).strip().lower() not in names:
+                    continue
+                yield event
+                found += 1
+                if limit and found >= limit:
+                    return
+
+    def clinician_days(self, role, name=None, start_date=None, end_date=None):
+        """Archived clinician day buckets for one role (and optionally one clinician), newest first"""
+        if name:
+            key = _clinician(role, name)
+            matches = lambda k: k == key
+        else:
+            prefix = f"{role.lower()}:"
+            matches = lambda k: k.startswith(prefix)
+        for date in self.dates(start_date, end_date):
+            if not any(matches(k) for k in (self.index(date) or {}).get("clinicians", [])):
+                continue
+            for bucket in self._iter_rows(date, CLINICIAN_FILE):
+                if matches(_clinician(bucket.get("role"), bucket.get("clinician_name"))):
+                    yield bucket
+
+
+log_archive = LogArchive()
@@ -0,0 +1,630 @@
+"""
+Access log store for MedTrust AI
+Every access event is written once, into the bucket for its day:
+
+    access_log_days/<YYYY-MM-DD>                    manifest entry {"date"}
+    access_log_days/<YYYY-MM-DD>/log_events/<id>    the event
+
+Log ids are "<YYYY-MM-DD>/<id>". "Last N events" and date-range views walk the
+manifest newest first and read only the days they need, so their cost does
+not grow with history. Events still in the old flat `access_logs` collection
+are moved with the bucket_access_logs job.
+
+Events that belong to a clinician's own history (the old DoctorAccessLog /
+NurseAccessLog copies) also append a compact entry to that clinician's day
+bucket, in the same batch:
+
+    clinician_log_days/<role>__<name>__<YYYY-MM-DD>
+        {"role", "clinician_name", "date", "events": [{log_id, patient_name, action, status, timestamp}, ...]}
+
+A clinician's history is then one id-range scan over a handful of day
+documents instead of a query over every event by an unindexed name string.
+Entries are keyed by log id, so re-staging an event (backfill) is idempotent.
+
+A doctor's event for a patient also bumps their interaction summary in the
+same batch (counts, last access and a status histogram, via field transforms,
+so no read is needed):
+
+    interaction_summaries/doctor__<name>__<patient doc id>
+        {"doctor_name", "patient_name", "access_count", "last_access", "statuses": {status: count}}
+
+Events that name a patient are then appended to the patient's timeline
+(patient_timeline.py), which serves the patient history view. patient_events,
+a collection-group query on log_events.patient_name, remains for raw event
+lookups; it needs the collection-group single-field index for that field.
+
+Flagged decisions also get a review queue entry in the same batch, see
+flag_queue.py:
+
+    flagged_events/<YYYY-MM-DD>_<id>    {"log_id", "priority", "state", "queue_key", ...}
+
+Days older than LOG_ARCHIVE_AFTER_DAYS are moved to the cold archive
+(log_archive.py) by the archive_access_logs job; every reader here returns
+the union of both tiers.
+
+Until the bucket_access_logs and backfill_clinician_logs jobs have finished,
+readers also merge in the legacy flat collections (access_logs,
+DoctorAccessLog, NurseAccessLog), so no history disappears in between. Each
+job records completion in log_migrations/<collection>; a migrated (or empty)
+collection is not read again.
+"""
+
+import sys
+import os
+import time
+from datetime import datetime
+from urllib.parse import quote
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from google.cloud.firestore import ArrayUnion, FieldFilter, Increment, Query
+
+from firebase_init import db, firebase_admin_initialized
+from helpers import patient_doc_id
+from log_archive import log_archive
+import patient_timeline
+import response_cache
+from firestore_manager import WRITE_DEADLINE
+
+# ---------- CONFIGURATION ----------
+LEGACY_LOG_COLLECTION = "access_logs"
+# Per-role copies written before day buckets: role -> (collection, name field)
+LEGACY_CLINICIAN_LOGS = {"doctor": ("DoctorAccessLog", "doctor_name"), "nurse": ("NurseAccessLog", "nurse_name")}
+MIGRATION_COLLECTION = "log_migrations"
+LEGACY_RECHECK_SECONDS = 60   # how often a pending migration is looked up again
+DAY_COLLECTION = "access_log_days"
+EVENT_COLLECTION = "log_events"
+UNDATED = "0000-00-00"  # bucket for events without a timestamp
+BUCKET_COLLECTION = "clinician_log_days"
+FLAG_COLLECTION = "flagged_events"
+SUMMARY_COLLECTION = "interaction_summaries"
+FLAG_FIELDS = ("doctor_name", "doctor_role", "patient_name", "action", "ai_label", "timestamp")
+CLINICIAN_ROLES = ("doctor", "nurse")
+ENTRY_FIELDS = ("patient_name", "action", "status", "timestamp")
+LOG_WRITE_TIMEOUT = WRITE_DEADLINE   # seconds
+
+# Days whose manifest entry this process has already written
+_known_days = set()
+# Legacy collection -> (still pending, monotonic time checked)
+_legacy_state = {}
+
+
+def log_date(log_data):
+    return (log_data.get("timestamp") or "").split(" ")[0] or UNDATED
+
+
+def event_ref(client, date, doc_id=None):
+    """Reference to an event in a day bucket; works with the sync and async clients"""
+    events = client.collection(DAY_COLLECTION).document(date).collection(EVENT_COLLECTION)
+    return events.document(doc_id) if doc_id else events.document()
+
+
+def make_log_id(date, doc_id):
+    return f"{date}/{doc_id}"
+
+
+def log_ref(log_id):
+    """Document reference for a log id; ids without a day are events not yet moved out of access_logs"""
+    if "/" in log_id:
+        date, doc_id = log_id.split("/", 1)
+        return event_ref(db, date, doc_id)
+    return db.collection(LEGACY_LOG_COLLECTION).document(log_id)
+
+
+def clinician_key(role, name):
+    # quote() never escapes "_", so do it by hand: "__" must only separate role, name and date
+    return f"{role.lower()}__{quote(str(name).strip().lower(), safe='@.-').replace('_', '%5F')}"
+
+
+def bucket_id(role, name, date):
+    return f"{clinician_key(role, name)}__{date}"
+
+
+def _entry(log_id, log_data, role, name):
+    role = (role or "").strip().lower()
+    if role not in CLINICIAN_ROLES or not name or name == "Unknown":
+        return None
+    date = (log_data.get("timestamp") or "").split(" ")[0]
+    if not date:
+        return None
+    header = {"role": role, "clinician_name": name, "date": date}
+    entry = {"log_id": log_id, **{field: log_data.get(field, "") for field in ENTRY_FIELDS}}
+    return bucket_id(role, name, date), header, entry
+
+
+def bucket_entry(log_id, log_data, role, name):
+    """
+    Day bucket write for one event
+
+    Returns:
+        (bucket document id, merge payload), or None if the event has no clinician
+    """
+    staged = _entry(log_id, log_data, role, name)
+    if not staged:
+        return None
+    bucket, header, entry = staged
+    return bucket, {**header, "events": ArrayUnion([entry])}
+
+
+def stage_events(writer, events):
+    """
+    Add day bucket entries for already-written events to a batch or BulkWriter,
+    one write per bucket
+
+    Args:
+        events: Iterable of (log_id, log_data, role, name)
+
+    Returns:
+        Number of events staged
+    """
+    buckets = {}
+    for event in events:
+        staged = _entry(*event)
+        if staged:
+            buckets.setdefault(staged[0], (staged[1], []))[1].append(staged[2])
+    for bucket, (header, entries) in buckets.items():
+        writer.set(db.collection(BUCKET_COLLECTION).document(bucket),
+                   {**header, "events": ArrayUnion(entries)}, merge=True)
+    # Backfilled days may have no hot events; the manifest must still list them
+    for date in {header["date"] for header, _ in buckets.values()} - _known_days:
+        writer.set(db.collection(DAY_COLLECTION).document(date), {"date": date}, merge=True)
+    return sum(len(entries) for _, entries in buckets.values())
+
+
+def summary_id(doctor_name, patient_name):
+    return f"{clinician_key('doctor', doctor_name)}__{patient_doc_id(patient_name)}"
+
+
+def _summary_patient(log_data):
+    patient = (log_data.get("patient_name") or "").strip()
+    return None if not patient or patient.lower() == "n/a" else patient
+
+
+def summary_update(log_data, doctor_name):
+    """Merge payload that counts one event in a doctor-patient interaction summary"""
+    return {
+        "doctor_name": doctor_name,
+        "patient_name": _summary_patient(log_data),
+        "access_count": Increment(1),
+        "last_access": log_data.get("timestamp", ""),
+        "statuses": {log_data.get("status") or "Unknown": Increment(1)},
+    }
+
+
+def status_change_writes(client, transaction, events, status):
+    """
+    Writes that carry a status change into the clinician day buckets (and
+    doctors' interaction summaries) the events were counted in
+
+    Events do not record which clinician's history they joined, so the
+    candidate buckets (and summaries) are read in the transaction, in one
+    round trip, and only entries actually found there are changed. Call
+    before the transaction's first write.
+
+    Args:
+        events: [(log_id, event dict), ...]
+        status: The new status
+
+    Returns:
+        [(document reference, data, merge), ...]
+    """
+    candidates = {}
+    for log_id, log_data in events:
+        for role, name in ((log_data.get("doctor_role"), log_data.get("doctor_name")),
+                           ("doctor", log_data.get("updated_by"))):
+            staged = _entry(log_id, log_data, role, name)
+            if staged:
+                candidates.setdefault(staged[0], {})[log_id] = (log_data, role.strip().lower(), name)
+    if not candidates:
+        return []
+    refs = [client.collection(BUCKET_COLLECTION).document(bucket) for bucket in candidates]
+    summary_refs = {client.collection(SUMMARY_COLLECTION).document(summary_id(name, log_data["patient_name"]))
+                    for staged in candidates.values() for log_data, role, name in staged.values()
+                    if role == "doctor" and _summary_patient(log_data)}
+    found = {snap.reference.path: snap.to_dict() for snap in transaction.get_all(refs + list(summary_refs)) if snap.exists}
+    buckets = {ref.id: found[ref.path] for ref in refs if ref.path in found}
+
+    writes, summaries = [], {}
+    for ref in refs:
+        entries = buckets.get(ref.id, {}).get("events", [])
+        changed = False
+        for entry in entries:
+            match = candidates[ref.id].get(entry.get("log_id"))
+            if not match or entry.get("status") == status:
+                continue
+            log_data, role, name = match
+            # Summaries counted the status the bucket entry still holds
+            previous = entry.get("status") or "Unknown"
+            entry["status"], changed = status, True
+            if role == "doctor" and _summary_patient(log_data):
+                moves = summaries.setdefault(summary_id(name, log_data["patient_name"]), {})
+                moves[previous] = moves.get(previous, 0) - 1
+                moves[status] = moves.get(status, 0) + 1
+        if changed:
+            # The whole array is rewritten; the transaction read it, so a concurrent append forces a retry
+            writes.append((ref, {"events": entries}, True))
+    for summary, moves in summaries.items():
+        ref = client.collection(SUMMARY_COLLECTION).document(summary)
+        statuses = {key: Increment(delta) for key, delta in moves.items() if delta}
+        # A missing summary predates summaries; rebuild_interaction_summaries creates it
+        if statuses and ref.path in found:
+            writes.append((ref, {"statuses": statuses}, True))
+    return writes
+
+
+def flag_id(log_id):
+    return log_id.replace("/", "_")
+
+
+def queue_key(state, priority, timestamp, fid):
+    """Single sortable field for the review queue: state, then highest priority, then oldest first"""
+    return f"{state}|{100 - priority:03d}|{timestamp}|{fid}"
+
+
+def flag_entry(log_id, log_data, priority):
+    """Review queue document for a flagged event"""
+    fid = flag_id(log_id)
+    return {
+        "log_id": log_id,
+        **{field: log_data.get(field, "") for field in FLAG_FIELDS},
+        "confidence": log_data.get("confidence", log_data.get("ai_confidence")),
+        "priority": priority,
+        "state": "open",
+        "queue_key": queue_key("open", priority, log_data.get("timestamp", ""), fid),
+        "lease_owner": None,
+        "lease_expires": 0,
+        "review_status": None,
+    }
+
+
+def event_writes(client, log_data, clinician=None, flag_priority=None):
+    """
+    Writes for one access event
+
+    Returns:
+        (log id, [(document reference, data, merge), ...]) to apply in one batch;
+        call day_written(log id) once it is committed
+    """
+    date = log_date(log_data)
+    ref = event_ref(client, date)
+    log_id = make_log_id(date, ref.id)
+    writes = [(ref, log_data, False)]
+    if date not in _known_days:
+        writes.append((client.collection(DAY_COLLECTION).document(date), {"date": date}, True))
+    staged = bucket_entry(log_id, log_data, *clinician) if clinician else None
+    if staged:
+        writes.append((client.collection(BUCKET_COLLECTION).document(staged[0]), staged[1], True))
+        role, name = clinician
+        if role.strip().lower() == "doctor" and _summary_patient(log_data):
+            writes.append((client.collection(SUMMARY_COLLECTION).document(summary_id(name, log_data["patient_name"])),
+                           summary_update(log_data, name), True))
+    if flag_priority is not None and log_data.get("status") == "Flagged":
+        writes.append((client.collection(FLAG_COLLECTION).document(flag_id(log_id)),
+                       flag_entry(log_id, log_data, flag_priority), False))
+    return log_id, writes
+
+
+def day_written(log_id):
+    _known_days.add(log_id.split("/", 1)[0])
+
+
+def write_event(log_data, clinician=None, timeout=LOG_WRITE_TIMEOUT, flag_priority=None):
+    """
+    Write an access event once, plus its clinician day bucket and review queue
+    entries, then append it to the patient's timeline
+
+    Args:
+        log_data: Event dict (sensitive fields already encrypted)
+        clinician: Optional (role, name); the event is added to that doctor's
+            or nurse's history
+        timeout: Commit timeout in seconds
+        flag_priority: 0-100; a "Flagged" event is queued for review with it
+
+    Returns:
+        The log id ("<YYYY-MM-DD>/<id>")
+    """
+    log_id, writes = event_writes(db, log_data, clinician, flag_priority)
+    batch = db.batch()
+    for ref, data, merge in writes:
+        batch.set(ref, data, merge=merge)
+    batch.commit(timeout=timeout)
+    day_written(log_id)
+    if clinician:
+        response_cache.invalidate(clinician_key(*clinician))
+    try:
+        patient_timeline.record(log_id, log_data)
+    except Exception as e:
+        # The event itself is stored; backfill_patient_timelines can add it later
+        print(f"⚠️ Timeline append failed (non-fatal): {e}")
+    return log_id
+
+
+# ---------- legacy collections ----------
+def mark_migrated(collection):
+    """Record that a legacy collection has been fully moved into day buckets; readers stop merging it"""
+    db.collection(MIGRATION_COLLECTION).document(collection).set(
+        {"collection": collection, "completed_at": datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")})
+    _legacy_state[collection] = (False, time.monotonic())
+
+
+def legacy_pending(collection):
+    """True while a legacy collection still holds events that no migration job has finished moving"""
+    state = _legacy_state.get(collection)
+    if state and (not state[0] or time.monotonic() - state[1] < LEGACY_RECHECK_SECONDS):
+        return state[0]
+    pending = (not db.collection(MIGRATION_COLLECTION).document(collection).get().exists
+               and bool(list(db.collection(collection).limit(1).stream())))
+    _legacy_state[collection] = (pending, time.monotonic())
+    return pending
+
+
+def _in_range(date, start_date, end_date):
+    return not ((start_date and date < start_date) or (end_date and date > end_date))
+
+
+def legacy_events(collection, start_date=None, end_date=None, limit=None, **equals):
+    """
+    Events still in a legacy flat collection, newest first; [] once it is migrated
+
+    Args:
+        collection: access_logs, DoctorAccessLog or NurseAccessLog
+        start_date, end_date: Optional inclusive YYYY-MM-DD bounds
+        limit: Keep only the newest `limit`
+        equals: field=value filters; a list value matches any of its items
+    """
+    if not legacy_pending(collection):
+        return []
+    query = db.collection(collection)
+    for field, value in equals.items():
+        if isinstance(value, (list, tuple, set)):
+            query = query.where(filter=FieldFilter(field, "in", list(value)))
+        else:
+            query = query.where(filter=FieldFilter(field, "==", value))
+    if not equals:
+        # A range on the ordering field needs only its single-field index
+        if start_date:
+            query = query.where(filter=FieldFilter("timestamp", ">=", start_date))
+        if end_date:
+            query = query.where(filter=FieldFilter("timestamp", "<=", end_date + "\uf8ff"))
+        query = query.order_by("timestamp", direction=Query.DESCENDING)
+        if limit:
+            query = query.limit(limit)
+    # With equality filters the dates are checked here, so no composite index is needed
+    events = [{**doc.to_dict(), "id": doc.id} for doc in query.stream()]
+    events = [event for event in events if _in_range(log_date(event), start_date, end_date)]
+    events.sort(key=lambda x: x.get("timestamp", ""), reverse=True)
+    return events[:limit] if limit else events
+
+
+def _legacy_clinician_events(role, start_date=None, end_date=None, limit=None, name=None):
+    collection, name_field = LEGACY_CLINICIAN_LOGS[role.lower()]
+    equals = {name_field: name} if name else {}
+    return legacy_events(collection, start_date, end_date, limit, **equals)
+
+
+def _union(hot, cold, limit=None):
+    """Merge hot and archived events newest first; an id present in both (mid-archive) is kept once"""
+    seen = {event["id"] for event in hot}
+    events = hot + [event for event in cold if event["id"] not in seen]
+    events.sort(key=lambda x: x.get("timestamp", ""), reverse=True)
+    return events[:limit] if limit else events
+
+
+def _flatten(bucket, role):
+    name_field = f"{role}_name"
+    events = []
+    for entry in bucket.get("events", []):
+        event = {name_field: bucket.get("clinician_name", ""), **entry, "id": entry.get("log_id")}
+        event.pop("log_id", None)
+        events.append(event)
+    return events
+
+
+def _scan(prefix, start_date=None, end_date=None):
+    """Day buckets whose id starts with prefix, optionally bounded by date"""
+    query = db.collection(BUCKET_COLLECTION).order_by("__name__")
+    query = query.start_at({"__name__": prefix + (start_date or "")})
+    query = query.end_at({"__name__": prefix + (end_date or "") + "\uf8ff"})
+    return query.stream()
+
+
+def clinician_events(role, name, start_date=None, end_date=None):
+    """
+    Events in one doctor's or nurse's history, newest first
+
+    Args:
+        role: "doctor" or "nurse"
+        name: Clinician name as logged
+        start_date, end_date: Optional inclusive YYYY-MM-DD bounds
+    """
+    if not firebase_admin_initialized or not name:
+        return []
+    events = []
+    for doc in _scan(clinician_key(role, name) + "__", start_date, end_date):
+        events.extend(_flatten(doc.to_dict(), role))
+    cold = [e for bucket in log_archive.clinician_days(role, name, start_date, end_date) for e in _flatten(bucket, role)]
+    return _union(events, cold + _legacy_clinician_events(role, start_date, end_date, name=name))
+
+
+def all_clinician_events(role, start_date=None, end_date=None, limit=500):
+    """
+    Newest events of every doctor (or nurse); dates are inclusive YYYY-MM-DD bounds
+
+    Bucket ids lead with the clinician's name, so no id range covers one date
+    for everyone; instead this walks the day manifest newest first, reads that
+    day's buckets for the role, and stops once `limit` events are collected.
+    The archive is read only if the hot days do not fill `limit`.
+    """
+    if not firebase_admin_initialized:
+        return []
+    legacy = _legacy_clinician_events(role, start_date, end_date, limit)
+    events = []
+    for date in log_days(start_date, end_date):
+        day = [e for doc in clinician_days_on(date, role) for e in _flatten(doc.to_dict(), role)]
+        day.sort(key=lambda x: x.get("timestamp", ""), reverse=True)
+        events.extend(day[:limit - len(events)])
+        if len(events) >= limit:
+            return _union(events, legacy, limit)
+    cold = []
+    for bucket in log_archive.clinician_days(role, None, start_date, end_date):
+        cold.extend(_flatten(bucket, role))
+        if len(cold) >= limit:
+            break
+    cold.extend(legacy)
+    return _union(events, cold, limit)
+
+
+def doctor_interactions(doctor_name, sort="recent", limit=None):
+    """
+    A doctor's per-patient interaction summaries
+
+    Args:
+        doctor_name: Doctor name as logged
+        sort: "recent" (last access first) or "frequent" (most accesses first)
+        limit: Keep only the top `limit`
+
+    One id-range scan over a document per patient, however long the history.
+    """
+    if not firebase_admin_initialized or not doctor_name:
+        return []
+    prefix = clinician_key("doctor", doctor_name) + "__"
+    query = (db.collection(SUMMARY_COLLECTION).order_by("__name__")
+             .start_at({"__name__": prefix}).end_at({"__name__": prefix + "\uf8ff"}))
+    summaries = [doc.to_dict() for doc in query.stream()]
+    key = (lambda s: s.get("access_count", 0)) if sort == "frequent" else (lambda s: s.get("last_access", ""))
+    summaries.sort(key=key, reverse=True)
+    return summaries[:limit] if limit else summaries
+
+
+def log_days(start_date=None, end_date=None):
+    """Dates with logged events, newest first; bounds are inclusive YYYY-MM-DD"""
+    query = db.collection(DAY_COLLECTION).order_by("__name__", direction=Query.DESCENDING)
+    if end_date:
+        query = query.start_at({"__name__": end_date})
+    if start_date:
+        query = query.end_at({"__name__": start_date})
+    for doc in query.stream():
+        yield doc.id
+
+
+def day_events(date):
+    """Event documents in one day bucket"""
+    return db.collection(DAY_COLLECTION).document(date).collection(EVENT_COLLECTION).stream()
+
+
+def clinician_days_on(date, role=None):
+    """Clinician day bucket documents for one date, optionally for one role"""
+    query = db.collection(BUCKET_COLLECTION).where(filter=FieldFilter("date", "==", date))
+    if role:
+        # Equality filters only, so the single-field indexes serve it
+        query = query.where(filter=FieldFilter("role", "==", role.lower()))
+    return query.stream()
+
+
+def recent_events(limit=500, start_date=None, end_date=None, status=None):
+    """
+    Newest access events, optionally within a date range and with one status
+
+    Reads only as many day buckets (hot, then archived) as it takes to fill `limit`.
+    """
+    if not firebase_admin_initialized:
+        return []
+    legacy = legacy_events(LEGACY_LOG_COLLECTION, start_date, end_date, limit, **({"status": status} if status else {}))
+    events = []
+    for date in log_days(start_date, end_date):
+        query = db.collection(DAY_COLLECTION).document(date).collection(EVENT_COLLECTION)
+        if status:
+            # Equality only, so no composite index; a day is small enough to sort here
+            query = query.where(filter=FieldFilter("status", "==", status))
+        else:
+            query = query.order_by("timestamp", direction=Query.DESCENDING).limit(limit - len(events))
+        day = [{**doc.to_dict(), "id": make_log_id(date, doc.id)} for doc in query.stream()]
+        day.sort(key=lambda x: x.get("timestamp", ""), reverse=True)
+        events.extend(day[:limit - len(events)])
+        if len(events) >= limit:
+            return _union(events, legacy, limit)
+    cold = log_archive.events(start_date, end_date, status=status, limit=limit)
+    return _union(events, list(cold) + legacy, limit)
+
+
+def patient_events(names):
+    """Every access event logged for any of the given patient name spellings, newest first"""
+    if not firebase_admin_initialized or not names:
+        return []
+    events = []
+    query = db.collection_group(EVENT_COLLECTION).where(filter=FieldFilter("patient_name", "in", list(names)))
+    for doc in query.stream():
+        events.append({**doc.to_dict(), "id": make_log_id(doc.reference.parent.parent.id, doc.id)})
+    legacy = legacy_events(LEGACY_LOG_COLLECTION, patient_name=list(names))
+    return _union(events, list(log_archive.events(patient_names=names)) + legacy)
+
+
+# ---------- export ----------
+def day_event_pages(date, page_size=500):
+    """Events of one hot day bucket, newest first, page_size at a time"""
+    query = (db.collection(DAY_COLLECTION).document(date).collection(EVENT_COLLECTION)
+             .order_by("timestamp", direction=Query.DESCENDING).limit(page_size))
+    last = None
+    while True:
+        page = list((query.start_after(last) if last else query).stream())
+        if not page:
+            return
+        yield [{**doc.to_dict(), "id": make_log_id(date, doc.id)} for doc in page]
+        if len(page) < page_size:
+            return
+        last = page[-1]
+
+
+def tiered_dates(start_date=None, end_date=None):
+    """
+    (date, archived) for every day with events, newest first. A day present in
+    both tiers is mid-archive; the archive copy is complete, so it wins.
+    """
+    cold = set(log_archive.dates(start_date, end_date))
+    dates = cold.union(log_days(start_date, end_date))
+    return [(date, date in cold) for date in sorted(dates, reverse=True)]
+
+
+def _pages(events, page_size):
+    for i in range(0, len(events), page_size):
+        yield events[i:i + page_size]
+
+
+def iter_event_pages(start_date=None, end_date=None, page_size=500):
+    """Every access event across both tiers, newest first, one page at a time; unmigrated legacy events follow"""
+    for date, archived in tiered_dates(start_date, end_date):
+        if not archived:
+            yield from day_event_pages(date, page_size)
+            continue
+        page = []
+        for event in log_archive.events(date, date):
+            page.append(event)
+            if len(page) == page_size:
+                yield page
+                page = []
+        if page:
+            yield page
+    yield from _pages(legacy_events(LEGACY_LOG_COLLECTION, start_date, end_date), page_size)
+
+
+def iter_clinician_pages(role, start_date=None, end_date=None, page_size=500):
+    """
+    Every doctor's (or nurse's) history across both tiers, one day bucket per
+    page; unmigrated legacy entries follow, minus those already backfilled
+    """
+    pending = legacy_pending(LEGACY_CLINICIAN_LOGS[role.lower()][0])
+    seen = set()
+    for date, archived in tiered_dates(start_date, end_date):
+        if archived:
+            buckets = log_archive.clinician_days(role, None, date, date)
+        else:
+            buckets = (doc.to_dict() for doc in clinician_days_on(date, role))
+        for bucket in buckets:
+            if bucket.get("role") == role.lower():
+                page = _flatten(bucket, role)
+                if pending:
+                    seen.update(event["id"] for event in page)
+                yield page
+    if pending:
+        legacy = [e for e in _legacy_clinician_events(role, start_date, end_date) if e["id"] not in seen]
+        yield from _pages(legacy, page_size)
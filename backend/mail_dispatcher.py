@@ -0,0 +1,182 @@
+"""
+Mail dispatcher for MedTrust AI
+Sends email from a background worker queue over a pool of persistent, authenticated SMTP connections
+"""
+
+import queue
+import smtplib
+import threading
+import time
+from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
+
+from metrics import SMTP_SEND_LATENCY
+
+# ---------- CONFIGURATION ----------
+MAIL_POOL_SIZE = 2          # persistent SMTP connections (one per worker)
+MAIL_QUEUE_SIZE = 1000      # messages waiting to be sent before submit() starts refusing
+MAIL_MAX_RETRIES = 3
+MAIL_RETRY_BACKOFF = 0.5    # seconds, doubled after each failed attempt
+MAIL_IDLE_CHECK = 60        # seconds idle before a pooled connection is NOOP-checked
+SMTP_TIMEOUT = 10
+
+
+class SMTPConnectionPool:
+    """Keeps authenticated SMTP connections open between sends"""
+
+    def __init__(self, host, port, username=None, password=None, size=MAIL_POOL_SIZE,
+                 use_tls=True, timeout=SMTP_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.timeout = timeout
+        self._idle = queue.LifoQueue(maxsize=size)
+
+    def _connect(self):
+        conn = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        conn.ehlo()
+        if self.use_tls:
+            conn.starttls()
+            conn.ehlo()
+        if self.username:
+            conn.login(self.username, self.password)
+        return conn
+
+    @staticmethod
+    def _is_alive(conn):
+        try:
+            return conn.noop()[0] == 250
+        except smtplib.SMTPException:
+            return False
+        except OSError:
+            return False
+
+    def acquire(self):
+        """Return a ready connection, reusing an idle one when it is still alive"""
+        while True:
+            try:
+                conn, last_used = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect()
+            if time.monotonic() - last_used < MAIL_IDLE_CHECK or self._is_alive(conn):
+                return conn
+            self._discard(conn)
+
+    def release(self, conn, broken=False):
+        """Return a connection to the pool, or close it if it failed or the pool is full"""
+        if broken:
+            self._discard(conn)
+            return
+        try:
+            self._idle.put_nowait((conn, time.monotonic()))
+        except queue.Full:
+            self._discard(conn)
+
+    @staticmethod
+    def _discard(conn):
+        try:
+            conn.quit()
+        except Exception:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def close_all(self):
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._discard(conn)
+
+
+class MailDispatcher:
+    """
+    Queues outgoing email and sends it from background workers with retry.
+    Workers start lazily on the first submit.
+    """
+
+    def __init__(self, pool, sender, workers=MAIL_POOL_SIZE, max_retries=MAIL_MAX_RETRIES,
+                 backoff=MAIL_RETRY_BACKOFF, queue_size=MAIL_QUEUE_SIZE):
+        self.pool = pool
+        self.sender = sender
+        self.workers = workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._threads = []
+        self._start_lock = threading.Lock()
+
+    def _ensure_started(self):
+        if self._threads:
+            return
+        with self._start_lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                t = threading.Thread(target=self._worker, name=f"mail-worker-{i}", daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def submit(self, to, subject, html):
+        """
+        Queue an HTML email for delivery
+
+        Args:
+            to: Recipient address
+            subject: Subject line
+            html: Rendered HTML body
+
+        Returns:
+            True if the message was queued, False if the queue is full
+        """
+        self._ensure_started()
+        msg = MIMEMultipart("alternative")
+        msg["Subject"] = subject
+        msg["From"] = self.sender
+        msg["To"] = to
+        msg.attach(MIMEText(html, "html"))
+        try:
+            self._queue.put_nowait((to, msg.as_string()))
+            return True
+        except queue.Full:
+            print(f"⚠️ Mail queue full, dropping message to {to}")
+            return False
+
+    def _send(self, to, payload):
+        start = time.perf_counter()
+        conn = self.pool.acquire()
+        try:
+            conn.sendmail(self.sender, to, payload)
+        except Exception:
+            self.pool.release(conn, broken=True)
+            SMTP_SEND_LATENCY.observe(time.perf_counter() - start, outcome="error")
+            raise
+        self.pool.release(conn)
+        SMTP_SEND_LATENCY.observe(time.perf_counter() - start, outcome="sent")
+
+    def _worker(self):
+        while True:
+            to, payload = self._queue.get()
+            try:
+                for attempt in range(self.max_retries + 1):
+                    try:
+                        self._send(to, payload)
+                        break
+                    except Exception as e:
+                        if attempt == self.max_retries:
+                            print(f"❌ Mail delivery to {to} failed after {attempt + 1} attempts: {e}")
+                        else:
+                            time.sleep(self.backoff * (2 ** attempt))
+            finally:
+                self._queue.task_done()
+
+    def flush(self):
+        """Block until every queued message has been attempted"""
+        self._queue.join()
+
+    def pending(self):
+        return self._queue.qsize()
@@ -0,0 +1,262 @@
+"""
+Metrics for MedTrust AI
+Prometheus-style counters and histograms for HTTP routes, Firestore operations,
+ML inference, encryption, SMTP, PDF rendering and rate limiting, served in the
+text exposition format from /metrics.
+
+Every thread records into its own shard of a metric, so the hot path is a
+dict update with no lock; shards are merged only when /metrics is scraped.
+"""
+
+import bisect
+import hmac
+import os
+import threading
+import time
+
+from flask import g, request
+
+# ---------- CONFIGURATION ----------
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")   # /metrics requires "Authorization: Bearer <token>"; unset disables it
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)             # seconds
+FAST_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25)  # seconds
+UNMATCHED_ROUTE = "<unmatched>"
+SHARD_PRUNE_THRESHOLD = 256   # fold exited threads' shards on record once a metric has this many
+
+
+class Registry:
+    """Set of metrics rendered together by /metrics"""
+
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if any(m.name == metric.name for m in self._metrics):
+                raise ValueError(f"Metric {metric.name} already registered")
+            self._metrics.append(metric)
+
+    def render(self):
+        """All registered metrics in the Prometheus text format"""
+        lines = []
+        for metric in list(self._metrics):
+            lines.extend(metric.expose())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in list(zip(names, values)) + list(extra)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=registry):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards = []      # (thread, values) for every thread that has recorded
+        self._retired = {}     # values folded in from threads that have exited
+        self._lock = threading.Lock()   # guards the shard list; never taken while recording
+        if registry is not None:
+            registry.register(self)
+
+    def _values(self):
+        try:
+            return self._local.values
+        except AttributeError:
+            values = self._local.values = {}
+            with self._lock:
+                self._shards.append((threading.current_thread(), values))
+                # Thread-per-task servers would otherwise grow the list until the next scrape
+                if len(self._shards) > SHARD_PRUNE_THRESHOLD:
+                    self._prune()
+            return values
+
+    def _prune(self):
+        """Fold the shards of exited threads into _retired; caller holds _lock"""
+        live = []
+        for thread, values in self._shards:
+            if thread.is_alive():
+                live.append((thread, values))
+            else:
+                self._fold(self._retired, values)
+        self._shards = live
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def collect(self):
+        """
+        Merge every thread's shard
+
+        Returns:
+            {label values tuple: value} (see the subclass for the value shape)
+        """
+        with self._lock:
+            self._prune()
+            merged = self._fold({}, self._retired)
+            for _, values in self._shards:
+                # list() copies the items in one step, so a concurrent insert by the owner is harmless
+                self._fold(merged, values)
+        return merged
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in sorted(self.collect().items()):
+            lines.extend(self._samples(key, value))
+        return lines
+
+
+class Counter(_Metric):
+    """Monotonic count, e.g. requests or rejections"""
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        values = self._values()
+        key = self._key(labels)
+        values[key] = values.get(key, 0) + amount
+
+    @staticmethod
+    def _fold(target, values):
+        for key, value in list(values.items()):
+            target[key] = target.get(key, 0) + value
+        return target
+
+    def _samples(self, key, value):
+        return [f"{self.name}{_labels(self.labelnames, key)} {value}"]
+
+
+class Histogram(_Metric):
+    """Distribution of observed values (seconds) in fixed buckets"""
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, registry=registry):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def observe(self, value, **labels):
+        values = self._values()
+        key = self._key(labels)
+        series = values.get(key)
+        if series is None:
+            # one count per bucket plus +Inf, then the running sum
+            series = values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def time(self, **labels):
+        """Context manager observing the duration of its block"""
+        return _Timer(self, labels)
+
+    @staticmethod
+    def _fold(target, values):
+        for key, series in list(values.items()):
+            total = target.get(key)
+            if total is None:
+                target[key] = list(series)
+            else:
+                target[key] = [a + b for a, b in zip(total, series)]
+        return target
+
+    @staticmethod
+    def summarize(series):
+        """Count, sum and cumulative bucket counts (last one is +Inf) of one collected series"""
+        cumulative, running = [], 0
+        for count in series[:-1]:
+            running += count
+            cumulative.append(running)
+        return {"count": running, "sum": series[-1], "buckets": cumulative}
+
+    def _samples(self, key, series):
+        summary = self.summarize(series)
+        bounds = [repr(float(b)) for b in self.buckets] + ["+Inf"]
+        lines = [f"{self.name}_bucket{_labels(self.labelnames, key, [('le', bound)])} {count}"
+                 for bound, count in zip(bounds, summary["buckets"])]
+        lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {summary['sum']}")
+        lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {summary['count']}")
+        return lines
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+# ---------- Application metrics ----------
+HTTP_REQUESTS = Counter("medtrust_http_requests_total", "HTTP requests by blueprint route and status",
+                        ("blueprint", "route", "method", "status"))
+HTTP_LATENCY = Histogram("medtrust_http_request_duration_seconds", "HTTP request latency by blueprint route",
+                         ("blueprint", "route", "method"))
+FIRESTORE_LATENCY = Histogram("medtrust_firestore_operation_duration_seconds",
+                              "Firestore RPC latency by operation and collection", ("operation", "collection"))
+FIRESTORE_ERRORS = Counter("medtrust_firestore_operation_errors_total",
+                           "Failed Firestore RPCs by operation, collection and status code",
+                           ("operation", "collection", "code"))
+ML_LATENCY = Histogram("medtrust_ml_inference_duration_seconds", "Justification analysis latency",
+                       ("source",), buckets=FAST_BUCKETS)
+ML_DECISIONS = Counter("medtrust_ml_decisions_total", "Justification analysis results by label",
+                       ("source", "label"))
+ENCRYPTION_LATENCY = Histogram("medtrust_encryption_duration_seconds", "Field encryption and decryption time",
+                               ("op",), buckets=FAST_BUCKETS)
+SMTP_SEND_LATENCY = Histogram("medtrust_smtp_send_duration_seconds", "SMTP send time per attempt", ("outcome",))
+PDF_RENDER_LATENCY = Histogram("medtrust_pdf_render_duration_seconds", "Patient report PDF render time")
+RATE_LIMIT_REJECTIONS = Counter("medtrust_rate_limit_rejections_total", "Requests rejected by the rate limiter",
+                                ("route",))
+
+
+def authorized(authorization):
+    """True if a request with this Authorization header value may read /metrics (never when METRICS_TOKEN is unset)"""
+    if not METRICS_TOKEN:
+        return False
+    return hmac.compare_digest(authorization or "", f"Bearer {METRICS_TOKEN}")
+
+
+def current_route():
+    """(blueprint, route rule) for the current Flask request, with bounded cardinality"""
+    rule = request.url_rule.rule if request.url_rule is not None else UNMATCHED_ROUTE
+    return request.blueprint or "app", rule
+
+
+def init_metrics(app):
+    """
+    Record per-route request counts and latency for a Flask app. Call before
+    other after_request hooks are registered so their time (e.g. compression)
+    is included.
+    """
+    @app.before_request
+    def _start_request_timer():
+        g._metrics_start = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        start = g.pop("_metrics_start", None)
+        if start is not None:
+            blueprint, route = current_route()
+            HTTP_LATENCY.observe(time.perf_counter() - start, blueprint=blueprint, route=route,
+                                 method=request.method)
+            HTTP_REQUESTS.inc(blueprint=blueprint, route=route, method=request.method,
+                              status=response.status_code)
+        return response
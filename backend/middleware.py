@@ -1,8 +1,8 @@
 
 from functools import wraps
 from flask import request, jsonify
-from firebase_admin import auth
 from utils import ADMIN_EMAIL
+from token_cache import verify_id_token_cached
 
 # ---------- Authorization Decorator ----------
 def verify_admin_token(f):
@@ -15,7 +15,7 @@ def verify_admin_token(f):
         try:
             if token.startswith("Bearer "):
                 token = token.split("Bearer ")[1]
-            decoded = auth.verify_id_token(token)
+            decoded = verify_id_token_cached(token)
             email = decoded.get("email")
             # You could strictly enforce ADMIN_EMAIL here if desired
             # if email != ADMIN_EMAIL:
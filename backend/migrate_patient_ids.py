@@ -1,14 +1,15 @@
+"""
+Patient ID migration for MedTrust AI
+Assigns a PT-XXXXXXXX patient_id to every patient that lacks one.
 
-import firebase_admin
-from firebase_admin import credentials, firestore
-import uuid
-import datetime
+Runs through the background job runner (see jobs.py): the scan is paged by
+document id, writes go through a Firestore BulkWriter, and the last processed
+id is checkpointed, so re-running after a crash resumes where it stopped.
 
-# 1. Initialize Firebase Admin (assuming default creds or similar to app.py)
-#    In a local dev environment, you might need to point to your serviceAccountKey.json 
-#    or rely on however 'firebase_init.py' does it. 
-#    For a standalone script, it's safest to import the existing init logic if possible.
+    python migrate_patient_ids.py      (or POST /jobs {"kind": "migrate_patient_ids"})
+"""
 
+import uuid
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -19,47 +20,56 @@ except ImportError:
     print("❌ Could not import firebase_init. Make sure you are running this from the backend directory.")
     sys.exit(1)
 
+from helpers import iter_document_pages, open_bulk_writer, raise_on_write_failures
+from jobs import register_job, run_job_cli
+import patient_index
+import response_cache
+
+PAGE_SIZE = 500
+
 def generate_unique_patient_id():
     """Generates a short unique ID (like 'PT-123456')"""
     # Using first 8 chars of UUID for uniqueness + PT prefix
     return f"PT-{str(uuid.uuid4())[:8].upper()}"
 
-def migrate_patients():
+@register_job("migrate_patient_ids")
+def migrate_patients(ctx, page_size=PAGE_SIZE):
+    """Assign a patient_id to every patient that lacks one"""
     if not firebase_admin_initialized:
-        print("❌ Firebase is not initialized. Check your credentials.")
-        return
+        raise RuntimeError("Firebase is not initialized. Check your credentials.")
 
-    print("🚀 Starting ID migration for patients...")
-    
     patients_ref = db.collection("patients")
-    docs = patients_ref.stream()
-    
-    count = 0
-    updated = 0
-    
-    for doc in docs:
-        count += 1
-        data = doc.to_dict()
-        
-        # Check if 'patient_id' already exists
-        if "patient_id" not in data or not data["patient_id"]:
-            new_id = generate_unique_patient_id()
-            
-            # Update the document
-            try:
-                patients_ref.document(doc.id).update({
-                    "patient_id": new_id
-                })
-                print(f"✅ Assigned {new_id} to patient '{data.get('name', 'Unknown')}' (Doc ID: {doc.id})")
+    if ctx.total is None:
+        ctx.set_total(patients_ref.count().get()[0][0].value)
+
+    updated = ctx.checkpoint.get("updated", 0)
+    writer, failures = open_bulk_writer(db)
+    try:
+        for page in iter_document_pages(patients_ref, page_size, ctx.checkpoint.get("last_doc_id")):
+            touched = []
+            for doc in page:
+                data = doc.to_dict()
+                if data.get("patient_id"):
+                    continue
+                new_id = generate_unique_patient_id()
+                writer.update(doc.reference, {"patient_id": new_id})
+                touched += patient_index.stage_patient_index(writer, doc.id, {}, {"patient_id": new_id})
                 updated += 1
-            except Exception as e:
-                print(f"❌ Failed to update {doc.id}: {e}")
-        else:
-            print(f"ℹ️ Patient '{data.get('name')}' already has ID: {data['patient_id']}")
+
+            # Only checkpoint once the page's writes are durable
+            writer.flush()
+            raise_on_write_failures(failures)
+            patient_index.invalidate(touched)
+            response_cache.invalidate("patients")
+            ctx.advance(len(page))
+            ctx.save_checkpoint({"last_doc_id": page[-1].id, "updated": updated})
+            ctx.check_cancelled()
+    finally:
+        writer.close()
 
     print(f"\n✨ Migration complete.")
-    print(f"📊 Total Patients Scanned: {count}")
+    print(f"📊 Total Patients Scanned: {ctx.done}")
     print(f"📝 Total IDs Assigned: {updated}")
 
 if __name__ == "__main__":
-    migrate_patients()
+    run_job_cli("migrate_patient_ids")
@@ -1,77 +1,113 @@
+"""
+User ID migration for MedTrust AI
+Assigns a unique user_id (DOC-/NUR-/ADM-/PT-XXXXXXXX) to every user that lacks
+one and copies it to the matching patient record as patient_id.
+
+Runs through the background job runner (see jobs.py): users are scanned in
+pages by document id, writes go through a Firestore BulkWriter, and the last
+processed id is checkpointed, so re-running after a crash resumes where it
+stopped. Patient records are matched by email through one prefetched map
+instead of a query per user.
+
+    python migrate_user_ids.py      (or POST /jobs {"kind": "migrate_user_ids"})
+"""
 
-import firebase_admin
-from firebase_admin import credentials, firestore
 import uuid
 import sys
 import os
 
-# Initialize Firebase
-if not firebase_admin._apps:
-    try:
-        cred = credentials.Certificate("firebase_config.json")
-        firebase_admin.initialize_app(cred)
-        print("✅ Firebase initialized successfully.")
-    except Exception as e:
-        print(f"❌ Failed to initialize Firebase: {e}")
-        sys.exit(1)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+try:
+    from firebase_init import db, firebase_admin_initialized
+except ImportError:
+    print("❌ Could not import firebase_init. Make sure you are running this from the backend directory.")
+    sys.exit(1)
 
-db = firestore.client()
+from helpers import iter_document_pages, open_bulk_writer, raise_on_write_failures
+from jobs import register_job, run_job_cli
+import patient_index
+import response_cache
 
-def migrate_users():
+PAGE_SIZE = 500
+
+def prefetch_patients_by_email():
+    """One projected scan of patients: lowercased email -> (doc id, current patient_id)"""
+    by_email = {}
+    for doc in db.collection("patients").select(["email", "patient_id"]).stream():
+        p = doc.to_dict()
+        email = (p.get("email") or "").strip().lower()
+        if email and email not in by_email:
+            by_email[email] = (doc.id, p.get("patient_id"))
+    return by_email
+
+@register_job("migrate_user_ids")
+def migrate_users(ctx, page_size=PAGE_SIZE):
     """
     Iterate through all users and assign a unique user_id if missing.
     Format: DOC-XXX, NUR-XXX, ADM-XXX, PT-XXX
     """
+    if not firebase_admin_initialized:
+        raise RuntimeError("Firebase is not initialized. Check your credentials.")
+
     print("🚀 Starting User ID Migration...")
-    
-    users_ref = db.collection("users").stream()
-    count = 0
-    updated = 0
-    
-    for doc in users_ref:
-        user_data = doc.to_dict()
-        user_name = user_data.get("name", "Unknown")
-        role = user_data.get("role", "unknown").lower()
-        count += 1
-        
-        # Check if already has ID
-        if "user_id" in user_data and user_data["user_id"]:
-            print(f"🔹 Skipping {user_name} ({role}) - Already has ID: {user_data['user_id']}")
-            continue
-
-        # Generate prefix
-        prefix = "USR"
-        if role == "doctor": prefix = "DOC"
-        elif role == "nurse": prefix = "NUR"
-        elif role == "admin": prefix = "ADM"
-        elif role == "patient": prefix = "PT"
-        
-        # Generate ID
-        unique_id = f"{prefix}-{str(uuid.uuid4())[:8].upper()}"
-        
-        # Update User Document
-        db.collection("users").document(doc.id).update({"user_id": unique_id})
-        
-        # If Patient, sync with Patients collection
-        if role == "patient":
-            # Search patients collection by email or name
-            patients_ref = db.collection("patients").where("email", "==", user_data.get("email")).stream()
-            found_patient = False
-            for p_doc in patients_ref:
-                db.collection("patients").document(p_doc.id).update({"patient_id": unique_id})
-                print(f"   ↳ Synced with Patient Record: {p_doc.id}")
-                found_patient = True
-                break
-            
-            if not found_patient:
-                print(f"   ⚠️ Warning: No matching patient record found for {user_name}")
-
-        print(f"✅ Assigned ID to {user_name} ({role}): {unique_id}")
-        updated += 1
+    users_ref = db.collection("users")
+    if ctx.total is None:
+        ctx.set_total(users_ref.count().get()[0][0].value)
+
+    patients_by_email = prefetch_patients_by_email()
+    print(f"📇 Prefetched {len(patients_by_email)} patient emails")
+
+    updated = ctx.checkpoint.get("updated", 0)
+    unmatched = ctx.checkpoint.get("unmatched", 0)
+    writer, failures = open_bulk_writer(db)
+    try:
+        for page in iter_document_pages(users_ref, page_size, ctx.checkpoint.get("last_doc_id")):
+            touched = []
+            for doc in page:
+                user_data = doc.to_dict()
+                if user_data.get("user_id"):
+                    continue
+
+                role = (user_data.get("role") or "unknown").lower()
+                prefix = "USR"
+                if role == "doctor": prefix = "DOC"
+                elif role == "nurse": prefix = "NUR"
+                elif role == "admin": prefix = "ADM"
+                elif role == "patient": prefix = "PT"
+                unique_id = f"{prefix}-{str(uuid.uuid4())[:8].upper()}"
+
+                writer.update(doc.reference, {"user_id": unique_id})
+                updated += 1
+
+                # If Patient, sync with Patients collection
+                if role == "patient":
+                    match = patients_by_email.get((user_data.get("email") or "").strip().lower())
+                    if match:
+                        pid, old_patient_id = match
+                        writer.update(db.collection("patients").document(pid), {"patient_id": unique_id})
+                        touched += patient_index.stage_patient_index(
+                            writer, pid, {"patient_id": old_patient_id}, {"patient_id": unique_id})
+                        patients_by_email[(user_data.get("email") or "").strip().lower()] = (pid, unique_id)
+                    else:
+                        unmatched += 1
+                        print(f"   ⚠️ Warning: No matching patient record found for {user_data.get('name', 'Unknown')}")
+
+            # Only checkpoint once the page's writes are durable
+            writer.flush()
+            raise_on_write_failures(failures)
+            patient_index.invalidate(touched)
+            response_cache.invalidate("users", "patients")
+            ctx.advance(len(page))
+            ctx.save_checkpoint({"last_doc_id": page[-1].id, "updated": updated, "unmatched": unmatched})
+            ctx.check_cancelled()
+    finally:
+        writer.close()
 
     print(f"\n🎉 Migration Complete!")
-    print(f"Total Users Checked: {count}")
+    print(f"Total Users Checked: {ctx.done}")
     print(f"Total Users Updated: {updated}")
+    print(f"Patients Without Record: {unmatched}")
 
 if __name__ == "__main__":
-    migrate_users()
+    run_job_cli("migrate_user_ids")
@@ -1,8 +1,11 @@
 
 import os
+import time
 import joblib
 import traceback
 
+from metrics import ML_LATENCY, ML_DECISIONS
+
 # ---------- HybridAccessModel Class Definition ----------
 # ⚠️ IMPORTANT: This must be defined BEFORE loading the pickle file
 class HybridAccessModel:
@@ -146,8 +149,16 @@ def analyze_justification(text):
       - flag_review
     We map this into a simple label for compatibility.
     """
+    start = time.perf_counter()
+    label, score, source = _analyze_justification(text)
+    ML_LATENCY.observe(time.perf_counter() - start, source=source)
+    ML_DECISIONS.inc(source=source, label=label)
+    return label, score
+
+def _analyze_justification(text):
+    """(label, score, source) where source is "model", "fallback" or "empty" """
     if not text or not text.strip():
-        return "invalid", 0.0
+        return "invalid", 0.0, "empty"
 
     # Ensure model is loaded if possible
     if not ml_model_loaded:
@@ -161,19 +172,19 @@ def analyze_justification(text):
 
             # convert hybrid decisions to old (label, score) pair
             if decision == "emergency_allow":
-                return "emergency", 0.90
+                return "emergency", 0.90, "model"
             elif decision == "restricted_allow":
-                return "restricted", 0.75
+                return "restricted", 0.75, "model"
             elif decision == "deny":
-                return "invalid", 0.20
+                return "invalid", 0.20, "model"
             else:  # flag_review
-                return "restricted", 0.55
+                return "restricted", 0.55, "model"
 
         except Exception as e:
             print(f"⚠️ ML model prediction error: {e}")
             traceback.print_exc()  # ✅ ADD: Better error tracking
-            return analyze_justification_fallback(text)
+            return (*analyze_justification_fallback(text), "fallback")
 
     # If ML unavailable → fallback
     print("⚠️ ML model not available, using fallback analysis")
-    return analyze_justification_fallback(text)
+    return (*analyze_justification_fallback(text), "fallback")
@@ -0,0 +1,224 @@
+"""
+Network helpers for MedTrust AI
+Client IP extraction and trusted-network matching that do no I/O on the request path
+"""
+
+import bisect
+import ipaddress
+import os
+import socket
+import threading
+
+from config import TRUSTED_NETWORK
+
+# ---------- CONFIGURATION ----------
+# Number of reverse proxies in front of the app that append to X-Forwarded-For.
+# Unset keeps the legacy behaviour (trust the left-most X-Forwarded-For entry),
+# 0 ignores the header, N takes the address seen by the outermost trusted proxy.
+_hops = os.getenv("TRUSTED_PROXY_HOPS")
+TRUSTED_PROXY_HOPS = int(_hops) if _hops not in (None, "") else None
+HOST_IP_REFRESH_INTERVAL = 300  # seconds
+
+# Trusted (in-hospital) networks: comma-separated CIDRs in TRUSTED_NETWORKS and/or
+# one CIDR per line in TRUSTED_NETWORKS_FILE (hot-reloaded when the file changes).
+# Without TRUSTED_NETWORKS, config.TRUSTED_NETWORK is the trusted set
+DEFAULT_TRUSTED_NETWORKS = [TRUSTED_NETWORK]
+TRUSTED_NETWORKS_FILE = os.getenv("TRUSTED_NETWORKS_FILE")
+TRUSTED_NETWORKS_RELOAD_INTERVAL = 30  # seconds between file change checks
+IP_MATCH_CACHE_SIZE = 65536
+
+
+class HostIPResolver:
+    """Resolves this host's LAN address off the request path and caches it"""
+
+    def __init__(self, refresh_interval=HOST_IP_REFRESH_INTERVAL):
+        self.refresh_interval = refresh_interval
+        self._ip = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def resolve(self):
+        """Resolve now (blocking); keeps the previous address if the lookup fails"""
+        try:
+            self._ip = socket.gethostbyname(socket.gethostname())
+        except Exception as e:
+            print(f"⚠️ Host IP lookup failed: {e}")
+        return self._ip
+
+    @property
+    def ip(self):
+        # Callers outside the app (scripts, tests) never called start(); resolve once for them
+        if self._ip is None and self._thread is None:
+            return self.resolve()
+        return self._ip
+
+    def _run(self):
+        while not self._stop.wait(self.refresh_interval):
+            self.resolve()
+
+    def start(self):
+        """Resolve once now, then refresh in the background"""
+        if self._thread and self._thread.is_alive():
+            return
+        self.resolve()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="host-ip-resolver", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+
+host_ip_resolver = HostIPResolver()
+
+
+def client_ip_from_headers(remote_addr, forwarded_for=None, hops=TRUSTED_PROXY_HOPS):
+    """
+    Pick the client address from the socket peer and X-Forwarded-For
+
+    Args:
+        remote_addr: Peer address of the connection
+        forwarded_for: Raw X-Forwarded-For header value (or None)
+        hops: Trusted proxy count (None = legacy left-most entry)
+
+    Returns:
+        Client IP string; loopback is replaced by the cached host address
+    """
+    ip = remote_addr or "0.0.0.0"
+    if forwarded_for and hops != 0:
+        entries = [e.strip() for e in forwarded_for.split(",") if e.strip()]
+        if entries:
+            if hops is None or hops > len(entries):
+                ip = entries[0]
+            else:
+                # Each trusted proxy appends the peer it saw, so the client sits `hops` from the right
+                ip = entries[-hops]
+    if ip.startswith("127.") or ip == "0.0.0.0":
+        ip = host_ip_resolver.ip or ip
+    return ip
+
+
+def _ip_to_int(ip):
+    """Return (version, integer) for an address string; inet_pton is much cheaper than ipaddress"""
+    try:
+        return 4, int.from_bytes(socket.inet_pton(socket.AF_INET, ip), "big")
+    except OSError:
+        return 6, int.from_bytes(socket.inet_pton(socket.AF_INET6, ip), "big")
+
+
+def _compile_intervals(networks):
+    """Merge networks into sorted, disjoint [start, end] integer intervals"""
+    spans = sorted((int(n.network_address), int(n.broadcast_address)) for n in networks)
+    starts, ends = [], []
+    for start, end in spans:
+        if ends and start <= ends[-1] + 1:
+            ends[-1] = max(ends[-1], end)
+        else:
+            starts.append(start)
+            ends.append(end)
+    return starts, ends
+
+
+class TrustedNetworkMatcher:
+    """
+    Trusted network set compiled into sorted interval arrays per IP version.
+    Lookups are an O(log n) bisect, and results are cached per IP string.
+    reload() swaps in a new compiled set atomically.
+    """
+
+    def __init__(self, networks=(), cache_size=IP_MATCH_CACHE_SIZE):
+        self.cache_size = cache_size
+        self._tables = {4: ([], []), 6: ([], [])}
+        self._cache = {}
+        self._networks = []
+        self._thread = None
+        self._stop = threading.Event()
+        self.reload(networks)
+
+    @property
+    def networks(self):
+        return list(self._networks)
+
+    def reload(self, networks):
+        """
+        Replace the trusted set
+
+        Args:
+            networks: Iterable of CIDR strings or ip_network objects
+        """
+        parsed = [ipaddress.ip_network(n, strict=False) for n in networks]
+        self._tables = {
+            4: _compile_intervals(n for n in parsed if n.version == 4),
+            6: _compile_intervals(n for n in parsed if n.version == 6),
+        }
+        self._networks = parsed
+        self._cache = {}
+
+    def contains(self, ip):
+        cache = self._cache
+        hit = cache.get(ip)
+        if hit is not None:
+            return hit
+        try:
+            version, value = _ip_to_int(ip)
+        except (OSError, TypeError, ValueError):
+            return False
+        starts, ends = self._tables[version]
+        i = bisect.bisect_right(starts, value) - 1
+        result = i >= 0 and value <= ends[i]
+        if len(cache) >= self.cache_size:
+            cache.clear()
+        cache[ip] = result
+        return result
+
+    __contains__ = contains
+
+    def load_file(self, path):
+        """Reload from a file with one CIDR per line ('#' starts a comment)"""
+        networks = []
+        with open(path) as f:
+            for line in f:
+                line = line.split("#", 1)[0].strip()
+                if line:
+                    networks.append(line)
+        self.reload(_env_networks() + networks)
+        print(f"🏥 Trusted networks reloaded: {len(networks)} from {path}")
+
+    def _watch(self, path, interval):
+        last_mtime = None
+        while not self._stop.is_set():
+            try:
+                mtime = os.stat(path).st_mtime
+                if mtime != last_mtime:
+                    self.load_file(path)
+                    last_mtime = mtime
+            except Exception as e:
+                print(f"⚠️ Trusted networks reload failed: {e}")
+            self._stop.wait(interval)
+
+    def watch_file(self, path, interval=TRUSTED_NETWORKS_RELOAD_INTERVAL):
+        """Load path on a background thread, then reload it whenever it changes"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, args=(path, interval),
+                                        name="trusted-networks-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+
+def _env_networks():
+    raw = os.getenv("TRUSTED_NETWORKS")
+    if raw:
+        return [n.strip() for n in raw.split(",") if n.strip()]
+    return list(DEFAULT_TRUSTED_NETWORKS)
+
+
+trusted_networks = TrustedNetworkMatcher(_env_networks())
+
+
+def start_trusted_networks_watcher():
+    if TRUSTED_NETWORKS_FILE:
+        trusted_networks.watch_file(TRUSTED_NETWORKS_FILE)
@@ -0,0 +1,206 @@
+"""
+OTP session storage for MedTrust AI
+Bounded, self-expiring stores for pending OTP logins
+
+Backends (selected with the OTP_STORE_URI environment variable):
+    memory://                 - per-process dict with a min-heap expiry sweeper (default)
+    sqlite:///path/to/file.db - shared SQLite file in WAL mode, usable by every worker
+"""
+
+import heapq
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# ---------- CONFIGURATION ----------
+OTP_STORE_MAX_SIZE = 10000      # pending sessions kept before the soonest-expiring are evicted
+OTP_SWEEP_INTERVAL = 5          # seconds between SQLite sweeps
+
+
+class MemoryOTPStore:
+    """
+    In-process OTP store.
+    Lookups are dict reads; a min-heap of (expires, session_id) lets every write
+    drop expired sessions in O(log n) each and evict the soonest-expiring when full.
+    """
+
+    def __init__(self, max_size=OTP_STORE_MAX_SIZE, clock=time.time):
+        self.max_size = max_size
+        self._clock = clock
+        self._sessions = {}
+        self._heap = []
+        self._lock = threading.Lock()
+
+    def _push(self, session_id, expires):
+        heapq.heappush(self._heap, (expires, session_id))
+        # Resends leave stale heap entries behind; rebuild once they dominate
+        if len(self._heap) > 2 * len(self._sessions) + 64:
+            self._heap = [(r["expires"], sid) for sid, r in self._sessions.items()]
+            heapq.heapify(self._heap)
+
+    def _pop_heap_head(self):
+        """Remove the heap head; drop its session only if the heap entry is current"""
+        expires, session_id = heapq.heappop(self._heap)
+        record = self._sessions.get(session_id)
+        if record is not None and record["expires"] == expires:
+            del self._sessions[session_id]
+
+    def _sweep(self):
+        now = self._clock()
+        while self._heap and self._heap[0][0] <= now:
+            self._pop_heap_head()
+        while len(self._sessions) >= self.max_size and self._heap:
+            self._pop_heap_head()
+
+    def sweep(self):
+        with self._lock:
+            self._sweep()
+
+    def put(self, session_id, record):
+        """
+        Store a session record
+
+        Args:
+            session_id: Session key returned to the client
+            record: Dict with at least an "expires" epoch timestamp
+        """
+        record = dict(record)
+        with self._lock:
+            self._sweep()
+            self._sessions[session_id] = record
+            self._push(session_id, record["expires"])
+
+    def get(self, session_id):
+        """Return a copy of the record (expired or not), or None if unknown or swept"""
+        with self._lock:
+            record = self._sessions.get(session_id)
+            return dict(record) if record is not None else None
+
+    def update(self, session_id, **fields):
+        """Update fields of an existing session; returns False if it is gone"""
+        with self._lock:
+            record = self._sessions.get(session_id)
+            if record is None:
+                return False
+            record.update(fields)
+            if "expires" in fields:
+                self._push(session_id, record["expires"])
+            return True
+
+    def pop(self, session_id):
+        with self._lock:
+            return self._sessions.pop(session_id, None)
+
+    def __contains__(self, session_id):
+        return session_id in self._sessions
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+class SQLiteOTPStore:
+    """
+    OTP store in a shared SQLite file (WAL mode) so every worker process sees
+    the same sessions. session_id is the primary key, so lookups are index reads.
+    """
+
+    def __init__(self, path, max_size=OTP_STORE_MAX_SIZE, clock=time.time):
+        self.path = path
+        self.max_size = max_size
+        self._clock = clock
+        self._local = threading.local()
+        self._last_sweep = 0.0
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS otp_sessions ("
+            " session_id TEXT PRIMARY KEY,"
+            " record TEXT NOT NULL,"
+            " expires REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_otp_expires ON otp_sessions(expires)")
+
+    def _conn(self):
+        # sqlite3 connections must stay on the thread that created them
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def sweep(self):
+        conn = self._conn()
+        conn.execute("DELETE FROM otp_sessions WHERE expires <= ?", (self._clock(),))
+        conn.execute(
+            "DELETE FROM otp_sessions WHERE session_id IN ("
+            " SELECT session_id FROM otp_sessions ORDER BY expires"
+            " LIMIT max(0, (SELECT COUNT(*) FROM otp_sessions) - ?))",
+            (self.max_size,)
+        )
+        self._last_sweep = time.monotonic()
+
+    def put(self, session_id, record):
+        if time.monotonic() - self._last_sweep >= OTP_SWEEP_INTERVAL:
+            self.sweep()
+        self._conn().execute(
+            "INSERT OR REPLACE INTO otp_sessions (session_id, record, expires) VALUES (?, ?, ?)",
+            (session_id, json.dumps(record), record["expires"])
+        )
+
+    def get(self, session_id):
+        row = self._conn().execute(
+            "SELECT record FROM otp_sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def update(self, session_id, **fields):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT record FROM otp_sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            if not row:
+                conn.execute("COMMIT")
+                return False
+            record = json.loads(row[0])
+            record.update(fields)
+            conn.execute(
+                "UPDATE otp_sessions SET record = ?, expires = ? WHERE session_id = ?",
+                (json.dumps(record), record["expires"], session_id)
+            )
+            conn.execute("COMMIT")
+            return True
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def pop(self, session_id):
+        # DELETE ... RETURNING makes pop atomic across workers (one verify wins)
+        row = self._conn().execute(
+            "DELETE FROM otp_sessions WHERE session_id = ? RETURNING record", (session_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def __contains__(self, session_id):
+        return self._conn().execute(
+            "SELECT 1 FROM otp_sessions WHERE session_id = ?", (session_id,)
+        ).fetchone() is not None
+
+    def __len__(self):
+        return self._conn().execute("SELECT COUNT(*) FROM otp_sessions").fetchone()[0]
+
+
+def create_otp_store(uri=None):
+    """Build the OTP store named by uri (defaults to OTP_STORE_URI, then memory://)"""
+    uri = uri or os.getenv("OTP_STORE_URI", "memory://")
+    if uri.startswith("sqlite:///"):
+        path = uri[len("sqlite:///"):]
+        print(f"🔐 OTP sessions stored in shared SQLite file: {path}")
+        return SQLiteOTPStore(path)
+    if uri != "memory://":
+        print(f"⚠️ Unknown OTP_STORE_URI '{uri}', falling back to memory://")
+    return MemoryOTPStore()
@@ -0,0 +1,286 @@
+"""
+Secondary indexes for patient lookups in MedTrust AI
+Maps patient_id, email, assigned doctor and user name to document ids so every
+lookup is a single point read instead of a collection query.
+
+Index documents live in the `patient_index` collection:
+    patient_id:<id>  -> {"patient_doc_id": <patients doc id>}
+    email:<email>    -> {"patient_doc_id": <patients doc id>}
+    doctor:<name>    -> {"patient_doc_ids": [<patients doc id>, ...]}
+    user:<name>      -> {"user_doc_id": <users doc id>, "role": <role>}
+
+Patient writes go through save_patient / update_patient / delete_patient, which
+update the patient document and its index entries in one transaction.
+
+Backfill existing data with:
+    python patient_index.py --rebuild
+"""
+
+import sys
+import os
+import threading
+import time
+from urllib.parse import quote
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from google.cloud.firestore import ArrayUnion, ArrayRemove, FieldFilter, transactional
+
+from firebase_init import db, firebase_admin_initialized
+import response_cache
+
+# ---------- CONFIGURATION ----------
+INDEX_COLLECTION = "patient_index"
+META_DOC = "_meta"
+INDEX_CACHE_TTL = 300   # seconds; local writes invalidate immediately
+INDEX_MISS_TTL = 5      # seconds; misses expire fast, since other workers may create the entry
+BATCH_LIMIT = 500       # Firestore batch write limit
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _index_id(kind, value):
+    # Document ids may not contain "/", so percent-encode everything unusual
+    return f"{kind}:{quote(str(value).strip().lower(), safe='@._-')}"
+
+
+def _index_ref(kind, value):
+    return db.collection(INDEX_COLLECTION).document(_index_id(kind, value))
+
+
+def _has_doctor(name):
+    return bool(name) and name != "—"
+
+
+# ---------- cache ----------
+def _cached(index_id):
+    with _cache_lock:
+        entry = _cache.get(index_id)
+    if entry and entry[0] > time.monotonic():
+        return True, entry[1]
+    return False, None
+
+
+def _remember(index_id, data):
+    ttl = INDEX_CACHE_TTL if data is not None else INDEX_MISS_TTL
+    with _cache_lock:
+        _cache[index_id] = (time.monotonic() + ttl, data)
+
+
+def invalidate(index_ids):
+    with _cache_lock:
+        for index_id in index_ids:
+            _cache.pop(index_id, None)
+
+
+def clear_cache():
+    with _cache_lock:
+        _cache.clear()
+
+
+def _read(kind, value):
+    if not firebase_admin_initialized or not value:
+        return None
+    index_id = _index_id(kind, value)
+    hit, data = _cached(index_id)
+    if hit:
+        return data
+    snapshot = db.collection(INDEX_COLLECTION).document(index_id).get()
+    data = snapshot.to_dict() if snapshot.exists else None
+    _remember(index_id, data)
+    return data
+
+
+# ---------- lookups ----------
+def index_ready():
+    """True once a full rebuild has run, so an index miss really means 'not found'"""
+    meta = _read("meta", META_DOC)
+    return bool(meta and meta.get("built"))
+
+
+def find_patients_by_doctor(doctor_name):
+    entry = _read("doctor", doctor_name)
+    return list(entry.get("patient_doc_ids", [])) if entry else []
+
+
+def find_user_by_name(name):
+    """Return (users doc id, role) for a user name, or None"""
+    entry = _read("user", name)
+    return (entry.get("user_doc_id"), entry.get("role", "")) if entry else None
+
+
+def get_user_by_name(name):
+    """
+    Fetch a users document by display name
+
+    Args:
+        name: User name as entered at registration
+
+    Returns:
+        User dict, or None. Uses the index point read; falls back to a
+        name query only while the index has not been built yet.
+    """
+    if not firebase_admin_initialized or not name:
+        return None
+    entry = find_user_by_name(name)
+    if entry:
+        snapshot = db.collection("users").document(entry[0]).get()
+        if snapshot.exists:
+            return snapshot.to_dict()
+    if index_ready():
+        return None
+    for user_doc in db.collection("users").where(filter=FieldFilter("name", "==", name)).limit(1).stream():
+        return user_doc.to_dict()
+    return None
+
+
+# ---------- index maintenance ----------
+def stage_patient_index(writer, pid, old, new):
+    """
+    Add index writes for a patient changing from `old` to `new` to a transaction,
+    batch or BulkWriter. Returns the touched index ids; pass them to invalidate()
+    once the writes are committed.
+    """
+    touched = []
+    for kind in ("patient_id", "email"):
+        old_value, new_value = old.get(kind), new.get(kind)
+        if old_value and new_value and _index_id(kind, old_value) == _index_id(kind, new_value):
+            continue
+        if old_value:
+            writer.delete(_index_ref(kind, old_value))
+            touched.append(_index_id(kind, old_value))
+        if new_value:
+            writer.set(_index_ref(kind, new_value), {"patient_doc_id": pid})
+            touched.append(_index_id(kind, new_value))
+
+    old_doctor, new_doctor = old.get("doctor_assigned"), new.get("doctor_assigned")
+    if _index_id("doctor", old_doctor or "") != _index_id("doctor", new_doctor or ""):
+        if _has_doctor(old_doctor):
+            writer.set(_index_ref("doctor", old_doctor), {"patient_doc_ids": ArrayRemove([pid])}, merge=True)
+            touched.append(_index_id("doctor", old_doctor))
+        if _has_doctor(new_doctor):
+            writer.set(_index_ref("doctor", new_doctor),
+                       {"doctor_name": new_doctor, "patient_doc_ids": ArrayUnion([pid])}, merge=True)
+            touched.append(_index_id("doctor", new_doctor))
+    return touched
+
+
+def stage_user_index(writer, user_doc_id, user):
+    """Add the user-name index entry for a users document to a transaction or batch"""
+    writer.set(_index_ref("user", user.get("name", "")),
+               {"user_doc_id": user_doc_id, "role": (user.get("role") or "").lower()})
+    invalidate([_index_id("user", user.get("name", ""))])
+
+
+def unstage_user_index(writer, user):
+    writer.delete(_index_ref("user", user.get("name", "")))
+    invalidate([_index_id("user", user.get("name", ""))])
+
+
+@transactional
+def _save_patient_txn(transaction, pid, data, merge):
+    ref = db.collection("patients").document(pid)
+    snapshot = ref.get(transaction=transaction)
+    old = snapshot.to_dict() if snapshot.exists else {}
+    new = {**old, **data} if merge else dict(data)
+    transaction.set(ref, data, merge=merge)
+    return new, stage_patient_index(transaction, pid, old, new)
+
+
+@transactional
+def _update_patient_txn(transaction, pid, updates):
+    ref = db.collection("patients").document(pid)
+    snapshot = ref.get(transaction=transaction)
+    if not snapshot.exists:
+        return None, []
+    old = snapshot.to_dict()
+    new = {**old, **updates}
+    transaction.update(ref, updates)
+    return new, stage_patient_index(transaction, pid, old, new)
+
+
+@transactional
+def _delete_patient_txn(transaction, pid):
+    ref = db.collection("patients").document(pid)
+    snapshot = ref.get(transaction=transaction)
+    old = snapshot.to_dict() if snapshot.exists else {}
+    transaction.delete(ref)
+    return old, stage_patient_index(transaction, pid, old, {})
+
+
+def save_patient(pid, data, merge=True):
+    """Set patients/<pid> and its index entries atomically; returns the resulting patient dict"""
+    new, touched = _save_patient_txn(db.transaction(), pid, data, merge)
+    invalidate(touched)
+    response_cache.invalidate("patients")
+    return new
+
+
+def update_patient(pid, updates):
+    """Update patients/<pid> and its index entries atomically; returns the updated dict or None"""
+    new, touched = _update_patient_txn(db.transaction(), pid, updates)
+    invalidate(touched)
+    response_cache.invalidate("patients")
+    return new
+
+
+def delete_patient(pid):
+    """Delete patients/<pid> and its index entries atomically; returns the deleted dict"""
+    old, touched = _delete_patient_txn(db.transaction(), pid)
+    invalidate(touched)
+    response_cache.invalidate("patients")
+    return old
+
+
+def rebuild():
+    """Rebuild every index entry from the patients and users collections, deleting stale ones"""
+    if not firebase_admin_initialized:
+        print("❌ Firebase is not initialized. Check your credentials.")
+        return 0
+
+    entries = {}
+    doctors = {}
+    for doc in db.collection("patients").stream():
+        p = doc.to_dict()
+        for kind in ("patient_id", "email"):
+            if p.get(kind):
+                entries[_index_id(kind, p[kind])] = {"patient_doc_id": doc.id}
+        if _has_doctor(p.get("doctor_assigned")):
+            # Grouped by index id, as stage_patient_index does, so "Dr. A" and "dr. a" share one list
+            name, pids = doctors.setdefault(_index_id("doctor", p["doctor_assigned"]), (p["doctor_assigned"], []))
+            pids.append(doc.id)
+    for index_id, (name, pids) in doctors.items():
+        entries[index_id] = {"doctor_name": name, "patient_doc_ids": pids}
+    for doc in db.collection("users").stream():
+        u = doc.to_dict()
+        if u.get("name"):
+            entries[_index_id("user", u["name"])] = {"user_doc_id": doc.id, "role": (u.get("role") or "").lower()}
+
+    meta_id = _index_id("meta", META_DOC)
+    stale = [doc.reference for doc in db.collection(INDEX_COLLECTION).select([]).stream()
+             if doc.id not in entries and doc.id != meta_id]
+
+    batch, pending = db.batch(), 0
+    writes = [(db.collection(INDEX_COLLECTION).document(index_id), data) for index_id, data in entries.items()]
+    for ref, data in writes + [(ref, None) for ref in stale]:
+        if data is None:
+            batch.delete(ref)
+        else:
+            batch.set(ref, data)
+        pending += 1
+        if pending == BATCH_LIMIT:
+            batch.commit()
+            batch, pending = db.batch(), 0
+    batch.set(db.collection(INDEX_COLLECTION).document(meta_id), {"built": True})
+    batch.commit()
+    clear_cache()
+    print(f"✅ Patient index rebuilt: {len(entries)} entries, {len(stale)} stale removed")
+    return len(entries)
+
+
+if __name__ == "__main__":
+    if "--rebuild" in sys.argv:
+        rebuild()
+    else:
+        print(__doc__)
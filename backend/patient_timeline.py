@@ -0,0 +1,193 @@
+"""
+Patient access timelines for MedTrust AI
+Every access or update event that names a patient is appended to that
+patient's timeline, keyed by the stable patient_id (so "Alice" and "alice"
+land in the same place):
+
+    patient_timelines/<patient_id>                    head {"patient_id", "live_page", "live_count", "since", ...}
+    patient_timelines/<patient_id>/pages/1-000000     {"events": [{log_id, timestamp, action, status, ...}, ...]}
+
+Pages are append-only and hold up to TIMELINE_PAGE_SIZE entries. The head
+says which page is being filled; the append runs in a transaction on the
+head so concurrent writers never overfill or skip a page. A history view
+reads the newest TIMELINE_VIEW_PAGES pages (one to two document reads) and
+returns a cursor for the next ones.
+
+Events logged before timelines existed are added by the
+backfill_patient_timelines job into their own "0-" page series, which sorts
+before the live "1-" pages. Run migrate_patient_ids first: patients without a
+patient_id get no timeline.
+"""
+
+import sys
+import os
+import threading
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from google.cloud.firestore import ArrayUnion, Query, transactional
+
+from firebase_init import db, firebase_admin_initialized
+from helpers import patient_doc_id
+
+# ---------- CONFIGURATION ----------
+TIMELINE_COLLECTION = "patient_timelines"
+PAGE_COLLECTION = "pages"
+TIMELINE_PAGE_SIZE = 100
+TIMELINE_VIEW_PAGES = 2
+# justification stays encrypted, as in the event
+TIMELINE_FIELDS = ("patient_name", "doctor_name", "doctor_role", "updated_by", "action", "justification", "status", "timestamp")
+SERIES = {"backfill": "0", "live": "1"}
+
+# patients doc id -> patient_id; ids never change once assigned
+_patient_ids = {}
+_patient_ids_lock = threading.Lock()
+
+
+def page_id(series, page):
+    return f"{SERIES[series]}-{page:06d}"
+
+
+def head_ref(client, patient_id):
+    """Timeline head document; works with the sync and async clients"""
+    return client.collection(TIMELINE_COLLECTION).document(patient_id)
+
+
+def timeline_entry(log_id, log_data):
+    return {"log_id": log_id, **{field: log_data[field] for field in TIMELINE_FIELDS if field in log_data}}
+
+
+def patient_key(log_data):
+    """patients doc id for the event's patient, or None for events without one"""
+    name = (log_data.get("patient_name") or "").strip()
+    if not name or name.upper() == "N/A":
+        return None
+    return patient_doc_id(name) or None
+
+
+def cached_patient_id(doc_id):
+    with _patient_ids_lock:
+        return _patient_ids.get(doc_id)
+
+
+def remember_patient_id(doc_id, patient_id):
+    if patient_id:
+        with _patient_ids_lock:
+            _patient_ids[doc_id] = patient_id
+    return patient_id
+
+
+def resolve_patient_id(log_data):
+    """patient_id for an event: from the event itself, the cache, or one field read of the patient"""
+    if log_data.get("patient_id"):
+        return log_data["patient_id"]
+    doc_id = patient_key(log_data)
+    if not doc_id:
+        return None
+    patient_id = cached_patient_id(doc_id)
+    if patient_id:
+        return patient_id
+    snapshot = db.collection("patients").document(doc_id).get(field_paths=["patient_id"])
+    return remember_patient_id(doc_id, snapshot.get("patient_id") if snapshot.exists else None)
+
+
+def append_writes(client, head, patient_id, entries, series="live", head_fields=None):
+    """
+    Writes that append entries to a timeline, given the current head
+
+    Args:
+        client: Sync or async Firestore client (only used to build references)
+        head: Head document dict ({} if the timeline does not exist yet)
+        patient_id: Timeline key
+        entries: timeline_entry dicts, oldest first
+        series: "live" or "backfill"
+        head_fields: Extra fields to set on the head
+
+    Returns:
+        [(document reference, data, merge), ...] including the head update;
+        apply them in the transaction that read the head
+    """
+    ref = head_ref(client, patient_id)
+    page, count = head.get(f"{series}_page", 0), head.get(f"{series}_count", 0)
+    pages = {}
+    for entry in entries:
+        if count >= TIMELINE_PAGE_SIZE:
+            page, count = page + 1, 0
+        pages.setdefault(page, []).append(entry)
+        count += 1
+    writes = [(ref.collection(PAGE_COLLECTION).document(page_id(series, n)), {"events": ArrayUnion(items)}, True)
+              for n, items in pages.items()]
+    updates = {"patient_id": patient_id, f"{series}_page": page, f"{series}_count": count, **(head_fields or {})}
+    if series == "live" and "since" not in head and entries:
+        # Older events belong to the backfill series
+        updates["since"] = entries[0].get("timestamp", "")
+    writes.append((ref, updates, True))
+    return writes
+
+
+@transactional
+def _append_txn(transaction, patient_id, entries):
+    snapshot = head_ref(db, patient_id).get(transaction=transaction)
+    for ref, data, merge in append_writes(db, snapshot.to_dict() if snapshot.exists else {}, patient_id, entries):
+        transaction.set(ref, data, merge=merge)
+
+
+def record(log_id, log_data):
+    """Append an event to its patient's timeline; returns the patient_id, or None if it names no known patient"""
+    patient_id = resolve_patient_id(log_data)
+    if patient_id:
+        _append_txn(db.transaction(), patient_id, [timeline_entry(log_id, log_data)])
+    return patient_id
+
+
+@transactional
+def _backfill_txn(transaction, patient_id, date, entries):
+    snapshot = head_ref(db, patient_id).get(transaction=transaction)
+    head = snapshot.to_dict() if snapshot.exists else {}
+    if head.get("backfilled_through", "") >= date:
+        return 0
+    since = head.get("since")
+    entries = [e for e in entries if not since or e.get("timestamp", "") < since]
+    for ref, data, merge in append_writes(db, head, patient_id, entries, "backfill", {"backfilled_through": date}):
+        transaction.set(ref, data, merge=merge)
+    return len(entries)
+
+
+def backfill_day(patient_id, date, entries):
+    """
+    Add one day of pre-existing events to a timeline, oldest first
+
+    Each (patient, day) is applied at most once, and events at or after the
+    first live entry are skipped, so the job can be re-run safely.
+    """
+    return _backfill_txn(db.transaction(), patient_id, date, entries)
+
+
+def timeline(patient_id, cursor=None, page_count=TIMELINE_VIEW_PAGES):
+    """
+    Newest events of a patient's timeline
+
+    Args:
+        patient_id: Timeline key
+        cursor: next_cursor from the previous call
+        page_count: Pages (document reads) to return
+
+    Returns:
+        (events newest first, next_cursor or None)
+    """
+    if not firebase_admin_initialized or not patient_id:
+        return [], None
+    query = (head_ref(db, patient_id).collection(PAGE_COLLECTION)
+             .order_by("__name__", direction=Query.DESCENDING))
+    if cursor:
+        query = query.start_after({"__name__": cursor})
+    pages = list(query.limit(page_count).stream())
+    events = []
+    for page in pages:
+        for entry in sorted(page.to_dict().get("events", []), key=lambda e: e.get("timestamp", ""), reverse=True):
+            event = {**entry, "id": entry.get("log_id")}
+            event.pop("log_id", None)
+            events.append(event)
+    last = pages[-1].id if pages else None
+    next_cursor = last if len(pages) == page_count and last != page_id("backfill", 0) else None
+    return events, next_cursor
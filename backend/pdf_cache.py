@@ -0,0 +1,173 @@
+"""
+PDF report cache for MedTrust AI
+Rendered patient reports keyed by a hash of the stored (encrypted) patient
+fields, the report template version and the report date. Entries are evicted
+least-recently-used once the byte budget is exceeded.
+
+PDF_CACHE_DIR keeps the cache on local disk, shared by workers on one host:
+a miss checks the directory for a report another worker rendered, file
+modification times carry the LRU order, and the byte budget is enforced
+against the directory's contents. Without it reports are cached in process
+memory.
+"""
+
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+# ---------- CONFIGURATION ----------
+PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR")
+PDF_CACHE_MAX_BYTES = int(os.getenv("PDF_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+REPORT_FIELDS = ["name", "patient_id", "email", "age", "gender", "diagnosis", "treatment", "notes", "last_visit"]
+
+
+def report_key(patient, template_version, report_date):
+    """
+    Content address of a patient report
+
+    Args:
+        patient: Patient dict as stored (sensitive fields still encrypted)
+        template_version: pdf_report.TEMPLATE_VERSION
+        report_date: Date printed on the report (YYYY-MM-DD)
+
+    Returns:
+        Hex sha256 digest, also used as the ETag
+    """
+    payload = {field: patient.get(field) for field in REPORT_FIELDS}
+    raw = json.dumps([template_version, report_date, payload], sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class PDFCache:
+    """LRU cache of rendered PDFs with a total size budget, in memory or on disk"""
+
+    def __init__(self, max_bytes=PDF_CACHE_MAX_BYTES, directory=None):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self._entries = OrderedDict()   # key -> bytes (memory) or size (disk)
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            with self._lock:
+                self._scan()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.pdf")
+
+    def _scan(self):
+        """Rebuild the index from the directory, LRU order from modification times; caller holds _lock"""
+        files = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".pdf"):
+                try:
+                    st = os.stat(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    continue   # evicted by another worker meanwhile
+                files.append((st.st_mtime_ns, name[:-4], st.st_size))
+        self._entries.clear()
+        self._size = 0
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+            self._size += size
+        self._evict()
+
+    def _entry_size(self, value):
+        return value if self.directory else len(value)
+
+    def _evict(self):
+        while self._size > self.max_bytes and self._entries:
+            key, value = self._entries.popitem(last=False)
+            self._size -= self._entry_size(value)
+            if self.directory:
+                try:
+                    os.unlink(self._path(key))
+                except FileNotFoundError:
+                    pass
+
+    def get(self, key):
+        """Return a readable binary stream (file or BytesIO) for key, or None on a miss"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None and self.directory:
+                # Another worker may have rendered it since this process last looked
+                try:
+                    value = os.stat(self._path(key)).st_size
+                    self._entries[key] = value
+                    self._size += value
+                except FileNotFoundError:
+                    pass
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        if not self.directory:
+            return io.BytesIO(value)
+        try:
+            os.utime(self._path(key))
+            return open(self._path(key), "rb")
+        except FileNotFoundError:
+            # Evicted by another worker sharing the directory
+            with self._lock:
+                if self._entries.pop(key, None) is not None:
+                    self._size -= value
+            return None
+
+    def put(self, key, data):
+        """Store rendered PDF bytes; reports larger than the whole budget are not cached"""
+        if len(data) > self.max_bytes:
+            return
+        if self.directory:
+            # Write to a temp file and rename so readers never see a partial PDF
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(tmp, self._path(key))
+            except BaseException:
+                os.unlink(tmp)
+                raise
+            with self._lock:
+                # Every worker writes here, so the budget is checked against what is on disk
+                self._scan()
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= self._entry_size(old)
+            self._entries[key] = bytes(data)
+            self._size += len(data)
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            keys = list(self._entries)
+            self._entries.clear()
+            self._size = 0
+        if self.directory:
+            for key in keys:
+                try:
+                    os.unlink(self._path(key))
+                except FileNotFoundError:
+                    pass
+
+    @property
+    def size(self):
+        return self._size
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+
+pdf_cache = PDFCache(directory=PDF_CACHE_DIR)
@@ -0,0 +1,280 @@
+"""
+PDF report template for MedTrust AI
+Styles and table styles of the patient report are built once per process, so
+each request only builds flowables, which are cheap.
+"""
+
+import io
+import os
+import threading
+from datetime import datetime
+from functools import lru_cache
+
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+from reportlab.lib import colors
+
+from metrics import PDF_RENDER_LATENCY
+
+# ---------- CONFIGURATION ----------
+# Bump whenever the layout changes so cached reports (see pdf_cache.py) are not reused
+TEMPLATE_VERSION = "1"
+
+# Color Palette: Professional Medical Blue
+ACCENT_COLOR = colors.HexColor('#0f766e') # Teal-700
+HEADER_BG = colors.HexColor('#f0fdfa')    # Teal-50
+TEXT_COLOR = colors.HexColor('#334155')   # Slate-700
+LABEL_COLOR = colors.HexColor('#64748b')  # Slate-500
+RULE_COLOR = colors.HexColor('#cbd5e1')
+
+
+@lru_cache(maxsize=8)
+def available_fonts(candidates):
+    """
+    Resolve which font files exist, once per process
+
+    Args:
+        candidates: Tuple of font file paths to probe
+
+    Returns:
+        List of the paths that exist
+    """
+    font_paths = [p for p in candidates if os.path.exists(p)]
+    if not font_paths:
+        print("⚠️ No fonts found, PDF may have rendering issues")
+    return font_paths
+
+
+def safe_text(patient, key, default="Not specified"):
+    value = patient.get(key, default)
+    if value is None or value == "" or value == "—":
+        return default
+    try:
+        return str(value).encode('utf-8', 'replace').decode('utf-8')
+    except:
+        return str(value)
+
+
+class ReportTemplate:
+    """
+    Precompiled patient report layout.
+
+    Styles and table styles are immutable once built and shared by all threads.
+    ReportLab flowables keep layout state while a document is being built, so
+    every render gets new ones, including the parts that never change.
+    """
+
+    def __init__(self):
+        styles = getSampleStyleSheet()
+        self.normal_style = styles['Normal']
+
+        self.title_style = ParagraphStyle(
+            'ProTitle',
+            parent=styles['Heading1'],
+            fontSize=22,
+            textColor=ACCENT_COLOR,
+            spaceAfter=4,
+            alignment=0,
+            fontName='Helvetica-Bold',
+            leading=26
+        )
+        self.subtitle_style = ParagraphStyle(
+            'ProSubtitle',
+            parent=styles['Normal'],
+            fontSize=10,
+            textColor=LABEL_COLOR,
+            alignment=0,
+            spaceAfter=20,
+            fontName='Helvetica',
+            textTransform='uppercase',
+            letterSpacing=1
+        )
+        self.section_header_style = ParagraphStyle(
+            'SectionHeader',
+            parent=styles['Heading2'],
+            fontSize=12,
+            textColor=ACCENT_COLOR,
+            spaceAfter=8,
+            spaceBefore=12,
+            fontName='Helvetica-Bold',
+            textTransform='uppercase',
+            borderPadding=4,
+            borderColor=ACCENT_COLOR,
+            borderWidth=0,
+        )
+        self.field_label_style = ParagraphStyle(
+            'FieldLabel',
+            parent=styles['Normal'],
+            fontSize=9,
+            textColor=LABEL_COLOR,
+            spaceAfter=2,
+            fontName='Helvetica-Bold',
+        )
+        self.field_value_style = ParagraphStyle(
+            'FieldValue',
+            parent=styles['Normal'],
+            fontSize=11,
+            textColor=TEXT_COLOR,
+            spaceAfter=8,
+            fontName='Helvetica',
+            leading=14
+        )
+        self.footer_style = ParagraphStyle(
+            'Footer',
+            parent=styles['Normal'],
+            fontSize=8,
+            textColor=colors.HexColor('#94a3b8'),
+            alignment=1,
+            spaceAfter=4,
+            fontName='Helvetica'
+        )
+        self.logo_style = ParagraphStyle('Logo', parent=self.title_style, fontSize=18, textColor=ACCENT_COLOR)
+        self.report_title_style = ParagraphStyle('ReportTitle', parent=self.subtitle_style, alignment=2)
+        self.disclaimer_style = ParagraphStyle(
+            'Disclaimer',
+            parent=styles['Normal'],
+            fontSize=8,
+            textColor=colors.HexColor('#ef4444'),
+            alignment=1,
+            fontName='Helvetica-Oblique'
+        )
+
+        self.header_table_style = TableStyle([
+            ('ALIGN', (0, 0), (0, 0), 'LEFT'),
+            ('ALIGN', (1, 0), (1, 0), 'RIGHT'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('LINEBELOW', (0, 0), (-1, -1), 2, ACCENT_COLOR),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
+        ])
+        self.rule_table_style = TableStyle([('LINEBELOW', (0, 0), (-1, -1), 0.5, RULE_COLOR)])
+        self.demo_table_style = TableStyle([
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+            ('TOPPADDING', (0, 0), (-1, -1), 6),
+        ])
+        self.diag_table_style = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, -1), HEADER_BG),
+            ('border', (0, 0), (-1, -1), 0.5, colors.HexColor('#ccfbf1')),
+            ('LEFTPADDING', (0, 0), (-1, -1), 12),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 12),
+            ('TOPPADDING', (0, 0), (-1, -1), 12),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
+            ('ROUNDEDCORNERS', [8, 8, 8, 8]),
+        ])
+        self.footer_line_style = TableStyle([('LINEABOVE', (0, 0), (-1, -1), 1, colors.HexColor('#e2e8f0'))])
+
+    def _section(self, title):
+        return [
+            Paragraph(title, self.section_header_style),
+            Table([[""]], colWidths=[6*inch], style=self.rule_table_style),
+            Spacer(1, 0.1*inch),
+        ]
+
+    def _build_static(self):
+        header_table = Table([[
+            Paragraph("<b>MEDTRUST AI</b>", self.logo_style),
+            Paragraph("<b>CONFIDENTIAL MEDICAL REPORT</b>", self.report_title_style)
+        ]], colWidths=[3*inch, 3*inch])
+        header_table.setStyle(self.header_table_style)
+
+        footer_line = Table([[""]], colWidths=[6.5*inch])
+        footer_line.setStyle(self.footer_line_style)
+
+        return {
+            "header": [header_table, Spacer(1, 0.25*inch)],
+            "profile": self._section("Patient Profile"),
+            "diagnosis": self._section("Clinical Diagnosis"),
+            "treatment": self._section("Treatment Plan"),
+            "notes": self._section("Clinical Notes & Observations"),
+            "labels": [Paragraph(label, self.field_label_style)
+                       for label in ("FULL NAME", "AGE / GENDER", "EMAIL", "REPORT DATE")],
+            "gap": Spacer(1, 0.25*inch),
+            "footer_gap": Spacer(1, 0.5*inch),
+            "footer_line": [footer_line, Spacer(1, 0.1*inch)],
+            "disclaimer": Paragraph(
+                "This document is a confidential medical record. Unauthorized access or distribution is strictly prohibited.",
+                self.disclaimer_style
+            ),
+        }
+
+    def flowables(self, patient, now=None):
+        """
+        Build the flowable list for one report
+
+        Args:
+            patient: Patient dict with sensitive fields already decrypted
+            now: Report timestamp (defaults to utcnow)
+
+        Returns:
+            New list of flowables ready for doc.build()
+        """
+        now = now or datetime.utcnow()
+        static = self._build_static()
+        value_style = self.field_value_style
+        full_name, age_gender, email, report_date = static["labels"]
+
+        demo_table = Table([
+            [
+                full_name,
+                Paragraph(safe_text(patient, "name", "Unknown"), value_style),
+                age_gender,
+                Paragraph(f"{safe_text(patient, 'age', '—')} yrs / {safe_text(patient, 'gender')}", value_style),
+            ],
+            [
+                email,
+                Paragraph(safe_text(patient, "email"), value_style),
+                report_date,
+                Paragraph(now.strftime("%B %d, %Y"), value_style),
+            ]
+        ], colWidths=[1.25*inch, 2.25*inch, 1.25*inch, 1.25*inch])
+        demo_table.setStyle(self.demo_table_style)
+
+        diag_table = Table([[Paragraph(safe_text(patient, "diagnosis", "Pending Evaluation"), value_style)]],
+                           colWidths=[6*inch])
+        diag_table.setStyle(self.diag_table_style)
+
+        return [
+            *static["header"],
+            *static["profile"], demo_table, static["gap"],
+            *static["diagnosis"], diag_table, static["gap"],
+            *static["treatment"],
+            Paragraph(safe_text(patient, "treatment", "No treatment plan specified"), value_style), static["gap"],
+            *static["notes"],
+            Paragraph(safe_text(patient, "notes", "No additional clinical notes"), value_style), static["footer_gap"],
+            *static["footer_line"],
+            Paragraph(f"Generated via MedTrust AI System | {now.strftime('%Y-%m-%d %H:%M UTC')}", self.footer_style),
+            static["disclaimer"],
+        ]
+
+    def render(self, patient, now=None, invariant=None):
+        """Render one report; returns a BytesIO positioned at 0"""
+        buffer = io.BytesIO()
+        doc = SimpleDocTemplate(
+            buffer,
+            pagesize=letter,
+            topMargin=0.75*inch,
+            bottomMargin=0.75*inch,
+            leftMargin=0.75*inch,
+            rightMargin=0.75*inch,
+            invariant=invariant
+        )
+        with PDF_RENDER_LATENCY.time():
+            doc.build(self.flowables(patient, now))
+        buffer.seek(0)
+        return buffer
+
+
+_template = None
+_template_lock = threading.Lock()
+
+
+def get_report_template():
+    """Process-wide ReportTemplate, built on first use"""
+    global _template
+    if _template is None:
+        with _template_lock:
+            if _template is None:
+                _template = ReportTemplate()
+    return _template
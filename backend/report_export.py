@@ -0,0 +1,218 @@
+"""
+Bulk patient report export for MedTrust AI
+Renders patient PDFs in a process pool and streams them into a ZIP archive as
+they complete, so neither the reports nor the archive are held in memory.
+
+This module deliberately does not import firebase_init: export workers are
+spawned processes and must not open their own Firestore connections.
+As with any spawned pool, workers re-import the launching script once when the
+pool starts (app.py when run directly); a WSGI server entry point avoids that.
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+# ---------- CONFIGURATION ----------
+EXPORT_WORKERS = int(os.getenv("EXPORT_WORKERS", str(os.cpu_count() or 1)))
+EXPORT_IN_FLIGHT_PER_WORKER = 2     # bounds memory: at most this many finished-but-unwritten PDFs per worker
+EXPORT_JOB_RETENTION = 3600         # seconds a finished job stays visible to the status endpoint
+
+PATIENT_SENSITIVE_FIELDS = ["diagnosis", "treatment", "notes"]
+
+
+def render_patient_report(patient):
+    """
+    Process-pool entry point: decrypt one stored patient and render its report
+
+    Args:
+        patient: Patient dict as stored (sensitive fields encrypted)
+
+    Returns:
+        (patient name, PDF bytes)
+    """
+    # Imported here so the parent process never pays for it and spawned workers import it once
+    from encryption import decrypt_sensitive_data
+    from utils import create_patient_pdf_bytes
+
+    patient = dict(patient)
+    patient.setdefault("name", "patient")
+    patient.setdefault("last_visit", "Not recorded")
+    patient = decrypt_sensitive_data(patient, PATIENT_SENSITIVE_FIELDS)
+    return patient["name"], create_patient_pdf_bytes(patient, fallback=False).getvalue()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_export_pool():
+    """Shared process pool, started on first use. Spawned (not forked) so workers never inherit gRPC state"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(max_workers=EXPORT_WORKERS,
+                                            mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+class _ChunkSink:
+    """Write-only, unseekable file object; zipfile switches to streaming mode (data descriptors) for it"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class ExportJob:
+    """Progress of one bulk export, readable from the status endpoint while the ZIP streams"""
+
+    def __init__(self, requested_by=None, description=""):
+        self.id = uuid.uuid4().hex[:12]
+        self.requested_by = requested_by
+        self.description = description
+        self.status = "pending"
+        self.total = 0
+        self.done = 0
+        self.failed = 0
+        self.bytes_sent = 0
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    def to_dict(self):
+        elapsed = ((self.finished_at or time.time()) - self.started_at) if self.started_at else 0
+        rate = self.done / elapsed if elapsed > 0 else 0
+        remaining = self.total - self.done - self.failed
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "description": self.description,
+            "requested_by": self.requested_by,
+            "total": self.total,
+            "done": self.done,
+            "failed": self.failed,
+            "bytes_sent": self.bytes_sent,
+            "reports_per_second": round(rate, 2),
+            "eta_seconds": round(remaining / rate, 1) if rate and self.status == "running" else None,
+            "error": self.error,
+        }
+
+
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+
+def create_export_job(requested_by=None, description=""):
+    job = ExportJob(requested_by, description)
+    now = time.time()
+    with _jobs_lock:
+        for job_id, old in list(_jobs.items()):
+            if old.finished_at and now - old.finished_at > EXPORT_JOB_RETENTION:
+                del _jobs[job_id]
+        _jobs[job.id] = job
+    return job
+
+
+def get_export_job(job_id):
+    with _jobs_lock:
+        return _jobs.get(job_id)
+
+
+def _unique_name(name, used):
+    base = "".join(c if c.isalnum() or c in "-_" else "_" for c in (name or "patient").strip()) or "patient"
+    candidate = f"{base}_EHR_Report.pdf"
+    n = 2
+    while candidate in used:
+        candidate = f"{base}_{n}_EHR_Report.pdf"
+        n += 1
+    used.add(candidate)
+    return candidate
+
+
+def stream_reports_zip(job, patients, total=None, pool=None):
+    """
+    Render patients in parallel and yield a ZIP archive chunk by chunk
+
+    Args:
+        job: ExportJob updated as reports complete
+        patients: Iterable of stored patient dicts (consumed lazily)
+        total: Number of patients, if known up front (for progress/ETA)
+        pool: Executor to render with (defaults to the shared process pool)
+
+    Yields:
+        ZIP bytes; one chunk per finished report plus the central directory
+    """
+    pool = pool or get_export_pool()
+    max_in_flight = max(getattr(pool, "_max_workers", EXPORT_WORKERS), 1) * EXPORT_IN_FLIGHT_PER_WORKER
+    sink = _ChunkSink()
+    used_names, failures = set(), []
+    pending = {}
+    job.total = total or 0
+    job.status, job.started_at = "running", time.time()
+    patients = iter(patients)
+    exhausted = False
+
+    def emit():
+        data = sink.drain()
+        job.bytes_sent += len(data)
+        return data
+
+    try:
+        # PDFs are already compressed internally; storing them avoids burning CPU on deflate
+        with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED) as archive:
+            while pending or not exhausted:
+                while not exhausted and len(pending) < max_in_flight:
+                    patient = next(patients, None)
+                    if patient is None:
+                        exhausted = True
+                        break
+                    if total is None:
+                        job.total += 1
+                    pending[pool.submit(render_patient_report, patient)] = patient.get("name", "patient")
+                if not pending:
+                    break
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = pending.pop(future)
+                    try:
+                        name, pdf_bytes = future.result()
+                    except Exception as e:
+                        job.failed += 1
+                        failures.append(f"{name}: {e}")
+                        continue
+                    archive.writestr(_unique_name(name, used_names), pdf_bytes)
+                    job.done += 1
+                    yield emit()
+            if failures:
+                archive.writestr("export_errors.txt", "\n".join(failures) + "\n")
+        yield emit()
+        job.status = "completed"
+    except GeneratorExit:
+        # Client went away mid-download
+        job.status = "cancelled"
+        raise
+    except Exception as e:
+        job.status, job.error = "failed", str(e)
+        raise
+    finally:
+        for future in pending:
+            future.cancel()
+        job.finished_at = time.time()
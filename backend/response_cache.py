@@ -0,0 +1,133 @@
+"""
+Response cache for MedTrust AI
+Caches the JSON of read-heavy GET endpoints that dashboards poll, per caller,
+and answers conditional requests:
+
+    @cached_response(ttl=30, tags=("patients",))
+    def all_patients(): ...
+
+Entries are keyed by endpoint, full path (with query string) and the caller's
+identity (a hash of the Authorization header, or the client IP without one),
+so a response is never served to another user. Every response gets a strong
+ETag from a hash of its body; a request whose If-None-Match matches gets an
+empty 304. Writes call invalidate(tag) to bump that tag's version counter,
+which retires every entry built under an older version at once. The cache is
+per process, so TTLs bound how stale another worker's copy can be.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import Response, make_response, request
+
+from network_utils import client_ip_from_headers
+
+# ---------- CONFIGURATION ----------
+RESPONSE_CACHE_MAX_ENTRIES = 512
+CACHE_CONTROL = "private, no-cache"   # browsers may keep it but must revalidate; shared caches must not
+
+_versions = {}
+_versions_lock = threading.Lock()
+
+
+def invalidate(*tags):
+    """Retire cached responses built from data under these tags (call after the write commits)"""
+    with _versions_lock:
+        for tag in tags:
+            _versions[tag] = _versions.get(tag, 0) + 1
+
+
+def _version_of(tags):
+    with _versions_lock:
+        return tuple(_versions.get(tag, 0) for tag in tags)
+
+
+def make_etag(body):
+    return hashlib.sha256(body).hexdigest()[:32]
+
+
+def caller_identity():
+    token = request.headers.get("Authorization")
+    if token:
+        return "token:" + hashlib.sha256(token.encode()).hexdigest()
+    return "anon:" + client_ip_from_headers(request.remote_addr, request.headers.get("X-Forwarded-For"))
+
+
+class ResponseCache:
+    """Bounded LRU of rendered responses, each valid for its TTL and tag versions"""
+
+    def __init__(self, max_entries=RESPONSE_CACHE_MAX_ENTRIES, clock=time.monotonic):
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry["version"] != version or self._clock() >= entry["expires_at"]:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, version, ttl, body, mimetype, etag):
+        entry = {"version": version, "expires_at": self._clock() + ttl,
+                 "body": body, "mimetype": mimetype, "etag": etag}
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+response_cache = ResponseCache()
+
+
+def _conditional(entry):
+    # If-None-Match uses weak comparison; response_compression marks compressed bodies' ETags weak
+    if request.if_none_match.contains_weak(entry["etag"]):
+        response = Response(status=304)
+    else:
+        response = Response(entry["body"], status=200, mimetype=entry["mimetype"])
+    response.set_etag(entry["etag"])
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    response.headers["Vary"] = "Authorization"
+    return response
+
+
+def cached_response(ttl, tags=()):
+    """
+    Cache a GET view's 200 responses per caller
+
+    Args:
+        ttl: Seconds an entry may be served without re-running the view
+        tags: Invalidation tags, or a callable taking the view's kwargs and returning them
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            entry_tags = tuple(tags(**kwargs) if callable(tags) else tags)
+            key = (request.endpoint, request.full_path, caller_identity())
+            # Read the version before running the view: a write racing with it leaves a stale version behind
+            version = _version_of(entry_tags)
+            entry = response_cache.get(key, version)
+            if entry is None:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                body = response.get_data()
+                entry = response_cache.put(key, version, ttl, body, response.mimetype, make_etag(body))
+            return _conditional(entry)
+        return decorated_function
+    return decorator
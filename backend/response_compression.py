@@ -0,0 +1,75 @@
+"""
+Response compression for MedTrust AI
+Compresses JSON and text responses of at least COMPRESS_MIN_SIZE bytes with
+brotli (if installed) or gzip, whichever the client prefers per
+Accept-Encoding. Streamed responses and responses that already set
+Content-Encoding (e.g. /export_logs) are left alone.
+"""
+
+import gzip
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# ---------- CONFIGURATION ----------
+COMPRESS_MIN_SIZE = 1024        # bytes; smaller bodies are not worth the CPU
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5              # 0-11; 4-6 is the usual sweet spot for dynamic responses
+COMPRESSIBLE_MIMETYPES = {"application/json", "application/x-ndjson", "text/csv", "text/html", "text/plain"}
+
+
+def _encoders():
+    encoders = {"gzip": lambda data: gzip.compress(data, compresslevel=GZIP_LEVEL)}
+    if brotli is not None:
+        encoders["br"] = lambda data: brotli.compress(data, quality=BROTLI_QUALITY)
+    return encoders
+
+
+ENCODERS = _encoders()
+
+
+def choose_encoding(accept_encodings):
+    """
+    Best supported content coding for a request
+
+    Args:
+        accept_encodings: werkzeug MIMEAccept-style object (request.accept_encodings)
+
+    Returns:
+        "br", "gzip" or None
+    """
+    return accept_encodings.best_match(sorted(ENCODERS, key=lambda e: e != "br"))
+
+
+def compress_response(response, accept_encodings):
+    """Compress a finished response in place when worthwhile; returns the response"""
+    if (response.status_code < 200 or response.status_code in (204, 206, 304)
+            or response.direct_passthrough or response.is_streamed
+            or "Content-Encoding" in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding = choose_encoding(accept_encodings)
+    if not encoding:
+        return response
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_SIZE:
+        return response
+
+    response.set_data(ENCODERS[encoding](data))
+    response.headers["Content-Encoding"] = encoding
+    # The encoded body differs byte-for-byte, so a strong validator must become weak
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_compression(app):
+    @app.after_request
+    def _compress(response):
+        return compress_response(response, request.accept_encodings)
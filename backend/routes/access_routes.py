@@ -7,13 +7,15 @@ import os
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from firebase_init import db, firebase_admin_initialized
+from firebase_init import firebase_admin_initialized
 from limiter import limiter
 from utils import get_client_ip_from_request, is_ip_in_network, TRUST_THRESHOLD
-from helpers import patient_doc_id
-from trust_logic import get_trust_score, update_trust_score, safe_log_access
 from ml_logic import analyze_justification
-from encryption import encrypt_sensitive_data, decrypt_sensitive_data
+from encryption import encrypt_sensitive_data
+from access_pipeline import AccessPrefetch, record_decision, defer_write
+from trust_logic import safe_log_access
+import log_store
+from flag_queue import flag_priority
 
 access_bp = Blueprint('access_routes', __name__)
 
@@ -27,43 +29,32 @@ def normal_access():
     print(f"🏥 Normal Access Attempt: {name} from {ip}")
     try:
         if not is_ip_in_network(ip):
-            safe_log_access({
+            record_decision({
                 "doctor_name": name,
                 "doctor_role": role,
                 "action": "Normal Access (Outside Network)",
                 "ip": ip,
                 "status": "Denied",
                 "timestamp": datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
-            })
-            update_trust_score(name, -5)
+            }, name, -5)
             return jsonify({"success": False, "message": "❌ Access denied — outside hospital network.", "patient_data": {}, "pdf_link": None}), 403
-        log_data = {
+
+        # ✅ Patient read starts now; log + trust writes happen off the request path
+        prefetch = AccessPrefetch(name, patient_name, fetch_trust=False)
+        record_decision({
             "doctor_name": name,
             "doctor_role": role,
             "action": "Normal Access (In-Network)",
             "ip": ip,
             "status": "Granted",
             "timestamp": datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
-        }
-        # ✅ Encrypt IP if needed for privacy
-        safe_log_access(log_data)
-        update_trust_score(name, +2)
-        # fetch patient
-        pid = patient_doc_id(patient_name)
-        patient_info = None
-        if firebase_admin_initialized:
-            patient_ref = db.collection("patients").document(pid)
-            pdoc = patient_ref.get()
-            if pdoc.exists:
-                patient_info = pdoc.to_dict()
+        }, name, +2)
+
+        patient_info = prefetch.patient()
         if not patient_info:
             return jsonify({"success": False, "message": "❌ Patient not found", "patient_data": {}, "pdf_link": None}), 404
-        
-        # ✅ Decrypt sensitive fields before returning
-        patient_info = decrypt_sensitive_data(patient_info, ["diagnosis", "treatment", "notes"])
-        
-        pdf_link = f"/generate_patient_pdf/{pid}"
-        return jsonify({"success": True, "message": f"✅ Normal access granted from {ip}.", "patient_data": patient_info, "pdf_link": pdf_link}), 200
+
+        return jsonify({"success": True, "message": f"✅ Normal access granted from {ip}.", "patient_data": patient_info, "pdf_link": prefetch.pdf_link}), 200
     except Exception as e:
         print("Error verifying IP:", e)
         traceback.print_exc()
@@ -77,44 +68,35 @@ def restricted_access():
     justification = (data.get("justification") or "").strip()
     patient_name = (data.get("patient_name") or "").strip()
     ip = get_client_ip_from_request(request)
-    user_trust = get_trust_score(name)
     try:
-        if is_ip_in_network(ip):
-            safe_log_access({
+        in_network = is_ip_in_network(ip)
+        # ✅ Trust and patient reads run in parallel (trust only matters outside the network)
+        prefetch = AccessPrefetch(name, patient_name, fetch_trust=not in_network)
+
+        if in_network:
+            record_decision({
                 "doctor_name": name,
                 "doctor_role": role,
                 "action": "Restricted Access (In-Network)",
                 "ip": ip,
                 "status": "Granted",
                 "timestamp": datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
-            })
-            update_trust_score(name, +1)
-            pid = patient_doc_id(patient_name)
-            patient_info = None
-            if firebase_admin_initialized:
-                patient_ref = db.collection("patients").document(pid)
-                pdoc = patient_ref.get()
-                if pdoc.exists:
-                    patient_info = pdoc.to_dict()
+            }, name, +1)
+            patient_info = prefetch.patient()
             if not patient_info:
                 return jsonify({"success": False, "message": "❌ Patient not found", "patient_data": {}, "pdf_link": None}), 404
-            
-            # ✅ Decrypt patient data for in-network access too
-            patient_info = decrypt_sensitive_data(patient_info, ["diagnosis", "treatment", "notes"])
 
-            pdf_link = f"/generate_patient_pdf/{pid}"
-            return jsonify({"success": True, "message": "⚠️ Restricted access granted (inside hospital).", "patient_data": patient_info, "pdf_link": pdf_link}), 200
+            return jsonify({"success": True, "message": "⚠️ Restricted access granted (inside hospital).", "patient_data": patient_info, "pdf_link": prefetch.pdf_link}), 200
 
-        if user_trust < TRUST_THRESHOLD:
-            safe_log_access({
+        if prefetch.trust_score() < TRUST_THRESHOLD:
+            record_decision({
                 "doctor_name": name,
                 "doctor_role": role,
                 "action": "Restricted Access (Low Trust)",
                 "ip": ip,
                 "status": "Denied",
                 "timestamp": datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
-            })
-            update_trust_score(name, -5)
+            }, name, -5)
             return jsonify({"success": False, "message": "❌ Low trust — access denied.", "patient_data": {}, "pdf_link": None}), 403
 
         if not justification:
@@ -136,24 +118,14 @@ def restricted_access():
         }
         # ✅ Encrypt justification before logging
         log_data = encrypt_sensitive_data(log_data, ["justification"])
-        safe_log_access(log_data)
-        update_trust_score(name, +2 if is_valid else -3)
+        priority = None if is_valid else flag_priority(label, score, prefetch.trust_score(), ["emergency", "restricted"])
+        record_decision(log_data, name, +2 if is_valid else -3, flag_priority=priority)
 
-        pid = patient_doc_id(patient_name)
-        patient_info = None
-        if firebase_admin_initialized:
-            patient_ref = db.collection("patients").document(pid)
-            pdoc = patient_ref.get()
-            if pdoc.exists:
-                patient_info = pdoc.to_dict()
+        patient_info = prefetch.patient()
         if not patient_info:
             return jsonify({"success": False, "message": "❌ Patient not found", "patient_data": {}, "pdf_link": None}), 404
-        
-        # ✅ Decrypt patient data before returning
-        patient_info = decrypt_sensitive_data(patient_info, ["diagnosis", "treatment", "notes"])
-        
-        pdf_link = f"/generate_patient_pdf/{pid}"
-        return jsonify({"success": is_valid, "message": ("🌐 Restricted Access Granted ✅" if is_valid else "⚠️ Access flagged for review."), "patient_data": patient_info, "pdf_link": pdf_link}), (200 if is_valid else 403)
+
+        return jsonify({"success": is_valid, "message": ("🌐 Restricted Access Granted ✅" if is_valid else "⚠️ Access flagged for review."), "patient_data": patient_info, "pdf_link": prefetch.pdf_link}), (200 if is_valid else 403)
     except Exception as e:
         print("❌ restricted_access error:", e)
         traceback.print_exc()
@@ -170,7 +142,7 @@ def emergency_access():
     ip = get_client_ip_from_request(request)
 
     if not justification:
-        update_trust_score(name, -2)
+        record_decision(None, name, -2)
         return jsonify({
             "success": False,
             "message": "❌ Justification required!",
@@ -178,6 +150,8 @@ def emergency_access():
             "pdf_link": None
         }), 400
 
+    # ✅ Patient and trust reads overlap with ML inference (trust ranks flagged requests for review)
+    prefetch = AccessPrefetch(name, patient_name)
     label, score = analyze_justification(justification)
 
     # 🚑 STRICT & SAFE emergency logic
@@ -198,19 +172,12 @@ def emergency_access():
     }
     # ✅ Encrypt justification before logging
     log_data = encrypt_sensitive_data(log_data, ["justification"])
-    safe_log_access(log_data)
-
-    update_trust_score(name, +3 if genuine else -10)
+    priority = None if genuine else flag_priority(label, score, prefetch.trust_score(), ["emergency"])
+    record_decision(log_data, name, +3 if genuine else -10, flag_priority=priority)
     msg = "🚑 Emergency access approved ✅" if genuine else "⚠️ Suspicious justification — logged."
 
-    # Fetch patient data
-    pid = patient_doc_id(patient_name) if patient_name else None
-    patient_info = None
-
-    if pid and firebase_admin_initialized:
-        pdoc = db.collection("patients").document(pid).get()
-        if pdoc.exists:
-            patient_info = pdoc.to_dict()
+    # ✅ Patient data arrives decrypted
+    patient_info = prefetch.patient()
 
     if not patient_info and patient_name:
         return jsonify({
@@ -220,11 +187,7 @@ def emergency_access():
             "pdf_link": None
         }), 404
 
-    # ✅ Decrypt patient data before returning
-    if patient_info:
-        patient_info = decrypt_sensitive_data(patient_info, ["diagnosis", "treatment", "notes"])
-
-    pdf_link = f"/generate_patient_pdf/{pid}" if pid and patient_info else None
+    pdf_link = prefetch.pdf_link if patient_info else None
 
     return jsonify({
         "success": genuine,
@@ -302,32 +265,14 @@ def log_access():
         
         if firebase_admin_initialized:
             try:
-                # ✅ Pass timeout to fail fast if DB is down
-                db.collection("access_logs").add(log, timeout=5)
-                
-                # ✅ Log to DoctorAccessLog
-                if doctor_name != "Unknown" and patient_name != "N/A" and (doctor_role or "").lower() == "doctor":
-                    doctor_access_log = {
-                        "doctor_name": doctor_name,
-                        "patient_name": patient_name,
-                        "action": data.get("action", "Unknown"),
-                        "status": data.get("status", "Pending"),
-                        "timestamp": datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"),
-                        "created_at": datetime.utcnow()
-                    }
-                    db.collection("DoctorAccessLog").add(doctor_access_log, timeout=5)
-                
-                # ✅ Log to NurseAccessLog
-                if doctor_name != "Unknown" and (doctor_role or "").lower() == "nurse":
-                    nurse_access_log = {
-                        "nurse_name": doctor_name,
-                        "patient_name": patient_name,
-                        "action": data.get("action", "Unknown"),
-                        "status": data.get("status", "Pending"),
-                        "timestamp": datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"),
-                        "created_at": datetime.utcnow()
-                    }
-                    db.collection("NurseAccessLog").add(nurse_access_log, timeout=5)
+                # ✅ One event write; doctors' and nurses' own actions also land in their day bucket
+                role = (doctor_role or "").lower()
+                clinician = None
+                if doctor_name != "Unknown" and patient_name != "N/A" and role == "doctor":
+                    clinician = ("doctor", doctor_name)
+                elif doctor_name != "Unknown" and role == "nurse":
+                    clinician = ("nurse", doctor_name)
+                log_store.write_event(log, clinician)
                     
                 print(f"🩺 Log added: {doctor_name} - {log['action']}")
                 return jsonify({"message": "Access logged ✅"})
@@ -356,15 +301,11 @@ def request_temp_access():
         return jsonify({"success": False, "message": "❌ Only nurses can request temporary access"}), 403
     try:
         if not is_ip_in_network(ip):
-            update_trust_score(name, -3)
+            record_decision(None, name, -3)
             return jsonify({"success": False, "message": "❌ Temporary access only available inside hospital network"}), 403
 
-        pid = patient_doc_id(patient_name)
-        patient_info = None
-        if firebase_admin_initialized:
-            pdoc = db.collection("patients").document(pid).get()
-            if pdoc.exists:
-                patient_info = pdoc.to_dict()
+        prefetch = AccessPrefetch(name, patient_name, fetch_trust=False)
+        patient_info = prefetch.patient()
         if not patient_info:
             return jsonify({"success": False, "message": "❌ Patient not found", "patient_data": {}, "pdf_link": None}), 404
 
@@ -379,28 +320,15 @@ def request_temp_access():
                 "duration": "30 minutes",
                 "timestamp": datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
             }
-            db.collection("access_logs").add(temp_access_log)
-            db.collection("NurseAccessLog").add({
-                "nurse_name": name,
-                "patient_name": patient_name,
-                "action": "Temporary Access Request",
-                "status": "Granted",
-                "timestamp": datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"),
-                "created_at": datetime.utcnow()
-            })
+            defer_write(safe_log_access, temp_access_log, ("nurse", name))
 
-        update_trust_score(name, +1)
-        
-        # ✅ Decrypt sensitive data before returning
-        if patient_info:
-            patient_info = decrypt_sensitive_data(patient_info, ["diagnosis", "treatment", "notes"])
+        record_decision(None, name, +1)
 
-        pdf_link = f"/generate_patient_pdf/{pid}"
         return jsonify({
             "success": True,
             "message": "✅ Temporary access granted for 30 minutes",
             "patient_data": patient_info,
-            "pdf_link": pdf_link
+            "pdf_link": prefetch.pdf_link
         }), 200
     except Exception as e:
         print("❌ request_temp_access error:", e)
@@ -1,6 +1,5 @@
 
 from flask import Blueprint, request, jsonify
-from firebase_admin import auth
 from google.cloud.firestore import FieldFilter
 import random
 import string
@@ -15,11 +14,13 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from limiter import limiter
 from firebase_init import db, firebase_admin_initialized
 from utils import send_otp_email, ADMIN_EMAIL
+from token_cache import verify_id_token_cached
+from otp_store import create_otp_store
 
 auth_bp = Blueprint('auth_routes', __name__)
 
-# ---------- In-memory OTP sessions ----------
-otp_sessions = {}
+# ---------- OTP sessions (memory:// or shared sqlite:/// via OTP_STORE_URI) ----------
+otp_sessions = create_otp_store()
 
 @auth_bp.route("/admin/login", methods=["POST"])
 def admin_login():
@@ -28,7 +29,7 @@ def admin_login():
         return jsonify({"error": "Missing token"}), 401
     try:
         token = token.replace("Bearer ", "")
-        decoded = auth.verify_id_token(token)
+        decoded = verify_id_token_cached(token)
         email = decoded.get("email")
         if email == ADMIN_EMAIL:
             print(f"✅ Admin verified: {email}")
@@ -79,12 +80,12 @@ def user_login():
         # Generate OTP and create session
         otp = "".join(random.choices(string.digits, k=6))
         session_id = f"{name}_{int(time.time())}"
-        otp_sessions[session_id] = {
+        otp_sessions.put(session_id, {
             "otp": otp,
             "expires": time.time() + 180,
             "email": email,  # ✅ Use email from form
             "name": name
-        }
+        })
         
         # ✅ Send OTP to email provided in form
         if send_otp_email(email, otp, name):
@@ -107,10 +108,12 @@ def verify_otp():
     if not record:
         return jsonify(verified=False, error="Session not found")
     if time.time() > record["expires"]:
-        otp_sessions.pop(session_id, None)
+        otp_sessions.pop(session_id)
         return jsonify(verified=False, error="OTP expired")
     if otp_input == record["otp"]:
-        otp_sessions.pop(session_id, None)
+        # Only the worker whose pop succeeds may accept the OTP
+        if otp_sessions.pop(session_id) is None:
+            return jsonify(verified=False, error="Session not found")
         return jsonify(verified=True)
     return jsonify(verified=False, error="Invalid OTP")
 
@@ -121,10 +124,10 @@ def resend_otp():
         data = request.get_json()
         session_id = data.get("session_id")
         
-        if not session_id or session_id not in otp_sessions:
+        session = otp_sessions.get(session_id) if session_id else None
+        if not session:
              return jsonify({"sent": False, "error": "Session expired or invalid. Please login again."}), 400
 
-        session = otp_sessions[session_id]
         email = session["email"]
         name = session["name"]
         
@@ -132,8 +135,7 @@ def resend_otp():
         new_otp = "".join(random.choices(string.digits, k=6))
         
         # Update session
-        otp_sessions[session_id]["otp"] = new_otp
-        otp_sessions[session_id]["expires"] = time.time() + 180 # Extend timer
+        otp_sessions.update(session_id, otp=new_otp, expires=time.time() + 180) # Extend timer
         
         # Send email
         if send_otp_email(email, new_otp, name):
@@ -0,0 +1,156 @@
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from datetime import datetime
+import traceback
+import sys
+import os
+from google.cloud.firestore import FieldFilter
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from firebase_init import db, firebase_admin_initialized
+from limiter import limiter
+from middleware import verify_admin_token
+from helpers import patient_doc_id
+from trust_logic import safe_log_access
+from report_export import create_export_job, get_export_job, stream_reports_zip
+from log_export import stream_log_export, EXPORT_SOURCES, EXPORT_FORMATS
+import patient_index
+
+export_bp = Blueprint('export_routes', __name__)
+
+GET_ALL_CHUNK = 100  # document references per batched read
+
+
+def _fetch_patients(pids):
+    """Lazily read patients by doc id with batched get_all calls"""
+    for i in range(0, len(pids), GET_ALL_CHUNK):
+        refs = [db.collection("patients").document(pid) for pid in pids[i:i + GET_ALL_CHUNK]]
+        for snapshot in db.get_all(refs):
+            if snapshot.exists:
+                yield snapshot.to_dict()
+
+
+def _select_patients(data):
+    """Return (patient iterable, count or None, description) for an export filter"""
+    doctor_name = (data.get("doctor_name") or "").strip()
+    patient_names = data.get("patient_names") or []
+
+    if doctor_name:
+        pids = patient_index.find_patients_by_doctor(doctor_name)
+        if not pids and not patient_index.index_ready():
+            docs = db.collection("patients").where(filter=FieldFilter("doctor_assigned", "==", doctor_name)).stream()
+            pids = [doc.id for doc in docs]
+        return _fetch_patients(pids), len(pids), f"patients of Dr. {doctor_name}"
+    if patient_names:
+        pids = list(dict.fromkeys(patient_doc_id(n) for n in patient_names if n and n.strip()))
+        return _fetch_patients(pids), len(pids), f"{len(pids)} selected patients"
+    if data.get("all"):
+        return (doc.to_dict() for doc in db.collection("patients").stream()), None, "all patients"
+    return None, 0, ""
+
+
+@export_bp.route("/export_reports", methods=["POST"])
+@verify_admin_token
+@limiter.limit("5 per hour")  # ✅ Exports are heavy; keep them rare
+def export_reports():
+    """
+    Stream a ZIP of patient PDF reports.
+    Body: {"doctor_name": ...} | {"patient_names": [...]} | {"all": true}, plus optional "requested_by".
+    The job id is returned in the X-Export-Job header; poll /export_reports/<job_id> for progress.
+    """
+    try:
+        if not firebase_admin_initialized:
+            return jsonify({"success": False, "message": "❌ Firebase not configured"}), 500
+
+        data = request.get_json() or {}
+        patients, total, description = _select_patients(data)
+        if patients is None:
+            return jsonify({"success": False, "message": "❌ Provide doctor_name, patient_names or all=true"}), 400
+
+        requested_by = data.get("requested_by", "Admin")
+        job = create_export_job(requested_by, description)
+        # Same keys as every other access event; no patient_name, since the export covers many patients
+        safe_log_access({
+            "doctor_name": requested_by,
+            "doctor_role": "admin",
+            "action": "Bulk Report Export",
+            "export": description,
+            "status": "Started",
+            "export_job": job.id,
+            "timestamp": datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+        })
+        print(f"📦 Export {job.id} started: {description}")
+
+        filename = f"EHR_Reports_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.zip"
+        # No Content-Length, so the archive goes out with chunked transfer encoding as reports finish
+        return Response(
+            stream_with_context(stream_reports_zip(job, patients, total)),
+            mimetype="application/zip",
+            headers={
+                "Content-Disposition": f"attachment; filename={filename}",
+                "X-Export-Job": job.id,
+                "Access-Control-Expose-Headers": "X-Export-Job",
+                "Cache-Control": "no-store"
+            }
+        )
+
+    except Exception as e:
+        print(f"❌ export_reports error: {e}")
+        traceback.print_exc()
+        return jsonify({"success": False, "message": str(e)}), 500
+
+
+@export_bp.route("/export_reports/<job_id>", methods=["GET"])
+@verify_admin_token
+def export_status(job_id):
+    job = get_export_job(job_id)
+    if not job:
+        return jsonify({"success": False, "message": "❌ Export job not found"}), 404
+    return jsonify({"success": True, "job": job.to_dict()}), 200
+
+
+@export_bp.route("/export_logs", methods=["GET"])
+@verify_admin_token
+@limiter.limit("10 per hour")
+def export_logs():
+    """
+    Stream the complete audit log as CSV or NDJSON.
+    Query: source=access|doctor|nurse, format=csv|ndjson, optional start_date/end_date (YYYY-MM-DD).
+    Gzip-encoded on the fly when the client accepts it.
+    """
+    try:
+        if not firebase_admin_initialized:
+            return jsonify({"success": False, "message": "❌ Firebase not configured"}), 500
+
+        source = request.args.get("source", "access")
+        fmt = request.args.get("format", "csv")
+        if source not in EXPORT_SOURCES or fmt not in EXPORT_FORMATS:
+            return jsonify({"success": False, "message": "❌ source must be access, doctor or nurse; format csv or ndjson"}), 400
+        start_date = request.args.get("start_date")
+        end_date = request.args.get("end_date")
+        compress = "gzip" in request.accept_encodings
+
+        safe_log_access({
+            "doctor_name": request.args.get("requested_by", "Admin"),
+            "doctor_role": "admin",
+            "action": "Audit Log Export",
+            "status": "Started",
+            "export": f"{source}.{fmt} {start_date or ''}..{end_date or ''}",
+            "timestamp": datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+        })
+
+        filename = f"{source}_logs_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.{fmt}"
+        headers = {"Content-Disposition": f"attachment; filename={filename}", "Cache-Control": "no-store"}
+        if compress:
+            headers["Content-Encoding"] = "gzip"
+            headers["Vary"] = "Accept-Encoding"
+        return Response(
+            stream_with_context(stream_log_export(source, fmt, start_date, end_date, compress)),
+            mimetype=EXPORT_FORMATS[fmt],
+            headers=headers
+        )
+
+    except Exception as e:
+        print(f"❌ export_logs error: {e}")
+        traceback.print_exc()
+        return jsonify({"success": False, "message": str(e)}), 500
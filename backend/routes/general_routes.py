@@ -1,15 +1,19 @@
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify
 from datetime import datetime
 import sys
 import os
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from firebase_init import firebase_admin_initialized
+from firebase_init import db, firebase_admin_initialized
+from firestore_manager import rpc_stats
 import ml_logic
 from trust_logic import get_trust_score
 from utils import get_client_ip_from_request, is_ip_in_network
+from response_cache import cached_response
+from limiter import limiter
+import metrics
 
 general_bp = Blueprint('general_routes', __name__)
 
@@ -26,6 +30,10 @@ def health_check():
             "timestamp": datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"),
             "firebase": "connected" if firebase_admin_initialized else "disconnected",
             "ml_model": "loaded" if ml_logic.ml_model is not None else "not loaded",
+            "firestore": {
+                "channels": len(db) if db is not None else 0,
+                "rpc": rpc_stats.snapshot()
+            },
             "version": "1.0.0"
         }
         return jsonify(health_status), 200
@@ -37,7 +45,16 @@ def health_check():
             "timestamp": datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
         }), 500
 
+@general_bp.route("/metrics", methods=["GET"])
+@limiter.exempt  # scraped every few seconds by the monitoring system
+def metrics_endpoint():
+    """Prometheus scrape endpoint (see metrics.py)"""
+    if not metrics.authorized(request.headers.get("Authorization")):
+        return jsonify({"error": "Unauthorized"}), 401
+    return Response(metrics.registry.render(), content_type=metrics.CONTENT_TYPE)
+
 @general_bp.route("/trust_score/<name>", methods=["GET"])
+@cached_response(ttl=15, tags=lambda name: [f"trust:{name}"])
 def trust_score(name):
     return jsonify({"trust_score": get_trust_score(name)})
 
@@ -0,0 +1,57 @@
+from flask import Blueprint, request, jsonify
+import traceback
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from limiter import limiter
+from middleware import verify_admin_token
+from jobs import job_runner, registered_kinds
+import admin_jobs, migrate_patient_ids, migrate_user_ids  # registers the job kinds
+
+job_bp = Blueprint('job_routes', __name__)
+
+@job_bp.route("/jobs", methods=["POST"])
+@verify_admin_token
+@limiter.limit("20 per hour")  # ✅ Jobs are heavy; avoid accidental floods
+def start_job():
+    """Start a background job. Body: {"kind": ..., "params": {...}, "requested_by": ...}"""
+    try:
+        data = request.get_json() or {}
+        kind = data.get("kind")
+        if kind not in registered_kinds():
+            return jsonify({"success": False, "message": f"❌ Unknown job kind. Available: {registered_kinds()}"}), 400
+        job_id = job_runner.submit(kind, data.get("params") or {}, data.get("requested_by", "Admin"))
+        return jsonify({"success": True, "job": job_runner.get(job_id)}), 202
+    except Exception as e:
+        print(f"❌ start_job error: {e}")
+        traceback.print_exc()
+        return jsonify({"success": False, "message": str(e)}), 500
+
+@job_bp.route("/jobs", methods=["GET"])
+@verify_admin_token
+def list_jobs():
+    try:
+        status = request.args.get("status")
+        limit = min(int(request.args.get("limit", 50)), 200)
+        jobs = job_runner.list(status, limit)
+        return jsonify({"success": True, "jobs": jobs, "count": len(jobs), "kinds": registered_kinds()}), 200
+    except Exception as e:
+        print(f"❌ list_jobs error: {e}")
+        return jsonify({"success": False, "message": str(e)}), 500
+
+@job_bp.route("/jobs/<job_id>", methods=["GET"])
+@verify_admin_token
+def job_status(job_id):
+    job = job_runner.get(job_id)
+    if not job:
+        return jsonify({"success": False, "message": "❌ Job not found"}), 404
+    return jsonify({"success": True, "job": job}), 200
+
+@job_bp.route("/jobs/<job_id>/cancel", methods=["POST"])
+@verify_admin_token
+def cancel_job(job_id):
+    if not job_runner.cancel(job_id):
+        return jsonify({"success": False, "message": "❌ Job not found or already finished"}), 404
+    return jsonify({"success": True, "job": job_runner.get(job_id)}), 200
@@ -10,45 +10,40 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from firebase_init import db, firebase_admin_initialized
 from middleware import verify_admin_token
 from encryption import decrypt_sensitive_data
+import log_store
+import flag_queue
+import patient_timeline
+from response_cache import cached_response
 
 logs_bp = Blueprint('logs_routes', __name__)
 
 @logs_bp.route("/patient_access_history/<patient_name>", methods=["GET"])
 def get_patient_access_history(patient_name):
     """
-    Fetch access logs specifically for a patient.
-    Aggregates logs from both 'access_logs' (system-wide) and 'DoctorAccessLog'.
+    Fetch access logs specifically for a patient, newest first.
+    Served from the patient's timeline (one to two page reads); pass the returned
+    next_cursor as ?cursor= for older entries. Doctors' own actions are tagged source="doctor".
     """
     try:
         if not firebase_admin_initialized:
             return jsonify({"success": False, "message": "❌ Firebase not configured"}), 500
         
-        logs = []
-        patient_name_lower = patient_name.lower().strip()
+        cursor = request.args.get("cursor")
+        patient_id = patient_timeline.resolve_patient_id({"patient_name": patient_name})
+        logs, next_cursor = patient_timeline.timeline(patient_id, cursor)
+        if not logs and not cursor:
+            # No timeline yet (backfill_patient_timelines not run): query the day buckets by name
+            logs = log_store.patient_events({patient_name.lower().strip(), patient_name})
         
-        # 1. Fetch from main access_logs
-        log_refs = db.collection("access_logs").where(filter=FieldFilter("patient_name", "==", patient_name_lower)).stream()
-        for doc in log_refs:
-            log = doc.to_dict()
-            log["source"] = "system"
-            log["id"] = doc.id
-            logs.append(log)
-            
-        # 2. Fetch from DoctorAccessLog (try exact match first as these are often preserved case)
-        doc_log_refs = db.collection("DoctorAccessLog").where(filter=FieldFilter("patient_name", "==", patient_name)).stream()
-        for doc in doc_log_refs:
-            log = doc.to_dict()
-            log["source"] = "doctor"
-            log["id"] = doc.id
-            logs.append(log)
-
-        # Sort by timestamp descending
-        logs.sort(key=lambda x: x.get("timestamp", ""), reverse=True)
+        for log in logs:
+            is_doctor = (log.get("doctor_role") or "").lower() == "doctor" or "updated_by" in log
+            log["source"] = "doctor" if is_doctor else "system"
         
         return jsonify({
             "success": True, 
-            "logs": logs, 
-            "count": len(logs)
+            "logs": [decrypt_sensitive_data(log, ["justification"]) for log in logs], 
+            "count": len(logs),
+            "next_cursor": next_cursor
         }), 200
 
     except Exception as e:
@@ -64,29 +59,8 @@ def get_all_doctor_access_logs():
         start_date = request.args.get("start_date")  # Format: YYYY-MM-DD
         end_date = request.args.get("end_date")      # Format: YYYY-MM-DD
         
-        logs = []
-        if firebase_admin_initialized:
-            for doc in db.collection("DoctorAccessLog").stream():
-                log_entry = {**doc.to_dict(), "id": doc.id}
-                
-                # ✅ Decrypt sensitive fields
-                log_entry = decrypt_sensitive_data(log_entry, ["justification"])
-                
-                # ✅ Apply date filters if provided
-                if start_date or end_date:
-                    log_timestamp = log_entry.get("timestamp", "")
-                    if log_timestamp:
-                        log_date = log_timestamp.split(" ")[0]  # Extract YYYY-MM-DD
-                        
-                        if start_date and log_date < start_date:
-                            continue
-                        if end_date and log_date > end_date:
-                            continue
-                
-                logs.append(log_entry)
-        
-        logs.sort(key=lambda x: x.get("timestamp", ""), reverse=True)
-        logs = logs[:500]
+        # ✅ Day buckets, newest day first, until 500 events are collected
+        logs = log_store.all_clinician_events("doctor", start_date, end_date, limit=500)
         
         return jsonify({
             "success": True, 
@@ -100,13 +74,10 @@ def get_all_doctor_access_logs():
         return jsonify({"success": False, "error": str(e)}), 500
 
 @logs_bp.route("/doctor_access_logs/<doctor_name>", methods=["GET"])
+@cached_response(ttl=15, tags=lambda doctor_name: [log_store.clinician_key("doctor", doctor_name)])
 def get_doctor_access_logs(doctor_name):
     try:
-        logs = []
-        if firebase_admin_initialized:
-            for doc in db.collection("DoctorAccessLog").where(filter=FieldFilter("doctor_name", "==", doctor_name)).stream():
-                logs.append({**doc.to_dict(), "id": doc.id})
-        logs.sort(key=lambda x: x.get("timestamp", ""), reverse=True)
+        logs = log_store.clinician_events("doctor", doctor_name)
         return jsonify({"success": True, "logs": logs, "count": len(logs)}), 200
     except Exception as e:
         print("❌ get_doctor_access_logs error:", e)
@@ -116,11 +87,7 @@ def get_doctor_access_logs(doctor_name):
 @logs_bp.route("/patient_access_logs/<patient_name>", methods=["GET"])
 def patient_access_logs(patient_name):
     try:
-        logs = []
-        if firebase_admin_initialized:
-            for doc in db.collection("access_logs").where(filter=FieldFilter("patient_name", "==", patient_name)).stream():
-                logs.append({**doc.to_dict(), "id": doc.id})
-        logs.sort(key=lambda x: x.get("timestamp", ""), reverse=True)
+        logs = log_store.patient_events([patient_name])
         return jsonify({"success": True, "logs": logs}), 200
     except Exception as e:
         print("❌ patient_access_logs error:", e)
@@ -129,22 +96,27 @@ def patient_access_logs(patient_name):
 
 @logs_bp.route("/doctor_patient_interactions/<doctor_name>", methods=["GET"])
 def get_doctor_patient_interactions(doctor_name):
+    """
+    Per-patient interaction summaries for a doctor (count, last access, statuses and per-status counts).
+    Query: sort=recent|frequent (default recent), optional limit for the top K.
+    """
     try:
-        logs = []
-        if firebase_admin_initialized:
-            for doc in db.collection("DoctorAccessLog").where(filter=FieldFilter("doctor_name", "==", doctor_name)).stream():
-                logs.append(doc.to_dict())
-        unique_patients = {}
-        for log in logs:
-            patient = (log.get("patient_name") or "").lower()
-            if not patient or patient == "n/a":
-                continue
-            if patient not in unique_patients:
-                unique_patients[patient] = {"patient_name": log.get("patient_name", ""), "access_count": 0, "last_access": log.get("timestamp", ""), "statuses": []}
-            unique_patients[patient]["access_count"] += 1
-            unique_patients[patient]["statuses"].append(log.get("status", ""))
-        patients_list = list(unique_patients.values())
-        return jsonify({"success": True, "patients": patients_list, "total_interactions": len(logs)}), 200
+        sort = request.args.get("sort", "recent")
+        if sort not in ("recent", "frequent"):
+            return jsonify({"success": False, "error": "sort must be recent or frequent"}), 400
+        limit = request.args.get("limit", type=int)
+
+        summaries = log_store.doctor_interactions(doctor_name, sort)
+        total = sum(s.get("access_count", 0) for s in summaries)
+        patients_list = [{
+            "patient_name": s.get("patient_name", ""),
+            "access_count": s.get("access_count", 0),
+            "last_access": s.get("last_access", ""),
+            # Distinct statuses as before; per-status counts come from the summary's histogram
+            "statuses": sorted(status for status, count in s.get("statuses", {}).items() if count > 0),
+            "status_counts": {status: count for status, count in s.get("statuses", {}).items() if count > 0}
+        } for s in summaries[:limit or None]]
+        return jsonify({"success": True, "patients": patients_list, "total_interactions": total}), 200
     except Exception as e:
         print("❌ doctor_patient_interactions error:", e)
         traceback.print_exc()
@@ -196,29 +168,8 @@ def get_all_nurse_access_logs():
         start_date = request.args.get("start_date")  # Format: YYYY-MM-DD
         end_date = request.args.get("end_date")      # Format: YYYY-MM-DD
         
-        logs = []
-        if firebase_admin_initialized:
-            for doc in db.collection("NurseAccessLog").stream():
-                log_entry = {**doc.to_dict(), "id": doc.id}
-                
-                # ✅ Decrypt sensitive fields
-                log_entry = decrypt_sensitive_data(log_entry, ["justification"])
-                
-                # ✅ Apply date filters if provided
-                if start_date or end_date:
-                    log_timestamp = log_entry.get("timestamp", "")
-                    if log_timestamp:
-                        log_date = log_timestamp.split(" ")[0]  # Extract YYYY-MM-DD
-                        
-                        if start_date and log_date < start_date:
-                            continue
-                        if end_date and log_date > end_date:
-                            continue
-                
-                logs.append(log_entry)
-        
-        logs.sort(key=lambda x: x.get("timestamp", ""), reverse=True)
-        logs = logs[:500]
+        # ✅ Day buckets, newest day first, until 500 events are collected
+        logs = log_store.all_clinician_events("nurse", start_date, end_date, limit=500)
         
         return jsonify({
             "success": True, 
@@ -232,13 +183,10 @@ def get_all_nurse_access_logs():
         return jsonify({"success": False, "error": str(e)}), 500
 
 @logs_bp.route("/nurse_access_logs/<nurse_name>", methods=["GET"])
+@cached_response(ttl=15, tags=lambda nurse_name: [log_store.clinician_key("nurse", nurse_name)])
 def get_nurse_access_logs(nurse_name):
     try:
-        logs = []
-        if firebase_admin_initialized:
-            for doc in db.collection("NurseAccessLog").where(filter=FieldFilter("nurse_name", "==", nurse_name)).stream():
-                logs.append({**doc.to_dict(), "id": doc.id})
-        logs.sort(key=lambda x: x.get("timestamp", ""), reverse=True)
+        logs = log_store.clinician_events("nurse", nurse_name)
         return jsonify({"success": True, "logs": logs, "count": len(logs)}), 200
     except Exception as e:
         print("❌ get_nurse_access_logs error:", e)
@@ -252,35 +200,19 @@ def access_logs_admin():
         # ✅ Get optional date filter parameters
         start_date = request.args.get("start_date")  # Format: YYYY-MM-DD
         end_date = request.args.get("end_date")      # Format: YYYY-MM-DD
+        status = request.args.get("status")          # e.g. Flagged
         
         if not firebase_admin_initialized:
             return jsonify({"success": False, "message": "❌ Firebase not configured"}), 500
         
-        logs = []
-        for doc in db.collection("access_logs").stream():
-            log_entry = {**doc.to_dict(), "id": doc.id}
-            
-            # ✅ Apply date filters if provided
-            if start_date or end_date:
-                log_timestamp = log_entry.get("timestamp", "")
-                if log_timestamp:
-                    log_date = log_timestamp.split(" ")[0]  # Extract YYYY-MM-DD
-                    
-                    if start_date and log_date < start_date:
-                        continue
-                    if end_date and log_date > end_date:
-                        continue
-            
-            logs.append(log_entry)
-        
-        logs.sort(key=lambda x: x.get("timestamp", ""), reverse=True)
-        logs = logs[:500]
+        # ✅ Walks day buckets (hot, then archived) newest first and stops once 500 events are collected
+        logs = log_store.recent_events(500, start_date, end_date, status)
         
         return jsonify({
             "success": True, 
             "logs": logs, 
             "count": len(logs),
-            "filters": {"start_date": start_date, "end_date": end_date}
+            "filters": {"start_date": start_date, "end_date": end_date, "status": status}
         }), 200
     except Exception as e:
         print("❌ access_logs_admin error:", e)
@@ -291,29 +223,83 @@ def access_logs_admin():
 @verify_admin_token
 def update_log_status():
     """
-    Update the status of a specific log entry (e.g., mark as 'Reviewed' or 'Dismissed')
-    Target Collection: 'access_logs' (System Logs)
+    Update the status of log entries (e.g., mark as 'Reviewed' or 'Dismissed')
+    Body: {"log_id": ...} or {"log_ids": [...]} (bulk, up to flag_queue.MAX_BULK_UPDATE), "status", optional "reviewer"
+    Target: the events' day buckets (log ids are "<YYYY-MM-DD>/<id>", see log_store) and
+    their review queue entries, all in one transaction
     """
     try:
         data = request.json
-        log_id = data.get("log_id")
+        log_ids = data.get("log_ids") or ([data["log_id"]] if data.get("log_id") else [])
         new_status = data.get("status") # e.g., "Reviewed", "Dismissed", "Resolved"
 
-        if not log_id or not new_status:
+        if not log_ids or not new_status:
             return jsonify({"success": False, "message": "Missing log_id or status"}), 400
+        if len(log_ids) > flag_queue.MAX_BULK_UPDATE:
+            return jsonify({"success": False, "message": f"At most {flag_queue.MAX_BULK_UPDATE} log ids per update"}), 400
 
-        # Update in Firestore
-        if firebase_admin_initialized:
-            log_ref = db.collection("access_logs").document(log_id)
-            if log_ref.get().exists:
-                log_ref.update({"status": new_status})
-                return jsonify({"success": True, "message": f"Log {log_id} updated to {new_status}"}), 200
-            else:
-                 return jsonify({"success": False, "message": "Log entry not found"}), 404
-        
-        return jsonify({"success": False, "message": "Database not initialized"}), 500
+        if not firebase_admin_initialized:
+            return jsonify({"success": False, "message": "Database not initialized"}), 500
+
+        # ✅ A reviewer only touches entries they hold (or nobody holds); without one, admins override leases
+        reviewer = data.get("reviewer")
+        result = flag_queue.set_status(log_ids, new_status, reviewer, force=not reviewer)
+        # ✅ Archived events count as done: their review queue entries were closed
+        done = len(result["updated"]) + len(result["archived"])
+        if not done and result["missing"]:
+            return jsonify({"success": False, "message": "Log entry not found", **result}), 404
+        if not done and result["conflicts"]:
+            return jsonify({"success": False, "message": "Claimed by another reviewer", **result}), 409
+        message = f"Log {log_ids[0]} updated to {new_status}" if len(log_ids) == 1 else f"{done} logs updated to {new_status}"
+        return jsonify({"success": True, "message": message, **result}), 200
 
     except Exception as e:
         print("❌ update_log_status error:", e)
         traceback.print_exc()
         return jsonify({"success": False, "message": str(e)}), 500
+
+@logs_bp.route("/flagged_events", methods=["GET"])
+@verify_admin_token
+def flagged_events():
+    """
+    Review queue page, highest priority first
+    Query: state=open|claimed|resolved, limit, cursor (next_cursor of the previous page)
+    """
+    try:
+        if not firebase_admin_initialized:
+            return jsonify({"success": False, "message": "❌ Firebase not configured"}), 500
+
+        state = request.args.get("state", "open")
+        if state not in flag_queue.QUEUE_STATES:
+            return jsonify({"success": False, "message": "❌ state must be open, claimed or resolved"}), 400
+        limit = min(request.args.get("limit", flag_queue.FLAG_PAGE_SIZE, type=int), 200)
+
+        items, next_cursor = flag_queue.list_flags(state, limit, request.args.get("cursor"))
+        return jsonify({"success": True, "flags": items, "count": len(items), "next_cursor": next_cursor}), 200
+    except Exception as e:
+        print("❌ flagged_events error:", e)
+        traceback.print_exc()
+        return jsonify({"success": False, "message": str(e)}), 500
+
+@logs_bp.route("/flagged_events/claim", methods=["POST"])
+@verify_admin_token
+def claim_flagged_events():
+    """
+    Lease the highest-priority unclaimed flagged events to a reviewer
+    Body: {"reviewer": ..., "limit": 10}; the lease lasts flag_queue.FLAG_LEASE_SECONDS
+    """
+    try:
+        data = request.get_json() or {}
+        reviewer = (data.get("reviewer") or "").strip()
+        if not reviewer:
+            return jsonify({"success": False, "message": "Missing reviewer"}), 400
+        if not firebase_admin_initialized:
+            return jsonify({"success": False, "message": "❌ Firebase not configured"}), 500
+
+        items = flag_queue.claim(reviewer, min(int(data.get("limit", 10)), 50))
+        return jsonify({"success": True, "flags": items, "count": len(items),
+                        "lease_seconds": flag_queue.FLAG_LEASE_SECONDS}), 200
+    except Exception as e:
+        print("❌ claim_flagged_events error:", e)
+        traceback.print_exc()
+        return jsonify({"success": False, "message": str(e)}), 500
@@ -1,10 +1,9 @@
 
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, request, jsonify, send_file, current_app
 from datetime import datetime
 import traceback
 import sys
 import os
-from google.cloud.firestore import FieldFilter
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
@@ -12,8 +11,14 @@ from firebase_init import db, firebase_admin_initialized
 from limiter import limiter
 from middleware import verify_admin_token
 from helpers import patient_doc_id
-from utils import create_patient_pdf_bytes
+from utils import create_patient_pdf_bytes, render_error_pdf
+from pdf_report import available_fonts, TEMPLATE_VERSION
+from pdf_cache import pdf_cache, report_key
+import io
 from encryption import encrypt_sensitive_data, decrypt_sensitive_data
+import patient_index
+import log_store
+from response_cache import cached_response
 
 patient_bp = Blueprint('patient_routes', __name__)
 
@@ -48,7 +53,6 @@ def add_patient():
         patient_id = f"PT-{str(uuid.uuid4())[:8].upper()}"
 
         pid = patient_doc_id(patient_name)
-        patient_ref = db.collection("patients").document(pid)
         patient_data = {
             "name": patient_name,
             "patient_id": patient_id,  # ✅ Added ID
@@ -64,12 +68,14 @@ def add_patient():
         }
         # ✅ Encrypt sensitive medical fields
         patient_data = encrypt_sensitive_data(patient_data, ["diagnosis", "treatment", "notes"])
-        patient_ref.set(patient_data, merge=True)
+        # ✅ Writes the patient and its patient_id/email/doctor index entries together
+        patient_index.save_patient(pid, patient_data, merge=True)
 
-        db.collection("access_logs").add({
+        log_store.write_event({
             "doctor_name": doctor_name,
             "action": "Added Patient Details",
             "patient_name": patient_name.lower(),
+            "patient_id": patient_id,
             "status": "Success",
             "timestamp": datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
         })
@@ -99,20 +105,26 @@ def update_patient():
             return jsonify({"success": False, "message": "❌ No updates provided"}), 400
 
         pid = patient_doc_id(patient_name)
-        patient_ref = db.collection("patients").document(pid)
-        patient_doc = patient_ref.get()
+
+        # Add metadata to updates
+        updates["last_updated_at"] = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+        
+        # Track who made the update if provided
+        if "updated_by" in data:
+            updates["last_updated_by"] = data["updated_by"]
+
+        # ✅ Encrypt sensitive medical fields before updating
+        updates = encrypt_sensitive_data(updates, ["diagnosis", "treatment", "notes", "justification"])
+        
+        # Perform the update (returns the merged document, so no re-fetch is needed)
+        updated_patient = patient_index.update_patient(pid, updates)
 
         # ✅ NEW: If patient doesn't exist in patients collection, check users collection
-        if not patient_doc.exists:
+        if updated_patient is None:
             print(f"⚠️ Patient '{patient_name}' not found in patients collection. Checking users collection...")
             
-            # Try to find patient in users collection
-            users_ref = db.collection("users").where(filter=FieldFilter("name", "==", patient_name)).limit(1).stream()
-            user_data = None
-            
-            for user_doc in users_ref:
-                user_data = user_doc.to_dict()
-                break
+            # Try to find patient in users collection (index point read)
+            user_data = patient_index.get_user_by_name(patient_name)
             
             if user_data and user_data.get("role", "").lower() == "patient":
                 # ✅ Found in users collection - create in patients collection
@@ -131,52 +143,27 @@ def update_patient():
                     "created_at": datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
                 }
                 
-                # Create the patient document
-                patient_ref.set(initial_patient_data)
+                # Create the patient document with the updates already applied
+                updated_patient = patient_index.save_patient(pid, {**initial_patient_data, **updates}, merge=False)
                 print(f"✅ Patient record created for '{patient_name}'")
             else:
                 return jsonify({"success": False, "message": f"❌ Patient '{patient_name}' not found in system"}), 404
 
-        # Add metadata to updates
-        updates["last_updated_at"] = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
-        
-        # Track who made the update if provided
-        if "updated_by" in data:
-            updates["last_updated_by"] = data["updated_by"]
-
-        # ✅ Encrypt sensitive medical fields before updating
-        updates = encrypt_sensitive_data(updates, ["diagnosis", "treatment", "notes", "justification"])
-        
-        # Perform the update
-        patient_ref.update(updates)
-
-        # Fetch updated patient data
-        updated_patient = patient_ref.get().to_dict()
-        
         # ✅ Decrypt sensitive fields for response
         updated_patient = decrypt_sensitive_data(updated_patient, ["diagnosis", "treatment", "notes", "justification"])
 
         # Log the update action
         try:
-            db.collection("access_logs").add({
+            # ✅ One event write; the updating doctor's history gets a day bucket entry
+            log_store.write_event({
                 "action": "Update Patient Details",
                 "patient_name": patient_name,
+                "patient_id": updated_patient.get("patient_id"),
                 "fields_updated": list(updates.keys()),
                 "status": "Success",
                 "timestamp": datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"),
                 "updated_by": data.get("updated_by", "Unknown")
-            })
-            
-            # ✅ Also log in DoctorAccessLog for "My Patients" tracking
-            if "updated_by" in data:
-                db.collection("DoctorAccessLog").add({
-                    "doctor_name": data["updated_by"],
-                    "patient_name": patient_name,
-                    "action": "Update Patient Details",
-                    "status": "Success",
-                    "timestamp": datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"),
-                    "created_at": datetime.utcnow()
-                })
+            }, ("doctor", data["updated_by"]) if "updated_by" in data else None)
         except Exception as log_error:
             print(f"⚠️ Failed to log update action: {log_error}")
 
@@ -212,6 +199,7 @@ def get_patient(patient_name):
 
 @patient_bp.route("/all_patients", methods=["GET"])
 @verify_admin_token
+@cached_response(ttl=30, tags=("patients",))
 def all_patients():
     try:
         patients_dict = {}
@@ -256,21 +244,18 @@ def generate_patient_pdf(patient_name):
         # ✅ If not found in patients, try users collection
         if not patient and firebase_admin_initialized:
             try:
-                users_ref = db.collection("users").where(filter=FieldFilter("name", "==", patient_name)).limit(1).stream()
-                for user_doc in users_ref:
-                    user_data = user_doc.to_dict()
-                    if user_data.get("role", "").lower() == "patient":
-                        patient = {
-                            "name": user_data.get("name", patient_name),
-                            "email": user_data.get("email", "Not specified"),
-                            "age": user_data.get("age", 0),
-                            "gender": user_data.get("gender", "Not specified"),
-                            "diagnosis": "—",
-                            "treatment": "—",
-                            "notes": "",
-                            "last_visit": "Not recorded"
-                        }
-                        break
+                user_data = patient_index.get_user_by_name(patient_name)
+                if user_data and user_data.get("role", "").lower() == "patient":
+                    patient = {
+                        "name": user_data.get("name", patient_name),
+                        "email": user_data.get("email", "Not specified"),
+                        "age": user_data.get("age", 0),
+                        "gender": user_data.get("gender", "Not specified"),
+                        "diagnosis": "—",
+                        "treatment": "—",
+                        "notes": "",
+                        "last_visit": "Not recorded"
+                    }
             except Exception as e:
                 print(f"⚠️ Error checking users collection: {e}")
         
@@ -287,24 +272,48 @@ def generate_patient_pdf(patient_name):
         patient.setdefault("notes", "")
         patient.setdefault("last_visit", "Not recorded")
         
-        # ✅ Decrypt sensitive fields for PDF generation
-        patient = decrypt_sensitive_data(patient, ["diagnosis", "treatment", "notes"])
-        
-        font_paths = [p for p in FONT_CANDIDATES if os.path.exists(p)]
-        if not font_paths:
-            print("⚠️ No fonts found, PDF may have rendering issues")
-            font_paths = []  # create_patient_pdf_bytes should handle empty list
-        
-        pdf_buffer = create_patient_pdf_bytes(patient, font_paths=font_paths)
-        
         filename = f"{(patient.get('name') or 'patient').replace(' ', '_')}_EHR_Report.pdf"
-        
-        return send_file(
-            pdf_buffer, 
+
+        # ✅ Reports are content-addressed by the stored (encrypted) fields, so an
+        # unchanged patient is served from cache or answered with 304
+        cache_key = report_key(patient, TEMPLATE_VERSION, datetime.utcnow().strftime("%Y-%m-%d"))
+        if request.if_none_match.contains(cache_key):
+            response = current_app.response_class(status=304)
+            response.set_etag(cache_key)
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            return response
+
+        etag = cache_key
+        pdf_stream = pdf_cache.get(cache_key)
+        if pdf_stream is None:
+            # ✅ Decrypt sensitive fields for PDF generation
+            patient = decrypt_sensitive_data(patient, ["diagnosis", "treatment", "notes"])
+
+            font_paths = available_fonts(tuple(FONT_CANDIDATES))  # resolved once per process
+
+            try:
+                pdf_bytes = create_patient_pdf_bytes(patient, font_paths=font_paths, fallback=False).getvalue()
+                pdf_cache.put(cache_key, pdf_bytes)
+                pdf_stream = io.BytesIO(pdf_bytes)
+            except Exception as render_error:
+                print(f"❌ PDF generation error: {render_error}")
+                traceback.print_exc()
+                # Error reports are neither cached nor given an ETag
+                pdf_stream = render_error_pdf(render_error)
+                etag = False
+
+        response = send_file(
+            pdf_stream, 
             mimetype="application/pdf", 
             as_attachment=False, 
-            download_name=filename
+            download_name=filename,
+            etag=etag,
+            conditional=True,
+            max_age=0
         )
+        response.cache_control.private = True
+        return response
         
     except Exception as e:
         print(f"❌ PDF Generation Error: {e}")
@@ -320,7 +329,7 @@ def delete_patient(patient_name):
         if not admin_id:
             return jsonify({"success": False, "message": "❌ Admin verification required"}), 403
         if firebase_admin_initialized:
-            db.collection("patients").document(patient_doc_id(patient_name)).delete()
+            patient_index.delete_patient(patient_doc_id(patient_name))
             print(f"Patient {patient_name} deleted")
             return jsonify({"success": True, "message": "✅ Patient deleted successfully"}), 200
         else:
@@ -11,11 +11,14 @@ from firebase_init import db, firebase_admin_initialized
 from limiter import limiter
 from middleware import verify_admin_token
 from helpers import patient_doc_id
+import patient_index
+from response_cache import cached_response, invalidate
 
 user_bp = Blueprint('user_routes', __name__)
 
 @user_bp.route("/get_all_users", methods=["GET"])
 @verify_admin_token
+@cached_response(ttl=30, tags=("users",))
 def get_all_users():
     try:
         print("📤 GET /get_all_users - fetching...")
@@ -78,7 +81,7 @@ def register_user():
             return jsonify({"success": False, "message": "⚠️ User already registered."}), 409
 
         # ✅ UPDATED: Include unique_id, age and gender in users collection
-        user_ref.set({
+        user_data = {
             "name": name_clean,
             "email": email,
             "role": role_clean,
@@ -87,17 +90,28 @@ def register_user():
             "gender": gender if gender else "",
             "trust_score": 80,
             "created_at": datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
-        })
+        }
+        # ✅ User document and its name index entry are committed together
+        batch = db.batch()
+        batch.set(user_ref, user_data)
+        patient_index.stage_user_index(batch, user_doc_id, user_data)
+        batch.commit()
+        invalidate("users")
 
         print(f"👤 User registered: {name_clean} ({role_clean}) - ID: {unique_id}")
 
         # ✅ UPDATED: Create patient with consistent ID
         if role_clean == "patient":
             patient_doc_slug = patient_doc_id(name_clean) # Doc ID is slug
-            patient_ref = db.collection("patients").document(patient_doc_slug)
             
-            if not patient_ref.get().exists:
-                patient_ref.set({
+            # ✅ UPDATE: If patient exists, update metadata
+            synced = patient_index.update_patient(patient_doc_slug, {
+                "age": int(age) if age else 0,
+                "gender": gender if gender else "",
+                "patient_id": unique_id # Ensure ID is synced if missing
+            })
+            if synced is None:
+                patient_index.save_patient(patient_doc_slug, {
                     "name": name_clean,
                     "patient_id": unique_id, # ✅ Use same ID as user
                     "email": email,
@@ -109,15 +123,9 @@ def register_user():
                     "doctor_assigned": "—",
                     "trust_score": 80,
                     "created_at": datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
-                })
+                }, merge=False)
                 print(f"🩺 Patient created in 'patients' collection: {name_clean} (ID: {unique_id})")
             else:
-                # ✅ UPDATE: If patient exists, update metadata
-                patient_ref.update({
-                    "age": int(age) if age else 0,
-                    "gender": gender if gender else "",
-                    "patient_id": unique_id # Ensure ID is synced if missing
-                })
                 print(f"ℹ️ Patient {name_clean} updated with new metadata")
 
         return jsonify({"success": True, "message": f"Registered {name_clean} ({role_clean}) successfully."}), 200
@@ -146,13 +154,17 @@ def delete_user(user_email):
         user_data = user_doc.to_dict()
         user_name = user_data.get("name", "Unknown")
         
-        # Delete the user document
-        user_ref.delete()
+        # Delete the user document together with its name index entry
+        batch = db.batch()
+        batch.delete(user_ref)
+        patient_index.unstage_user_index(batch, user_data)
+        batch.commit()
+        invalidate("users")
         
         # If user is a patient, also delete from patients collection
         if user_data.get("role") == "patient":
             patient_id = patient_doc_id(user_name)
-            db.collection("patients").document(patient_id).delete()
+            patient_index.delete_patient(patient_id)
         
         print(f"User {user_name} ({user_email}) deleted successfully")
         return jsonify({"success": True, "message": f"User {user_name} deleted successfully"}), 200
@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Test script for the access pipeline (prefetched reads, deferred decision writes, shutdown drain)
+Runs against the in-memory Firestore in fake_firestore.py
+"""
+
+import sys
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fake_firestore
+
+fake = fake_firestore.install()
+
+import log_store
+import access_pipeline
+from access_pipeline import AccessPrefetch, record_decision
+from encryption import encrypt_sensitive_data
+from log_archive import LogArchive
+
+
+def reset():
+    fake.reset()
+    log_store._known_days.clear()
+    log_store._legacy_state.clear()
+    log_store.log_archive = LogArchive(tempfile.mkdtemp())
+    fake.collection("users").document("u1").set({"name": "Dr A", "role": "doctor", "trust_score": 50})
+    fake.collection("patients").document("alice_smith").set(
+        encrypt_sensitive_data({"name": "Alice Smith", "diagnosis": "Flu", "notes": "rest"}, ["diagnosis", "notes"]))
+
+
+def use_fresh_pools():
+    """Swap in new pools so drain() can shut them down without breaking later tests"""
+    access_pipeline._write_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="test-write")
+    access_pipeline._trust_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="test-trust")
+
+
+def events():
+    return [data for path, data in fake.docs.items() if f"/{log_store.EVENT_COLLECTION}/" in path]
+
+
+def test_prefetch_reads():
+    print("\n🛂 Testing access prefetch...")
+    reset()
+    prefetch = AccessPrefetch("Dr A", "Alice Smith")
+    assert prefetch.pid == "alice_smith" and prefetch.pdf_link == "/generate_patient_pdf/alice_smith"
+    assert prefetch.trust_score() == 50
+    assert prefetch.raw_patient()["diagnosis"] != "Flu", "Raw patient should still be encrypted"
+    assert prefetch.patient()["diagnosis"] == "Flu" and prefetch.patient()["notes"] == "rest"
+
+    # Without a prefetched trust read the score is read on demand
+    lazy = AccessPrefetch("Dr A", "Alice Smith", fetch_trust=False)
+    assert lazy._trust is None and lazy.trust_score() == 50
+
+    assert AccessPrefetch("Dr A", "Nobody").patient() is None
+    empty = AccessPrefetch("Nobody", None)
+    assert empty.patient() is None and empty.pdf_link is None and empty.trust_score() == 80
+    print("  ✅ Prefetch test PASSED")
+
+
+def test_record_decision_writes():
+    """Log event, review queue entry and trust change all land; trust updates never overwrite each other"""
+    print("\n🛂 Testing deferred decision writes...")
+    reset()
+    use_fresh_pools()
+    record_decision({"doctor_name": "Dr A", "doctor_role": "doctor", "patient_name": "alice smith",
+                     "action": "Restricted Access (Outside Network)", "status": "Flagged",
+                     "timestamp": "2026-04-01 08:00:00"}, "Dr A", -3, 70)
+    record_decision(None, "Dr A", 0)   # no log, no trust change: nothing queued
+
+    workers = [threading.Thread(target=record_decision, args=(None, "Dr A", +1)) for _ in range(20)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    access_pipeline.drain()
+
+    assert [e["status"] for e in events()] == ["Flagged"]
+    flagged = [path for path in fake.docs if path.startswith(log_store.FLAG_COLLECTION + "/")]
+    assert len(flagged) == 1 and fake.docs[flagged[0]]["priority"] == 70
+    assert fake.docs["users/u1"]["trust_score"] == 50 - 3 + 20, fake.docs["users/u1"]
+    print("  ✅ Decision write test PASSED")
+
+
+def test_drain_finishes_queued_writes():
+    """drain() (run at exit) waits for writes still queued behind a slow one"""
+    print("\n🛂 Testing shutdown drain...")
+    reset()
+    use_fresh_pools()
+    gate = threading.Event()
+    access_pipeline.defer_write(gate.wait, 5)
+    for i in range(3):
+        record_decision({"doctor_name": "Dr A", "patient_name": "alice smith", "action": "View",
+                         "status": "Granted", "timestamp": f"2026-04-01 0{i}:00:00"}, "Dr A", +2)
+    threading.Timer(0.05, gate.set).start()
+    access_pipeline.drain()
+
+    assert len(events()) == 3 and fake.docs["users/u1"]["trust_score"] == 56
+    try:
+        access_pipeline.defer_write(print, "late")
+        assert False, "Pool accepted work after drain()"
+    except RuntimeError:
+        pass
+    use_fresh_pools()
+    print("  ✅ Drain test PASSED")
+
+
+def main():
+    print("\n" + "="*60)
+    print("🧪 MedTrust AI - Access Pipeline Test Suite")
+    print("="*60)
+    try:
+        test_prefetch_reads()
+        test_record_decision_writes()
+        test_drain_finishes_queued_writes()
+        print("\n✅ ALL TESTS PASSED!\n")
+        return 0
+    except Exception as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,221 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Test script for the ASGI access service (parity with the Flask routes, rate limits, lifespan)
+Drives async_access.app directly against the in-memory Firestore in fake_firestore.py
+"""
+
+import sys
+import os
+import asyncio
+import json
+import tempfile
+import threading
+import types
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fake_firestore
+
+fake = fake_firestore.install()
+
+from flask import Flask
+from limits.strategies import STRATEGIES
+
+import log_store
+import async_access
+import access_pipeline
+from limiter import limiter, RATELIMIT_STRATEGY
+from routes.access_routes import access_bp
+from encryption import encrypt_sensitive_data
+from log_archive import LogArchive
+
+IN_NETWORK = "192.168.5.10"
+OUTSIDE = "10.9.8.7"
+
+
+def build_flask_app():
+    app = Flask(__name__)
+    app.register_blueprint(access_bp)
+    limiter.init_app(app)
+    return app
+
+
+flask_app = build_flask_app()
+# Both apps on one storage, as with a shared RATELIMIT_STORAGE_URI in production
+async_access._rate_limiter = STRATEGIES[RATELIMIT_STRATEGY](limiter.storage)
+async_access.AsyncClient = lambda **kwargs: fake.async_client()
+async_access.cred = types.SimpleNamespace(project_id="test-project", get_credential=lambda: None)
+
+
+def reset():
+    fake.reset()
+    limiter.reset()
+    log_store._known_days.clear()
+    log_store._legacy_state.clear()
+    log_store.log_archive = LogArchive(tempfile.mkdtemp())
+    fake.collection("users").document("u1").set({"name": "Dr A", "role": "doctor", "trust_score": 80})
+    fake.collection("users").document("u2").set({"name": "Nurse B", "role": "nurse", "trust_score": 80})
+    fake.collection("patients").document("alice").set(
+        encrypt_sensitive_data({"name": "Alice", "diagnosis": "Flu", "doctor_assigned": "Dr A"}, ["diagnosis"]))
+
+
+class Lifespan:
+    """Runs the app's lifespan protocol around a block of requests"""
+
+    async def __aenter__(self):
+        self.inbox, self.outbox = asyncio.Queue(), asyncio.Queue()
+        self.task = asyncio.ensure_future(async_access.app({"type": "lifespan"}, self.inbox.get, self.outbox.put))
+        await self.inbox.put({"type": "lifespan.startup"})
+        assert (await self.outbox.get())["type"] == "lifespan.startup.complete"
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.inbox.put({"type": "lifespan.shutdown"})
+        assert (await self.outbox.get())["type"] == "lifespan.shutdown.complete"
+        await self.task
+
+
+async def call(method, path, body=None, ip=IN_NETWORK):
+    """Returns (status, headers, parsed JSON body or None)"""
+    sent = []
+    payload = json.dumps(body).encode() if body is not None else b""
+
+    async def receive():
+        return {"type": "http.request", "body": payload, "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": method, "path": path, "client": (ip, 40000),
+             "headers": [(b"content-type", b"application/json")]}
+    await async_access.app(scope, receive, send)
+    start, body_message = sent
+    data = body_message["body"]
+    return start["status"], dict(start["headers"]), (json.loads(data) if data else None)
+
+
+def flask_call(path, body, ip=IN_NETWORK):
+    response = flask_app.test_client().post(path, json=body, environ_base={"REMOTE_ADDR": ip})
+    return response.status_code, response.get_json()
+
+
+def event_count():
+    return sum(1 for path in fake.docs if f"/{log_store.EVENT_COLLECTION}/" in path)
+
+
+def trust(user_doc_id):
+    return fake.docs[f"users/{user_doc_id}"]["trust_score"]
+
+
+CASES = [
+    ("/normal_access", {"name": "Dr A", "role": "doctor", "patient_name": "Alice"}, IN_NETWORK),
+    ("/normal_access", {"name": "Dr A", "role": "doctor", "patient_name": "Alice"}, OUTSIDE),
+    ("/normal_access", {"name": "Dr A", "role": "doctor", "patient_name": "Nobody"}, IN_NETWORK),
+    ("/emergency_access", {"name": "Dr A", "role": "doctor", "patient_name": "Alice"}, IN_NETWORK),
+    ("/request_temp_access", {"name": "Dr A", "role": "doctor", "patient_name": "Alice"}, IN_NETWORK),
+    ("/request_temp_access", {"name": "Nurse B", "role": "nurse", "patient_name": "Alice"}, OUTSIDE),
+    ("/request_temp_access", {"name": "Nurse B", "role": "nurse", "patient_name": "Alice"}, IN_NETWORK),
+]
+
+
+def test_parity_with_flask_routes():
+    """Same status, payload, log events and trust changes as routes/access_routes.py"""
+    print("\n⚡ Testing parity with the Flask routes...")
+    reset()
+    expected = [flask_call(path, body, ip) for path, body, ip in CASES]
+    for pool in (access_pipeline._write_pool, access_pipeline._trust_pool):
+        pool.submit(lambda: None).result()   # drain the Flask app's deferred writes
+    flask_events, flask_trust = event_count(), (trust("u1"), trust("u2"))
+    assert expected[0][0] == 200 and expected[0][1]["patient_data"]["diagnosis"] == "Flu"
+
+    reset()
+
+    async def scenario():
+        async with Lifespan():
+            return [await call("POST", path, body, ip) for path, body, ip in CASES]
+
+    actual = asyncio.run(scenario())
+    assert [(status, body) for status, _, body in actual] == expected, (actual, expected)
+    assert event_count() == flask_events == 4
+    assert (trust("u1"), trust("u2")) == flask_trust, "Trust updates differ from the Flask routes"
+    print("  ✅ Parity test PASSED")
+
+
+def test_rate_limit_shared_with_flask():
+    """One quota per client and route across both apps; the storage call stays off the event loop"""
+    print("\n⚡ Testing rate limits...")
+    reset()
+    threads = []
+    hit = async_access._rate_limiter.hit
+    async_access._rate_limiter.hit = lambda *args, **kwargs: threads.append(threading.current_thread().name) or hit(*args, **kwargs)
+    body = {"name": "Dr A", "role": "doctor", "patient_name": "Alice"}   # no justification: cheap 400
+    try:
+        for _ in range(10):
+            assert flask_call("/emergency_access", body)[0] == 400
+
+        async def scenario():
+            async with Lifespan():
+                statuses = [(await call("POST", "/emergency_access", body))[0] for _ in range(6)]
+                other_ip = (await call("POST", "/emergency_access", body, ip="192.168.5.11"))[0]
+                return statuses, other_ip
+
+        statuses, other_ip = asyncio.run(scenario())
+    finally:
+        async_access._rate_limiter.hit = hit
+    assert statuses == [400] * 5 + [429], statuses
+    assert other_ip == 400, "Another client was limited by this one's quota"
+    assert flask_call("/emergency_access", body)[0] == 429, "Flask routes did not see the async hits"
+    assert threads and all(name.startswith("rate-limit") for name in threads), threads
+    print("  ✅ Rate limit test PASSED")
+
+
+def test_methods_and_shutdown_drain():
+    """OPTIONS/405/404 answers, and deferred writes finish before lifespan shutdown completes"""
+    print("\n⚡ Testing methods and shutdown...")
+    reset()
+    done = []
+
+    async def slow_write():
+        await asyncio.sleep(0.05)
+        done.append(True)
+
+    async def scenario():
+        async with Lifespan():
+            preflight = await call("OPTIONS", "/normal_access")
+            wrong_method = await call("GET", "/normal_access")
+            unknown = await call("POST", "/nope")
+            await call("POST", "/normal_access", {"name": "Dr A", "role": "doctor", "patient_name": "Alice"})
+            async_access.defer(slow_write())
+            pending = len(async_access._background)
+        return preflight, wrong_method, unknown, pending
+
+    preflight, wrong_method, unknown, pending = asyncio.run(scenario())
+    assert preflight[0] == 204 and preflight[2] is None
+    assert preflight[1][b"access-control-allow-methods"] == b"POST, OPTIONS"
+    assert wrong_method[0] == 405 and unknown[0] == 404
+    assert pending >= 1 and done == [True], "Shutdown did not wait for deferred writes"
+    assert not async_access._background
+    assert event_count() == 1 and trust("u1") == 82
+    print("  ✅ Methods/shutdown test PASSED")
+
+
+def main():
+    print("\n" + "="*60)
+    print("🧪 MedTrust AI - Async Access Service Test Suite")
+    print("="*60)
+    try:
+        test_parity_with_flask_routes()
+        test_rate_limit_shared_with_flask()
+        test_methods_and_shutdown_drain()
+        print("\n✅ ALL TESTS PASSED!\n")
+        return 0
+    except Exception as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+
+
+if __name__ == "__main__":
+    exit(main())
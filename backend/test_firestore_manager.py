@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Test script for the Firestore client manager (deadlines, retries, RPC metrics, pool)
+Runs against an in-process gRPC server, so no Firebase credentials are needed
+"""
+
+import sys
+import os
+import threading
+import time
+from concurrent import futures
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import grpc
+from google.auth.credentials import AnonymousCredentials
+from google.cloud import firestore
+from google.cloud.firestore_v1.types import document, firestore as firestore_types
+
+import firestore_manager
+from firestore_manager import RpcStats, FirestorePool, install_channel, warm_up
+
+DOC_PATH = "projects/test-project/databases/(default)/documents/users/u1"
+
+
+class FakeFirestore:
+    """Answers BatchGetDocuments (document gets) and RunQuery; `unavailable` failures are returned first"""
+
+    def __init__(self):
+        self.unavailable = 0
+        self.calls = []
+
+    def batch_get_documents(self, request, context):
+        self.calls.append(("BatchGetDocuments", context.time_remaining()))
+        if self.unavailable:
+            self.unavailable -= 1
+            context.abort(grpc.StatusCode.UNAVAILABLE, "try again")
+        for name in request.documents:
+            if name.endswith("/u1"):
+                yield firestore_types.BatchGetDocumentsResponse(found=document.Document(
+                    name=name, fields={"name": {"string_value": "Dr. Ann"}}))
+            else:
+                yield firestore_types.BatchGetDocumentsResponse(missing=name)
+
+    def run_query(self, request, context):
+        self.calls.append(("RunQuery", context.time_remaining()))
+        yield firestore_types.RunQueryResponse(document=document.Document(
+            name=DOC_PATH, fields={"name": {"string_value": "Dr. Ann"}}))
+
+
+def start_server():
+    fake = FakeFirestore()
+    handlers = {
+        "BatchGetDocuments": grpc.unary_stream_rpc_method_handler(
+            fake.batch_get_documents,
+            request_deserializer=firestore_types.BatchGetDocumentsRequest.deserialize,
+            response_serializer=firestore_types.BatchGetDocumentsResponse.serialize),
+        "RunQuery": grpc.unary_stream_rpc_method_handler(
+            fake.run_query,
+            request_deserializer=firestore_types.RunQueryRequest.deserialize,
+            response_serializer=firestore_types.RunQueryResponse.serialize),
+    }
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=4))
+    server.add_generic_rpc_handlers([grpc.method_handlers_generic_handler("google.firestore.v1.Firestore", handlers)])
+    port = server.add_insecure_port("127.0.0.1:0")
+    server.start()
+    return server, fake, f"127.0.0.1:{port}"
+
+
+def new_client(address, stats):
+    client = firestore.Client(project="test-project", credentials=AnonymousCredentials())
+    return install_channel(client, grpc.insecure_channel(address, options=firestore_manager.CHANNEL_OPTIONS), stats)
+
+
+def wait_for(stats, method, count, timeout=2.0):
+    """Stream calls are recorded from gRPC's callback thread just after they end"""
+    deadline = time.monotonic() + timeout
+    while stats.snapshot().get(method, {}).get("count", 0) < count and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return stats.snapshot()
+
+
+def test_metrics_and_deadlines():
+    print("\n🔥 Testing RPC metrics and default deadlines...")
+    server, fake, address = start_server()
+    try:
+        stats = RpcStats()
+        client = new_client(address, stats)
+        snapshot = client.collection("users").document("u1").get()
+        assert snapshot.exists and snapshot.get("name") == "Dr. Ann"
+        assert not client.collection("users").document("nobody").get().exists
+        docs = list(client.collection("users").limit(1).stream())
+        assert len(docs) == 1
+
+        wait_for(stats, "RunQuery", 1)
+        figures = wait_for(stats, "BatchGetDocuments", 2)
+        assert figures["BatchGetDocuments"]["count"] == 2 and figures["BatchGetDocuments"]["errors"] == 0, figures
+        assert figures["RunQuery"]["count"] == 1 and figures["RunQuery"]["errors"] == 0
+        assert figures["BatchGetDocuments"]["buckets"]["+Inf"] == 2
+        assert set(stats.latency.collect()) == {("BatchGetDocuments", "users"), ("RunQuery", "users")}
+
+        # Calls without an explicit timeout carry the policy deadline, not the library's 60-300 s
+        lookup = [remaining for name, remaining in fake.calls if name == "BatchGetDocuments"]
+        query = [remaining for name, remaining in fake.calls if name == "RunQuery"]
+        # (gRPC rounds deadlines on the wire, hence the slack)
+        assert all(remaining < firestore_manager.LOOKUP_DEADLINE + 1 for remaining in lookup), lookup
+        assert firestore_manager.LOOKUP_DEADLINE + 1 < query[0] < firestore_manager.QUERY_DEADLINE + 1, query
+    finally:
+        server.stop(None)
+    print("  ✅ Metrics / deadline test PASSED")
+
+
+def test_transient_errors_retried():
+    print("\n🔥 Testing retry policy...")
+    server, fake, address = start_server()
+    try:
+        stats = RpcStats()
+        client = new_client(address, stats)
+        fake.unavailable = 2
+        start = time.perf_counter()
+        assert client.collection("users").document("u1").get().exists
+        figures = wait_for(stats, "BatchGetDocuments", 3)["BatchGetDocuments"]
+        assert figures["count"] == 3 and figures["errors"] == 2, "UNAVAILABLE reads should be retried"
+        assert time.perf_counter() - start < firestore_manager.LOOKUP_DEADLINE
+    finally:
+        server.stop(None)
+    print("  ✅ Retry test PASSED")
+
+
+def test_pool_round_robin_and_warm_up():
+    print("\n🔥 Testing channel pool and warm-up...")
+    server, fake, address = start_server()
+    try:
+        stats = RpcStats()
+        pool = FirestorePool([new_client(address, stats) for _ in range(3)])
+        # One client per thread: everything a thread builds shares it, threads rotate
+        own = pool.client()
+        assert pool.collection("users")._client is own and pool.batch()._client is own
+        assert pool.transaction()._client is own and pool.document("users/u1")._client is own
+        seen = []
+        threads = [threading.Thread(target=lambda: seen.append(id(pool.client()))) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(set(seen) | {id(own)}) == 3, "Pool did not rotate clients across threads"
+        assert pool.project == "test-project"
+
+        assert warm_up(pool) == 3
+        assert wait_for(stats, "BatchGetDocuments", 3)["BatchGetDocuments"]["count"] == 3
+    finally:
+        server.stop(None)
+    print("  ✅ Pool / warm-up test PASSED")
+
+
+def main():
+    print("\n" + "="*60)
+    print("🧪 MedTrust AI - Firestore Client Manager Test Suite")
+    print("="*60)
+    try:
+        test_metrics_and_deadlines()
+        test_transient_errors_retried()
+        test_pool_round_robin_and_warm_up()
+        print("\n✅ ALL TESTS PASSED!\n")
+        return 0
+    except Exception as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Test script for doctor-patient interaction summaries (incremental counts, status changes, rebuild)
+Runs against the in-memory Firestore in fake_firestore.py
+"""
+
+import sys
+import os
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fake_firestore
+
+fake = fake_firestore.install()
+
+import log_store
+import flag_queue
+from log_archive import LogArchive
+from jobs import JobRunner, JobStore
+import admin_jobs  # noqa: F401  (registers rebuild_interaction_summaries)
+
+
+def reset():
+    fake.reset()
+    log_store._known_days.clear()
+    log_store._legacy_state.clear()
+    log_store.log_archive = LogArchive(tempfile.mkdtemp())
+
+
+def access(patient, timestamp, status="Granted", doctor="Dr A"):
+    return log_store.write_event({"doctor_name": doctor, "doctor_role": "doctor", "patient_name": patient,
+                                  "action": "View", "status": status, "timestamp": timestamp},
+                                 clinician=("doctor", doctor))
+
+
+def summaries():
+    prefix = log_store.SUMMARY_COLLECTION + "/"
+    return {path[len(prefix):]: data for path, data in fake.docs.items() if path.startswith(prefix)}
+
+
+def test_counts_and_top_k():
+    print("\n🤝 Testing interaction summaries...")
+    reset()
+    access("Alice", "2026-04-01 08:00:00")
+    access("bob", "2026-04-01 09:00:00")
+    access("alice", "2026-04-02 10:00:00", status="Denied")
+    access("bob", "2026-04-01 07:00:00")
+    access("bob", "2026-04-01 06:00:00", status="Flagged")
+    access("N/A", "2026-04-01 11:00:00")
+    access("alice", "2026-04-03 11:00:00", doctor="Dr B")
+
+    rows = {s["patient_name"].lower(): s for s in log_store.doctor_interactions("Dr A")}
+    assert set(rows) == {"alice", "bob"}, "N/A or another doctor's patients counted"
+    assert rows["alice"]["access_count"] == 2 and rows["alice"]["statuses"] == {"Granted": 1, "Denied": 1}
+    assert rows["bob"]["access_count"] == 3 and rows["bob"]["statuses"] == {"Granted": 2, "Flagged": 1}
+    assert rows["alice"]["last_access"] == "2026-04-02 10:00:00"
+
+    assert [s["patient_name"] for s in log_store.doctor_interactions("Dr A", "recent")] == ["alice", "bob"]
+    assert [s["patient_name"] for s in log_store.doctor_interactions("Dr A", "frequent", 1)] == ["bob"]
+    assert log_store.doctor_interactions("Nobody") == []
+    print("  ✅ Summary test PASSED")
+
+
+def test_counts_follow_status_changes():
+    """A reviewed event moves its count between statuses; the total stays the same"""
+    print("\n🤝 Testing summaries after status changes...")
+    reset()
+    flagged = access("bob", "2026-04-01 09:00:00", status="Flagged")
+    granted = access("bob", "2026-04-01 10:00:00")
+    other = access("bob", "2026-04-01 11:00:00", doctor="Dr B")
+
+    result = flag_queue.set_status([flagged, granted, other], "Dismissed")
+    assert sorted(result["updated"]) == sorted([flagged, granted, other]), result
+    rows = {s["doctor_name"]: s for s in summaries().values()}
+    assert rows["Dr A"]["access_count"] == 2 and rows["Dr A"]["statuses"] == {"Granted": 0, "Flagged": 0, "Dismissed": 2}
+    assert rows["Dr B"]["statuses"] == {"Granted": 0, "Dismissed": 1}
+    history = log_store.clinician_events("doctor", "Dr A")
+    assert {e["status"] for e in history} == {"Dismissed"}, "Clinician bucket kept the old status"
+
+    # Setting the same status again changes nothing
+    flag_queue.set_status([flagged], "Dismissed")
+    assert summaries()[log_store.summary_id("Dr A", "bob")]["statuses"]["Dismissed"] == 2
+    print("  ✅ Status change test PASSED")
+
+
+def test_rebuild_matches_incremental():
+    print("\n🤝 Testing summary rebuild...")
+    reset()
+    access("alice", "2026-04-02 10:00:00")
+    access("alice", "2026-04-01 08:00:00", status="Flagged")
+    flagged = access("bob", "2026-04-01 09:00:00", status="Flagged")
+    flag_queue.set_status([flagged], "Resolved")
+
+    runner = JobRunner(store=JobStore(os.path.join(tempfile.mkdtemp(), "jobs.sqlite3")), workers=1)
+    before = summaries()
+    assert runner.wait(runner.submit("rebuild_interaction_summaries", {}, "tester"), timeout=5)["status"] == "completed"
+    after = summaries()
+    strip = lambda rows: {k: {**v, "statuses": {s: n for s, n in v["statuses"].items() if n}, "last_access": None}
+                          for k, v in rows.items()}
+    assert strip(before) == strip(after), (before, after)
+    # The rebuild takes the newest access even when events were written out of order
+    assert after[log_store.summary_id("Dr A", "alice")]["last_access"] == "2026-04-02 10:00:00"
+    print("  ✅ Rebuild test PASSED")
+
+
+def main():
+    print("\n" + "="*60)
+    print("🧪 MedTrust AI - Interaction Summary Test Suite")
+    print("="*60)
+    try:
+        test_counts_and_top_k()
+        test_counts_follow_status_changes()
+        test_rebuild_matches_incremental()
+        print("\n✅ ALL TESTS PASSED!\n")
+        return 0
+    except Exception as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Test script for the background job runner (SQLite state, checkpoints, cancellation)
+"""
+
+import sys
+import os
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from jobs import JobRunner, JobStore, register_job
+
+processed = []
+gate = threading.Event()
+
+
+@register_job("test_count")
+def count_job(ctx, items=10, crash_at=None, block=False):
+    start = ctx.checkpoint.get("next", 0)
+    ctx.set_total(items)
+    for i in range(start, items):
+        if block:
+            gate.wait(5)
+        ctx.check_cancelled()
+        if i == crash_at:
+            raise RuntimeError("boom")
+        processed.append(i)
+        ctx.advance()
+        ctx.save_checkpoint({"next": i + 1})
+
+
+def new_runner():
+    path = os.path.join(tempfile.mkdtemp(), "jobs.sqlite3")
+    return JobRunner(store=JobStore(path), workers=2), path
+
+
+def test_job_completes_with_progress():
+    print("\n🧰 Testing job completion...")
+    processed.clear()
+    runner, _ = new_runner()
+    job_id = runner.submit("test_count", {"items": 25}, "tester")
+    job = runner.wait(job_id, timeout=5)
+    assert job["status"] == "completed", job
+    assert job["done"] == 25 and job["total"] == 25 and job["percent"] == 100.0
+    assert processed == list(range(25))
+    print("  ✅ Completion test PASSED")
+
+
+def test_failed_job_resumes_from_checkpoint():
+    """A job orphaned by a dead process resumes after its last checkpoint"""
+    print("\n🧰 Testing checkpoint resume...")
+    processed.clear()
+    runner, path = new_runner()
+    job_id = runner.submit("test_count", {"items": 10, "crash_at": 6}, "tester")
+    assert runner.wait(job_id, timeout=5)["status"] == "failed"
+    assert processed == list(range(6))
+
+    # Simulate a crash: the row is left 'running' under a process that no longer exists
+    store = JobStore(path)
+    store._conn().execute("UPDATE jobs SET status = 'running', owner_pid = 999999999, params = ? WHERE id = ?",
+                          ('{"items": 10}', job_id))
+    processed.clear()
+    restarted = JobRunner(store=JobStore(path), workers=1)
+    restarted.start()
+    job = restarted.wait(job_id, timeout=5)
+    assert job["status"] == "completed", job
+    assert processed == list(range(6, 10)), f"Restarted from scratch: {processed}"
+    print("  ✅ Resume test PASSED")
+
+
+def test_cancel_running_and_pending():
+    print("\n🧰 Testing cancellation...")
+    processed.clear()
+    gate.clear()
+    runner, _ = new_runner()
+    runner.workers = 1
+    running = runner.submit("test_count", {"items": 1000, "block": True})
+    queued = runner.submit("test_count", {"items": 5})
+    assert runner.cancel(queued)
+    assert runner.cancel(running)
+    gate.set()
+    assert runner.wait(running, timeout=5)["status"] == "cancelled"
+    assert runner.wait(queued, timeout=5)["status"] == "cancelled"
+    assert len(processed) < 1000
+    assert not runner.cancel(running), "Finished job accepted a cancel"
+    print("  ✅ Cancellation test PASSED")
+
+
+def test_runner_restarts_after_fork():
+    """A runner inherited through fork (gunicorn --preload) gets a fresh pool and starts once in the child"""
+    print("\n🧰 Testing start after fork...")
+    processed.clear()
+    runner, _ = new_runner()
+    runner.ensure_started()
+    assert runner.wait(runner.submit("test_count", {"items": 2}), timeout=5)["status"] == "completed"
+
+    pid = os.fork()
+    if pid == 0:
+        ok = False
+        try:
+            runner.ensure_started()
+            job = runner.wait(runner.submit("test_count", {"items": 3}), timeout=5)
+            ok = job["status"] == "completed" and runner._started_pid == os.getpid()
+        finally:
+            os._exit(0 if ok else 1)
+    _, status = os.waitpid(pid, 0)
+    assert os.WEXITSTATUS(status) == 0, "Job did not run in the forked process"
+    assert runner._started_pid == os.getpid()
+    print("  ✅ Fork test PASSED")
+
+
+def main():
+    print("\n" + "="*60)
+    print("🧪 MedTrust AI - Job Runner Test Suite")
+    print("="*60)
+    try:
+        test_job_completes_with_progress()
+        test_failed_job_resumes_from_checkpoint()
+        test_cancel_running_and_pending()
+        test_runner_restarts_after_fork()
+        print("\n✅ ALL TESTS PASSED!\n")
+        return 0
+    except Exception as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Test script for JSON serialization (orjson provider) and response compression
+"""
+
+import sys
+import os
+import gzip
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask, jsonify
+from google.api_core.datetime_helpers import DatetimeWithNanoseconds
+
+import json_provider
+import response_compression
+from json_provider import init_json
+from response_compression import init_compression, COMPRESS_MIN_SIZE
+from response_cache import cached_response
+
+
+def new_app():
+    app = Flask(__name__)
+    init_json(app)
+    init_compression(app)
+
+    @app.route("/logs")
+    @cached_response(ttl=60)
+    def logs():
+        created = DatetimeWithNanoseconds(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+        return jsonify({"logs": [{"id": f"2026-01-02/e{i}", "created_at": created, "note": "📋 ok"} for i in range(100)]}), 200
+
+    @app.route("/small")
+    def small():
+        return jsonify({"success": True, "at": datetime(2026, 1, 2, 3, 4, 5)}), 200
+
+    return app.test_client()
+
+
+def test_provider_serializes_datetimes():
+    print("\n🧾 Testing JSON provider...")
+    if json_provider.orjson is None:
+        print("  ⚠️ orjson not installed - skipped")
+        return
+    client = new_app()
+    small = client.get("/small").get_json()
+    assert small == {"success": True, "at": "2026-01-02T03:04:05"}, small
+    logs = client.get("/logs").get_json()["logs"]
+    assert logs[0]["created_at"] == "2026-01-02T03:04:05+00:00" and logs[0]["note"] == "📋 ok", logs[0]
+    print("  ✅ Provider test PASSED")
+
+
+def test_large_responses_compressed():
+    print("\n🧾 Testing negotiated compression...")
+    client = new_app()
+    plain = client.get("/logs")
+    assert "Content-Encoding" not in plain.headers and len(plain.get_data()) >= COMPRESS_MIN_SIZE
+
+    zipped = client.get("/logs", headers={"Accept-Encoding": "gzip, deflate"})
+    assert zipped.headers["Content-Encoding"] == "gzip", zipped.headers
+    assert "Accept-Encoding" in zipped.headers["Vary"] and "Authorization" in zipped.headers["Vary"]
+    assert gzip.decompress(zipped.get_data()) == plain.get_data()
+    assert int(zipped.headers["Content-Length"]) < len(plain.get_data()) // 4
+
+    small = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in small.headers, "Small body was compressed!"
+    if response_compression.brotli is not None:
+        assert client.get("/logs", headers={"Accept-Encoding": "gzip, br"}).headers["Content-Encoding"] == "br"
+    print("  ✅ Compression test PASSED")
+
+
+def test_compressed_etag_revalidates():
+    """A compressed response's weak ETag still gets a 304 from the response cache"""
+    print("\n🧾 Testing ETags on compressed responses...")
+    client = new_app()
+    zipped = client.get("/logs", headers={"Accept-Encoding": "gzip"})
+    etag = zipped.headers["ETag"]
+    assert etag.startswith('W/"'), etag
+    again = client.get("/logs", headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+    assert again.status_code == 304 and "Content-Encoding" not in again.headers
+    print("  ✅ ETag test PASSED")
+
+
+def main():
+    print("\n" + "="*60)
+    print("🧪 MedTrust AI - JSON Response Test Suite")
+    print("="*60)
+    try:
+        test_provider_serializes_datetimes()
+        test_large_responses_compressed()
+        test_compressed_etag_revalidates()
+        print("\n✅ ALL TESTS PASSED!\n")
+        return 0
+    except Exception as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+
+
+if __name__ == "__main__":
+    exit(main())
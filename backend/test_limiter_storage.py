@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Test script for the shared mmap:// rate limit storage
+Checks that counters are shared across storage instances and processes
+"""
+
+import sys
+import os
+import tempfile
+import multiprocessing
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from limits import parse
+from limits.storage import storage_from_string
+from limits.strategies import FixedWindowRateLimiter, SlidingWindowCounterRateLimiter
+
+import limiter_storage  # noqa: F401  registers mmap://
+
+
+def _hammer(uri, hits):
+    storage = storage_from_string(uri)
+    for _ in range(hits):
+        storage.incr("ip:10.0.0.1", 60)
+
+
+def test_scheme_registered():
+    print("\n🚦 Testing mmap:// registration...")
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = storage_from_string(f"mmap://{tmp}/rl.bin?slots=128")
+        assert isinstance(storage, limiter_storage.MmapStorage)
+        assert storage.slots == 128
+        assert storage.check()
+    print("  ✅ Registration test PASSED")
+
+
+def test_counters_shared_across_workers():
+    """Four processes hitting one key must add up, not keep private counters"""
+    print("\n🚦 Testing cross-process counters...")
+    with tempfile.TemporaryDirectory() as tmp:
+        uri = f"mmap://{tmp}/rl.bin"
+        storage_from_string(uri)  # create the table before the workers race for it
+        ctx = multiprocessing.get_context("fork")
+        procs = [ctx.Process(target=_hammer, args=(uri, 250)) for _ in range(4)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
+        assert storage_from_string(uri).get("ip:10.0.0.1") == 1000, "Counters were not shared!"
+    print("  ✅ Cross-process test PASSED")
+
+
+def test_fixed_window_limit_enforced():
+    print("\n🚦 Testing fixed window through limits...")
+    with tempfile.TemporaryDirectory() as tmp:
+        worker_a = FixedWindowRateLimiter(storage_from_string(f"mmap://{tmp}/rl.bin"))
+        worker_b = FixedWindowRateLimiter(storage_from_string(f"mmap://{tmp}/rl.bin"))
+        limit = parse("5 per minute")
+        results = [(worker_a if i % 2 else worker_b).hit(limit, "user_login", "1.2.3.4") for i in range(8)]
+        assert results == [True] * 5 + [False] * 3, f"Unexpected hits: {results}"
+    print("  ✅ Fixed window test PASSED")
+
+
+def test_sliding_window_counter():
+    print("\n🚦 Testing sliding window counter...")
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = storage_from_string(f"mmap://{tmp}/rl.bin")
+        limiter = SlidingWindowCounterRateLimiter(storage)
+        limit = parse("3 per hour")
+        results = [limiter.hit(limit, "verify_otp", "5.6.7.8") for _ in range(5)]
+        assert results == [True, True, True, False, False], f"Unexpected hits: {results}"
+        assert limiter.get_window_stats(limit, "verify_otp", "5.6.7.8").remaining == 0
+        limiter.clear(limit, "verify_otp", "5.6.7.8")
+        assert limiter.hit(limit, "verify_otp", "5.6.7.8")
+    print("  ✅ Sliding window test PASSED")
+
+
+def test_clear_and_reset():
+    print("\n🚦 Testing clear/reset...")
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = storage_from_string(f"mmap://{tmp}/rl.bin?slots=64")
+        for i in range(10):
+            storage.incr(f"k{i}", 60)
+        storage.clear("k0")
+        assert storage.get("k0") == 0 and storage.get("k1") == 1
+        assert storage.reset() == 9
+        assert storage.get("k1") == 0
+    print("  ✅ Clear/reset test PASSED")
+
+
+def test_moving_window_rejected():
+    """limiter.py refuses moving-window on mmap:// at import, instead of failing on the first request"""
+    print("\n🚦 Testing moving-window rejection...")
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, RATELIMIT_STORAGE_URI=f"mmap://{tmp}/rl.bin", RATELIMIT_STRATEGY="moving-window")
+        result = subprocess.run([sys.executable, "-c", "import limiter"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                env=env, capture_output=True, text=True)
+        assert result.returncode != 0 and "sliding-window-counter" in result.stderr, result.stderr
+        env["RATELIMIT_STRATEGY"] = "sliding-window-counter"
+        result = subprocess.run([sys.executable, "-c", "import limiter"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                env=env, capture_output=True, text=True)
+        assert result.returncode == 0, result.stderr
+    print("  ✅ Moving-window test PASSED")
+
+
+def main():
+    print("\n" + "="*60)
+    print("🧪 MedTrust AI - Rate Limit Storage Test Suite")
+    print("="*60)
+    try:
+        test_scheme_registered()
+        test_counters_shared_across_workers()
+        test_fixed_window_limit_enforced()
+        test_sliding_window_counter()
+        test_clear_and_reset()
+        test_moving_window_rejected()
+        print("\n✅ ALL TESTS PASSED!\n")
+        return 0
+    except Exception as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Test script for the cold audit log archive (partitioning, pruning, merging)
+"""
+
+import sys
+import os
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from log_archive import LogArchive, EVENTS_FILE
+
+
+def event(date, n, status="Granted", patient="alice"):
+    return {"id": f"{date}/e{n}", "patient_name": patient, "status": status,
+            "action": "View", "timestamp": f"{date} 10:{n:02d}:00"}
+
+
+def new_archive():
+    archive = LogArchive(tempfile.mkdtemp())
+    archive.write_partition("2026-01-01", [event("2026-01-01", 1), event("2026-01-01", 2, "Flagged")],
+                            [{"role": "doctor", "clinician_name": "Dr A", "date": "2026-01-01",
+                              "events": [{"log_id": "2026-01-01/e1", "patient_name": "alice"}]}])
+    archive.write_partition("2026-01-02", [event("2026-01-02", 1, patient="Bob")],
+                            [{"role": "nurse", "clinician_name": "N B", "date": "2026-01-02",
+                              "events": [{"log_id": "2026-01-02/e1", "patient_name": "Bob"}]}])
+    return archive
+
+
+def test_events_newest_first_with_filters():
+    print("\n🗄️ Testing archived event queries...")
+    archive = new_archive()
+    ids = [e["id"] for e in archive.events()]
+    assert ids == ["2026-01-02/e1", "2026-01-01/e2", "2026-01-01/e1"], ids
+    assert [e["id"] for e in archive.events(limit=2)] == ids[:2]
+    assert [e["id"] for e in archive.events(end_date="2026-01-01")] == ids[1:]
+    assert [e["id"] for e in archive.events(status="Flagged")] == ["2026-01-01/e2"]
+    assert [e["id"] for e in archive.events(patient_names=["bob"])] == ["2026-01-02/e1"]
+    print("  ✅ Query test PASSED")
+
+
+def test_index_prunes_partitions():
+    """Partitions that cannot match are skipped without decompressing them"""
+    print("\n🗄️ Testing partition pruning...")
+    archive = new_archive()
+    # Corrupt the data file; only the index may be consulted for a non-matching status
+    with open(archive._path("2026-01-02", EVENTS_FILE), "wb") as f:
+        f.write(b"not gzip")
+    assert [e["id"] for e in archive.events(status="Flagged")] == ["2026-01-01/e2"]
+    assert [b["clinician_name"] for b in archive.clinician_days("doctor")] == ["Dr A"]
+    assert [b["clinician_name"] for b in archive.clinician_days("nurse", "n b")] == ["N B"]
+    assert list(archive.clinician_days("doctor", "Dr Z")) == []
+    print("  ✅ Pruning test PASSED")
+
+
+def test_rewrite_merges_by_id():
+    print("\n🗄️ Testing idempotent re-archiving...")
+    archive = new_archive()
+    archive.write_partition("2026-01-01", [event("2026-01-01", 1), event("2026-01-01", 3)],
+                            [{"role": "doctor", "clinician_name": "Dr A", "date": "2026-01-01",
+                              "events": [{"log_id": "2026-01-01/e1"}, {"log_id": "2026-01-01/e3"}]}])
+    ids = [e["id"] for e in archive.events(start_date="2026-01-01", end_date="2026-01-01")]
+    assert ids == ["2026-01-01/e3", "2026-01-01/e2", "2026-01-01/e1"], ids
+    bucket = next(archive.clinician_days("doctor", "Dr A"))
+    assert [e["log_id"] for e in bucket["events"]] == ["2026-01-01/e1", "2026-01-01/e3"]
+    assert archive.index("2026-01-01")["events"] == 3
+    print("  ✅ Merge test PASSED")
+
+
+def main():
+    print("\n" + "="*60)
+    print("🧪 MedTrust AI - Log Archive Test Suite")
+    print("="*60)
+    try:
+        test_events_newest_first_with_filters()
+        test_index_prunes_partitions()
+        test_rewrite_merges_by_id()
+        print("\n✅ ALL TESTS PASSED!\n")
+        return 0
+    except Exception as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Test script for the audit log export (CSV / NDJSON across both tiers, gzip streaming)
+Runs against the in-memory Firestore in fake_firestore.py
+"""
+
+import sys
+import os
+import csv
+import gzip
+import io
+import json
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fake_firestore
+
+fake = fake_firestore.install()
+
+import log_store
+import log_export
+from encryption import encrypt_sensitive_data
+from log_archive import LogArchive
+
+
+def reset():
+    fake.reset()
+    log_store._known_days.clear()
+    log_store._legacy_state.clear()
+    log_store.log_archive = LogArchive(tempfile.mkdtemp())
+
+
+def write_events():
+    """Three hot events over two days, one archived day"""
+    for timestamp in ("2026-04-01 08:00:00", "2026-04-01 09:00:00", "2026-04-02 10:00:00"):
+        log_store.write_event(encrypt_sensitive_data({
+            "doctor_name": "Dr A", "doctor_role": "doctor", "patient_name": "alice", "action": "View",
+            "status": "Granted", "justification": f"checked at {timestamp}", "timestamp": timestamp,
+        }, ["justification"]), clinician=("doctor", "Dr A"))
+    log_store.log_archive.write_partition("2026-01-01", [
+        {"id": "2026-01-01/old", "doctor_name": "Dr B", "patient_name": "bob", "action": "View",
+         "status": "Flagged", "timestamp": "2026-01-01 07:00:00"}
+    ], [{"role": "doctor", "clinician_name": "Dr B", "date": "2026-01-01",
+         "events": [{"log_id": "2026-01-01/old", "patient_name": "bob", "timestamp": "2026-01-01 07:00:00"}]}])
+
+
+def read(chunks):
+    return b"".join(chunks)
+
+
+def test_csv_export_across_tiers():
+    print("\n📤 Testing CSV export...")
+    reset()
+    write_events()
+    rows = list(csv.DictReader(io.StringIO(read(log_export.stream_log_export("access", "csv", page_size=2)).decode())))
+    assert [row["timestamp"] for row in rows] == ["2026-04-02 10:00:00", "2026-04-01 09:00:00",
+                                                  "2026-04-01 08:00:00", "2026-01-01 07:00:00"], rows
+    assert rows[0]["justification"] == "checked at 2026-04-02 10:00:00", "Justification not decrypted"
+    assert list(rows[0]) == log_export.EXPORT_SOURCES["access"]
+
+    bounded = read(log_export.stream_log_export("access", "csv", "2026-04-01", "2026-04-01")).decode()
+    assert len(list(csv.DictReader(io.StringIO(bounded)))) == 2
+    print("  ✅ CSV test PASSED")
+
+
+def test_ndjson_clinician_export_gzipped():
+    print("\n📤 Testing gzipped NDJSON export...")
+    reset()
+    write_events()
+    data = read(log_export.stream_log_export("doctor", "ndjson", compress=True))
+    events = [json.loads(line) for line in gzip.decompress(data).decode().splitlines()]
+    assert sorted(e["doctor_name"] for e in events) == ["Dr A", "Dr A", "Dr A", "Dr B"], events
+    assert all("id" in e for e in events)
+
+    # Empty exports are still valid files
+    assert gzip.decompress(read(log_export.stream_log_export("nurse", "ndjson", compress=True))) == b""
+    header = read(log_export.stream_log_export("nurse", "csv")).decode().strip()
+    assert header.split(",") == log_export.EXPORT_SOURCES["nurse"]
+    print("  ✅ NDJSON test PASSED")
+
+
+def main():
+    print("\n" + "="*60)
+    print("🧪 MedTrust AI - Audit Log Export Test Suite")
+    print("="*60)
+    try:
+        test_csv_export_across_tiers()
+        test_ndjson_clinician_export_gzipped()
+        print("\n✅ ALL TESTS PASSED!\n")
+        return 0
+    except Exception as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+
+
+if __name__ == "__main__":
+    exit(main())
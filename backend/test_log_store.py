@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Test script for the access log store (day buckets, clinician buckets, archive and legacy fallback)
+Runs against the in-memory Firestore in fake_firestore.py
+"""
+
+import sys
+import os
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fake_firestore
+
+fake = fake_firestore.install()
+
+import log_store
+from log_archive import LogArchive
+from jobs import JobRunner, JobStore
+import admin_jobs  # registers the migration and archive jobs
+
+
+def reset():
+    fake.reset()
+    log_store._known_days.clear()
+    log_store._legacy_state.clear()
+    log_store.log_archive = LogArchive(tempfile.mkdtemp())
+
+
+def event(timestamp, patient="alice", status="Granted", doctor="Dr A"):
+    return {"doctor_name": doctor, "doctor_role": "doctor", "patient_name": patient,
+            "action": "View", "status": status, "timestamp": timestamp}
+
+
+def run_job(name):
+    runner = JobRunner(store=JobStore(os.path.join(tempfile.mkdtemp(), "jobs.sqlite3")), workers=1)
+    return runner.wait(runner.submit(name, {}, "tester"), timeout=5)
+
+
+def test_day_bucket_boundaries():
+    """Events land in the bucket of their own day; date bounds are inclusive"""
+    print("\n🗂️ Testing day bucket boundaries...")
+    reset()
+    last = log_store.write_event(event("2026-03-31 23:59:59"))
+    first = log_store.write_event(event("2026-04-01 00:00:00", status="Flagged"))
+    log_store.write_event(event("2026-04-02 12:00:00"))
+    undated = log_store.write_event({"action": "View", "status": "Granted"})
+
+    assert last.startswith("2026-03-31/") and first.startswith("2026-04-01/")
+    assert undated.startswith(log_store.UNDATED + "/")
+    assert list(log_store.log_days()) == ["2026-04-02", "2026-04-01", "2026-03-31", log_store.UNDATED]
+
+    day = [e["id"] for e in log_store.recent_events(start_date="2026-04-01", end_date="2026-04-01")]
+    assert day == [first], day
+    both = [e["id"] for e in log_store.recent_events(start_date="2026-03-31", end_date="2026-04-01")]
+    assert both == [first, last], both
+    assert [e["id"] for e in log_store.recent_events(status="Flagged")] == [first]
+    assert len(log_store.recent_events(limit=2)) == 2
+    assert log_store.log_ref(first).get().get("status") == "Flagged"
+    print("  ✅ Boundary test PASSED")
+
+
+def test_clinician_buckets():
+    print("\n🗂️ Testing clinician day buckets...")
+    reset()
+    for ts in ("2026-03-31 23:59:59", "2026-04-01 00:00:00", "2026-04-01 08:00:00"):
+        log_store.write_event(event(ts), clinician=("doctor", "Dr A"))
+    # "_" is escaped in keys, so this name cannot swallow Dr A's id range
+    log_store.write_event(event("2026-04-01 09:00:00", doctor="Dr A_2"), clinician=("doctor", "Dr A_2"))
+    log_store.write_event(event("2026-04-01 10:00:00", doctor="Nurse N"), clinician=("nurse", "Nurse N"))
+
+    mine = log_store.clinician_events("doctor", "Dr A")
+    assert [e["timestamp"] for e in mine] == ["2026-04-01 08:00:00", "2026-04-01 00:00:00", "2026-03-31 23:59:59"]
+    assert all(e["doctor_name"] == "Dr A" for e in mine)
+    assert len(log_store.clinician_events("doctor", "Dr A", "2026-04-01", "2026-04-01")) == 2
+    assert len(log_store.clinician_events("doctor", "Dr A", end_date="2026-03-31")) == 1
+
+    doctors = log_store.all_clinician_events("doctor")
+    assert len(doctors) == 4 and "nurse_name" not in doctors[0]
+    assert [e["timestamp"] for e in log_store.all_clinician_events("doctor", limit=2)] == \
+        ["2026-04-01 09:00:00", "2026-04-01 08:00:00"]
+    assert len(log_store.all_clinician_events("nurse", start_date="2026-04-02")) == 0
+    print("  ✅ Clinician bucket test PASSED")
+
+
+def test_all_clinician_events_reads_archive_only_when_short():
+    print("\n🗂️ Testing archive reads for all clinicians...")
+    reset()
+    log_store.write_event(event("2026-04-01 08:00:00"), clinician=("doctor", "Dr A"))
+    log_store.log_archive.write_partition("2026-01-01", [], [
+        {"role": "doctor", "clinician_name": "Dr Old", "date": "2026-01-01",
+         "events": [{"log_id": "2026-01-01/x", "patient_name": "bob", "timestamp": "2026-01-01 09:00:00"}]}])
+    reads = []
+    clinician_days = log_store.log_archive.clinician_days
+    log_store.log_archive.clinician_days = lambda *args: reads.append(args) or clinician_days(*args)
+
+    assert len(log_store.all_clinician_events("doctor", limit=1)) == 1
+    assert not reads, "Archive read although the hot days filled the limit"
+    events = log_store.all_clinician_events("doctor", limit=10)
+    assert [e["doctor_name"] for e in events] == ["Dr A", "Dr Old"] and reads
+    print("  ✅ Archive read test PASSED")
+
+
+def test_legacy_fallback_until_migrated():
+    """Events still in the flat legacy collections are read until their migration job completes"""
+    print("\n🗂️ Testing legacy collection fallback...")
+    reset()
+    fake.collection("access_logs").document("old1").set(event("2025-12-01 10:00:00", patient="carol"))
+    fake.collection("access_logs").document("old2").set(event("2025-12-02 10:00:00", status="Flagged"))
+    fake.collection("DoctorAccessLog").document("d1").set(event("2025-12-01 10:00:00", patient="carol"))
+    new = log_store.write_event(event("2026-04-01 08:00:00", patient="carol"), clinician=("doctor", "Dr A"))
+
+    assert [e["id"] for e in log_store.recent_events()] == [new, "old2", "old1"]
+    assert [e["id"] for e in log_store.recent_events(status="Flagged")] == ["old2"]
+    assert [e["id"] for e in log_store.recent_events(end_date="2025-12-01")] == ["old1"]
+    assert {e["id"] for e in log_store.patient_events(["carol"])} == {new, "old1"}
+    assert [e["id"] for e in log_store.clinician_events("doctor", "Dr A")] == [new, "d1"]
+    assert len(log_store.all_clinician_events("doctor")) == 2
+
+    assert run_job("backfill_clinician_logs")["status"] == "completed"
+    pages = list(log_store.iter_clinician_pages("doctor"))
+    assert sorted(e["id"] for page in pages for e in page) == sorted([new, "d1"]), "Backfilled entry listed twice"
+    assert fake.collection("log_migrations").document("DoctorAccessLog").get().exists
+
+    assert run_job("bucket_access_logs")["status"] == "completed"
+    assert not list(fake.collection("access_logs").stream())
+    ids = [e["id"] for e in log_store.recent_events()]
+    assert ids == [new, "2025-12-02/old2", "2025-12-01/old1"], ids
+    assert not log_store.legacy_pending("access_logs") and not log_store.legacy_pending("DoctorAccessLog")
+    print("  ✅ Legacy fallback test PASSED")
+
+
+def test_archive_job_counts_moved_events():
+    """A re-run over a day that is already partly archived counts only the events it moved"""
+    print("\n🗂️ Testing archive job counts...")
+    reset()
+    admin_jobs.log_archive = log_store.log_archive
+    log_store.log_archive.write_partition("2026-01-01", [
+        {"id": f"2026-01-01/old{i}", "patient_name": "bob", "timestamp": "2026-01-01 07:00:00"} for i in range(3)])
+    log_store.write_event(event("2026-01-01 08:00:00"), clinician=("doctor", "Dr A"))
+
+    runner = JobRunner(store=JobStore(os.path.join(tempfile.mkdtemp(), "jobs.sqlite3")), workers=1)
+    job_id = runner.submit("archive_access_logs", {"older_than_days": 1}, "tester")
+    assert runner.wait(job_id, timeout=5)["status"] == "completed"
+    assert runner.store.get(job_id)["checkpoint"]["archived"] == 1, runner.store.get(job_id)["checkpoint"]
+    assert len(list(log_store.log_archive.events("2026-01-01", "2026-01-01"))) == 4
+    assert not list(log_store.day_events("2026-01-01")), "Hot copy left behind"
+    print("  ✅ Archive count test PASSED")
+
+
+def main():
+    print("\n" + "="*60)
+    print("🧪 MedTrust AI - Access Log Store Test Suite")
+    print("="*60)
+    try:
+        test_day_bucket_boundaries()
+        test_clinician_buckets()
+        test_all_clinician_events_reads_archive_only_when_short()
+        test_legacy_fallback_until_migrated()
+        test_archive_job_counts_moved_events()
+        print("\n✅ ALL TESTS PASSED!\n")
+        return 0
+    except Exception as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Test script for pooled, queued OTP email delivery
+Runs against the local SMTP stand-in, no real mail is sent
+"""
+
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from dev_smtp_server import LocalSMTPServer
+from mail_dispatcher import MailDispatcher, SMTPConnectionPool
+from utils import render_otp_email
+
+
+def _dispatcher(server, workers=1):
+    pool = SMTPConnectionPool("127.0.0.1", server.port, "sender@test", "secret",
+                              size=workers, use_tls=False)
+    return MailDispatcher(pool, "sender@test", workers=workers, backoff=0.01)
+
+
+def test_connection_reused():
+    """Several messages should share one authenticated connection"""
+    print("\n📧 Testing connection reuse...")
+    server = LocalSMTPServer().start()
+    try:
+        dispatcher = _dispatcher(server)
+        for i in range(5):
+            assert dispatcher.submit(f"user{i}@test", "OTP", f"<p>{i}</p>"), "Message not queued!"
+        dispatcher.flush()
+
+        assert len(server.messages) == 5, f"Expected 5 messages, got {len(server.messages)}"
+        assert server.connections == 1, f"Opened {server.connections} connections!"
+        assert server.logins == 1, f"Logged in {server.logins} times!"
+        dispatcher.pool.close_all()
+    finally:
+        server.stop()
+    print("  ✅ Connection reuse test PASSED")
+
+
+def test_retry_after_dropped_connection():
+    """A pooled connection that died is replaced and the message still goes out"""
+    print("\n📧 Testing retry on dropped connection...")
+    server = LocalSMTPServer().start()
+    try:
+        dispatcher = _dispatcher(server)
+        dispatcher.submit("first@test", "OTP", "<p>1</p>")
+        dispatcher.flush()
+
+        # Kill the idle pooled connection behind the dispatcher's back; it still
+        # looks recently used, so the failure surfaces at send time and is retried
+        conn, last_used = dispatcher.pool._idle.get_nowait()
+        conn.sock.close()
+        dispatcher.pool._idle.put_nowait((conn, last_used))
+
+        dispatcher.submit("second@test", "OTP", "<p>2</p>")
+        dispatcher.flush()
+        assert [m["to"] for m in server.messages] == [["first@test"], ["second@test"]]
+        dispatcher.pool.close_all()
+    finally:
+        server.stop()
+    print("  ✅ Retry test PASSED")
+
+
+def test_otp_template_render():
+    print("\n📧 Testing OTP template...")
+    body = render_otp_email("123456", "<Dr. Who>")
+    assert "123456" in body
+    assert "&lt;Dr. Who&gt;" in body, "Name was not HTML-escaped!"
+    assert "{otp}" not in body and "{name}" not in body and "{year}" not in body
+    print("  ✅ Template test PASSED")
+
+
+def main():
+    print("\n" + "="*60)
+    print("🧪 MedTrust AI - Mail Dispatcher Test Suite")
+    print("="*60)
+    try:
+        test_connection_reused()
+        test_retry_after_dropped_connection()
+        test_otp_template_render()
+        print("\n✅ ALL TESTS PASSED!\n")
+        return 0
+    except Exception as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Test script for the metrics subsystem (per-thread counters, histograms, /metrics format)
+"""
+
+import sys
+import os
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Blueprint, Flask, jsonify, request
+
+import metrics
+from metrics import Counter, Histogram, Registry, init_metrics
+
+
+def test_exposition_format():
+    print("\n📈 Testing exposition format...")
+    registry = Registry()
+    hits = Counter("demo_hits_total", "Demo hits", ("route",), registry=registry)
+    latency = Histogram("demo_latency_seconds", "Demo latency", ("route",), buckets=(0.1, 1.0), registry=registry)
+    hits.inc(route="/a")
+    hits.inc(2, route='/b"quoted"')
+    latency.observe(0.05, route="/a")
+    latency.observe(0.1, route="/a")   # bucket bounds are inclusive (le)
+    latency.observe(3, route="/a")
+
+    text = registry.render()
+    assert "# TYPE demo_hits_total counter" in text
+    assert 'demo_hits_total{route="/a"} 1' in text
+    assert 'demo_hits_total{route="/b\\"quoted\\""} 2' in text
+    assert 'demo_latency_seconds_bucket{route="/a",le="0.1"} 2' in text
+    assert 'demo_latency_seconds_bucket{route="/a",le="1.0"} 2' in text
+    assert 'demo_latency_seconds_bucket{route="/a",le="+Inf"} 3' in text
+    assert 'demo_latency_seconds_count{route="/a"} 3' in text
+    assert 'demo_latency_seconds_sum{route="/a"} 3.15' in text
+
+    try:
+        Counter("demo_hits_total", "Duplicate", registry=registry)
+        assert False, "Duplicate metric name accepted!"
+    except ValueError:
+        pass
+    print("  ✅ Format test PASSED")
+
+
+def test_per_thread_shards_merge():
+    """Counts from many threads add up, including threads that have already exited"""
+    print("\n📈 Testing per-thread shards...")
+    hits = Counter("shard_hits_total", "Shard hits", ("kind",), registry=None)
+    latency = Histogram("shard_latency_seconds", "Shard latency", registry=None)
+
+    def work():
+        for _ in range(1000):
+            hits.inc(kind="x")
+            latency.observe(0.002)
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert hits.collect() == {("x",): 8000}, hits.collect()
+    assert len(hits._shards) == 0 and hits._retired == {("x",): 8000}, "Exited threads not folded"
+
+    hits.inc(kind="x")
+    assert hits.collect() == {("x",): 8001}
+    assert Histogram.summarize(latency.collect()[()])["count"] == 8000
+    print("  ✅ Shard test PASSED")
+
+
+def test_dead_shards_pruned_without_scrape():
+    """Short-lived threads must not grow the shard list unboundedly between scrapes"""
+    print("\n📈 Testing shard pruning...")
+    hits = Counter("prune_hits_total", "Prune hits", registry=None)
+    saved = metrics.SHARD_PRUNE_THRESHOLD
+    metrics.SHARD_PRUNE_THRESHOLD = 16
+    try:
+        for _ in range(100):
+            thread = threading.Thread(target=hits.inc)
+            thread.start()
+            thread.join()
+        assert len(hits._shards) <= 17, len(hits._shards)
+        assert hits.collect() == {(): 100}
+    finally:
+        metrics.SHARD_PRUNE_THRESHOLD = saved
+    print("  ✅ Pruning test PASSED")
+
+
+def test_http_metrics_and_endpoint():
+    print("\n📈 Testing per-route HTTP metrics...")
+    app = Flask(__name__)
+    init_metrics(app)
+    bp = Blueprint("demo_routes", __name__)
+
+    @bp.route("/items/<item_id>")
+    def item(item_id):
+        return jsonify({"id": item_id}), 200
+
+    @app.route("/metrics")
+    def scrape():
+        if not metrics.authorized(request.headers.get("Authorization")):
+            return jsonify({"error": "Unauthorized"}), 401
+        return metrics.registry.render(), 200, {"Content-Type": metrics.CONTENT_TYPE}
+
+    app.register_blueprint(bp)
+    client = app.test_client()
+    client.get("/items/1")
+    client.get("/items/2")
+    client.get("/nowhere")
+
+    requests_seen = metrics.HTTP_REQUESTS.collect()
+    assert requests_seen[("demo_routes", "/items/<item_id>", "GET", "200")] == 2, requests_seen
+    assert requests_seen[("app", metrics.UNMATCHED_ROUTE, "GET", "404")] >= 1
+    series = metrics.HTTP_LATENCY.collect()[("demo_routes", "/items/<item_id>", "GET")]
+    assert Histogram.summarize(series)["count"] == 2
+
+    # No token configured: the endpoint stays closed
+    assert client.get("/metrics").status_code == 401
+
+    metrics.METRICS_TOKEN = "s3cret"
+    try:
+        assert client.get("/metrics").status_code == 401
+        assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+        body = client.get("/metrics", headers={"Authorization": "Bearer s3cret"}).get_data(as_text=True)
+    finally:
+        metrics.METRICS_TOKEN = None
+    assert 'medtrust_http_requests_total{blueprint="demo_routes",route="/items/<item_id>",method="GET",status="200"} 2' in body
+    assert "# TYPE medtrust_firestore_operation_duration_seconds histogram" in body
+    print("  ✅ HTTP metrics test PASSED")
+
+
+def main():
+    print("\n" + "="*60)
+    print("🧪 MedTrust AI - Metrics Test Suite")
+    print("="*60)
+    try:
+        test_exposition_format()
+        test_per_thread_shards_merge()
+        test_dead_shards_pruned_without_scrape()
+        test_http_metrics_and_endpoint()
+        print("\n✅ ALL TESTS PASSED!\n")
+        return 0
+    except Exception as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+
+
+if __name__ == "__main__":
+    exit(main())
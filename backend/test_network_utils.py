@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Test script for client IP extraction and trusted network matching
+"""
+
+import sys
+import os
+import ipaddress
+import random
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import network_utils
+from network_utils import client_ip_from_headers, TrustedNetworkMatcher
+
+
+def test_proxy_hops():
+    """The client is N entries from the right of X-Forwarded-For"""
+    print("\n🌐 Testing proxy hops...")
+    xff = "6.6.6.6, 203.0.113.9, 10.0.0.2"
+    assert client_ip_from_headers("10.0.0.3", xff, hops=None) == "6.6.6.6", "Legacy mode changed!"
+    assert client_ip_from_headers("10.0.0.3", xff, hops=0) == "10.0.0.3"
+    assert client_ip_from_headers("10.0.0.3", xff, hops=1) == "10.0.0.2"
+    assert client_ip_from_headers("10.0.0.3", xff, hops=2) == "203.0.113.9"
+    assert client_ip_from_headers("10.0.0.3", "1.1.1.1", hops=3) == "1.1.1.1"
+    print("  ✅ Proxy hops test PASSED")
+
+
+def test_loopback_uses_cached_host_ip():
+    """Loopback peers map to the cached host address without a resolver call"""
+    print("\n🌐 Testing loopback mapping...")
+    resolver = network_utils.host_ip_resolver
+    original_ip, original_thread = resolver._ip, resolver._thread
+    lookups = []
+    original_lookup = network_utils.socket.gethostbyname
+    network_utils.socket.gethostbyname = lambda host: lookups.append(host) or "192.168.5.10"
+    try:
+        resolver._ip, resolver._thread = "192.168.5.10", object()
+        for _ in range(3):
+            assert client_ip_from_headers("127.0.0.1") == "192.168.5.10"
+        assert lookups == [], "Request path performed a DNS lookup!"
+    finally:
+        network_utils.socket.gethostbyname = original_lookup
+        resolver._ip, resolver._thread = original_ip, original_thread
+    print("  ✅ Loopback test PASSED")
+
+
+def test_matcher_agrees_with_ipaddress():
+    """Bisect lookups must match ipaddress membership over overlapping prefixes"""
+    print("\n🌐 Testing trusted network matcher...")
+    rng = random.Random(7)
+    networks = [ipaddress.ip_network(f"{ipaddress.IPv4Address(rng.getrandbits(32))}/{rng.randint(8, 28)}",
+                                     strict=False) for _ in range(300)]
+    matcher = TrustedNetworkMatcher(networks)
+    for _ in range(5000):
+        ip = str(ipaddress.IPv4Address(rng.getrandbits(32)))
+        expected = any(ipaddress.ip_address(ip) in n for n in networks)
+        assert matcher.contains(ip) == expected, f"Mismatch for {ip}"
+    print("  ✅ Matcher test PASSED")
+
+
+def test_matcher_ipv6_and_invalid():
+    print("\n🌐 Testing IPv6 and invalid input...")
+    matcher = TrustedNetworkMatcher(["192.168.5.0/24", "10.20.0.0/16", "fd00:abcd::/32"])
+    assert "192.168.5.77" in matcher and "10.20.255.1" in matcher
+    assert "192.168.6.1" not in matcher
+    assert "fd00:abcd::1" in matcher and "fd00:abce::1" not in matcher
+    assert not matcher.contains("not-an-ip") and not matcher.contains("")
+    print("  ✅ IPv6/invalid test PASSED")
+
+
+def test_matcher_reload_from_file():
+    print("\n🌐 Testing hot reload...")
+    matcher = TrustedNetworkMatcher(["192.168.5.0/24"])
+    assert not matcher.contains("172.16.3.4")
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+        f.write("# campus VPN\n172.16.0.0/12\n\n")
+        path = f.name
+    try:
+        matcher.load_file(path)
+        assert matcher.contains("172.16.3.4"), "Reloaded network not matched (stale cache?)"
+        assert matcher.contains("192.168.5.1"), "Default network lost on reload"
+        if not os.getenv("TRUSTED_NETWORKS"):
+            import config
+            assert network_utils.DEFAULT_TRUSTED_NETWORKS == [config.TRUSTED_NETWORK], "Default not taken from config.py"
+    finally:
+        os.unlink(path)
+    print("  ✅ Reload test PASSED")
+
+
+def main():
+    print("\n" + "="*60)
+    print("🧪 MedTrust AI - Network Utils Test Suite")
+    print("="*60)
+    try:
+        test_proxy_hops()
+        test_loopback_uses_cached_host_ip()
+        test_matcher_agrees_with_ipaddress()
+        test_matcher_ipv6_and_invalid()
+        test_matcher_reload_from_file()
+        print("\n✅ ALL TESTS PASSED!\n")
+        return 0
+    except Exception as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+
+
+if __name__ == "__main__":
+    exit(main())
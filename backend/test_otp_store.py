@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Test script for OTP session stores
+Checks expiry sweeping, size bounds and sharing between store instances
+"""
+
+import sys
+import os
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from otp_store import MemoryOTPStore, SQLiteOTPStore, create_otp_store
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def _record(expires, otp="123456"):
+    return {"otp": otp, "expires": expires, "email": "a@b.c", "name": "Dr A"}
+
+
+def test_memory_sweeps_expired():
+    """Expired sessions are dropped by later writes without being touched"""
+    print("\n🔐 Testing memory sweeper...")
+    clock = FakeClock()
+    store = MemoryOTPStore(clock=clock)
+    for i in range(100):
+        store.put(f"s{i}", _record(clock.now + 180))
+    clock.now += 181
+    store.put("fresh", _record(clock.now + 180))
+
+    assert len(store) == 1, f"{len(store)} sessions left after sweep!"
+    assert store.get("s0") is None
+    assert store.get("fresh")["otp"] == "123456"
+    print("  ✅ Sweeper test PASSED")
+
+
+def test_memory_resend_extends_expiry():
+    print("\n🔐 Testing resend extension...")
+    clock = FakeClock()
+    store = MemoryOTPStore(clock=clock)
+    store.put("s", _record(clock.now + 180))
+    clock.now += 170
+    store.update("s", otp="654321", expires=clock.now + 180)
+    clock.now += 20
+    store.sweep()
+    assert store.get("s")["otp"] == "654321", "Extended session was swept by its stale heap entry!"
+    print("  ✅ Resend test PASSED")
+
+
+def test_memory_max_size():
+    print("\n🔐 Testing size bound...")
+    clock = FakeClock()
+    store = MemoryOTPStore(max_size=3, clock=clock)
+    for i in range(5):
+        store.put(f"s{i}", _record(clock.now + 100 + i))
+    assert len(store) <= 3, f"Store grew to {len(store)}!"
+    assert store.get("s4") is not None, "Newest session was evicted!"
+    assert store.get("s0") is None, "Soonest-expiring session survived!"
+    print("  ✅ Size bound test PASSED")
+
+
+def test_sqlite_shared_between_workers():
+    """Two store instances on one file behave like two gunicorn workers"""
+    print("\n🔐 Testing shared SQLite store...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "otp.db")
+        worker_a = SQLiteOTPStore(path)
+        worker_b = create_otp_store(f"sqlite:///{path}")
+
+        worker_a.put("s", _record(10 ** 10))
+        assert worker_b.get("s")["otp"] == "123456", "Session not visible to other worker!"
+
+        worker_b.update("s", otp="999999", expires=10 ** 10)
+        assert worker_a.get("s")["otp"] == "999999"
+
+        assert worker_a.pop("s") is not None
+        assert worker_b.pop("s") is None, "Session verified twice!"
+    print("  ✅ Shared store test PASSED")
+
+
+def test_sqlite_sweeps_expired():
+    print("\n🔐 Testing SQLite sweep...")
+    with tempfile.TemporaryDirectory() as tmp:
+        clock = FakeClock()
+        store = SQLiteOTPStore(os.path.join(tmp, "otp.db"), max_size=2, clock=clock)
+        store.put("old", _record(clock.now + 1))
+        clock.now += 2
+        store.put("a", _record(clock.now + 10))
+        store.put("b", _record(clock.now + 20))
+        store.put("c", _record(clock.now + 30))
+        store.sweep()
+        assert "old" not in store and "a" not in store
+        assert len(store) == 2
+    print("  ✅ SQLite sweep test PASSED")
+
+
+def main():
+    print("\n" + "="*60)
+    print("🧪 MedTrust AI - OTP Store Test Suite")
+    print("="*60)
+    try:
+        test_memory_sweeps_expired()
+        test_memory_resend_extends_expiry()
+        test_memory_max_size()
+        test_sqlite_shared_between_workers()
+        test_sqlite_sweeps_expired()
+        print("\n✅ ALL TESTS PASSED!\n")
+        return 0
+    except Exception as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+
+
+if __name__ == "__main__":
+    exit(main())
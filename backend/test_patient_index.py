@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Test script for the patient secondary index (transactional upkeep, lookups, miss caching, rebuild)
+Runs against the in-memory Firestore in fake_firestore.py
+"""
+
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fake_firestore
+
+fake = fake_firestore.install()
+
+import patient_index
+
+
+def reset():
+    fake.reset()
+    patient_index.clear_cache()
+
+
+def index_docs():
+    prefix = patient_index.INDEX_COLLECTION + "/"
+    return {path[len(prefix):]: data for path, data in fake.docs.items() if path.startswith(prefix)}
+
+
+def test_patient_writes_keep_index():
+    print("\n🗂️ Testing index upkeep...")
+    reset()
+    patient_index.save_patient("p1", {"name": "Alice", "patient_id": "PT-1", "email": "a@x.org",
+                                      "doctor_assigned": "Dr. Smith"})
+    patient_index.save_patient("p2", {"name": "Bob", "doctor_assigned": "dr. smith"})
+    assert sorted(patient_index.find_patients_by_doctor("DR. SMITH")) == ["p1", "p2"]
+
+    patient_index.update_patient("p1", {"doctor_assigned": "Dr. Jones", "email": "alice@x.org"})
+    assert patient_index.find_patients_by_doctor("Dr. Smith") == ["p2"]
+    assert patient_index.find_patients_by_doctor("dr. jones") == ["p1"]
+    docs = index_docs()
+    assert "email:alice@x.org" in docs and "email:a@x.org" not in docs, docs
+
+    patient_index.delete_patient("p1")
+    docs = index_docs()
+    assert "patient_id:pt-1" not in docs and "email:alice@x.org" not in docs
+    assert patient_index.find_patients_by_doctor("Dr. Jones") == []
+    print("  ✅ Upkeep test PASSED")
+
+
+def test_misses_expire_quickly():
+    """A user created by another worker becomes visible once the short miss TTL runs out"""
+    print("\n🗂️ Testing miss caching...")
+    reset()
+    fake.collection(patient_index.INDEX_COLLECTION).document("meta:_meta").set({"built": True})
+    assert patient_index.get_user_by_name("Carol") is None
+
+    # Written behind this process's back, as another gunicorn worker would
+    fake.collection("users").document("u1").set({"name": "Carol", "role": "Nurse"})
+    fake.collection(patient_index.INDEX_COLLECTION).document("user:carol").set({"user_doc_id": "u1", "role": "nurse"})
+    assert patient_index.get_user_by_name("carol") is None, "Miss not cached at all"
+
+    saved = patient_index.INDEX_MISS_TTL
+    patient_index.INDEX_MISS_TTL = 0.05
+    try:
+        assert patient_index.find_user_by_name("Dave") is None
+        fake.collection("users").document("u2").set({"name": "Dave", "role": "Doctor"})
+        fake.collection(patient_index.INDEX_COLLECTION).document("user:dave").set({"user_doc_id": "u2", "role": "doctor"})
+        time.sleep(0.1)
+        assert patient_index.get_user_by_name("Dave")["name"] == "Dave", "Miss cached past INDEX_MISS_TTL"
+    finally:
+        patient_index.INDEX_MISS_TTL = saved
+    print("  ✅ Miss caching test PASSED")
+
+
+def test_rebuild_groups_and_prunes():
+    """Doctor names differing only in case share one entry; entries nothing points at are deleted"""
+    print("\n🗂️ Testing index rebuild...")
+    reset()
+    fake.collection("patients").document("p1").set({"name": "Alice", "patient_id": "PT-1", "doctor_assigned": "Dr. Smith"})
+    fake.collection("patients").document("p2").set({"name": "Bob", "doctor_assigned": "dr. smith"})
+    fake.collection("patients").document("p3").set({"name": "Eve", "doctor_assigned": "—"})
+    fake.collection("users").document("u1").set({"name": "Dr. Smith", "role": "Doctor"})
+    stale = fake.collection(patient_index.INDEX_COLLECTION)
+    stale.document("email:gone@x.org").set({"patient_doc_id": "p9"})
+    stale.document("doctor:dr.%20who").set({"doctor_name": "Dr. Who", "patient_doc_ids": ["p9"]})
+
+    assert patient_index.rebuild() == 3
+    docs = index_docs()
+    assert set(docs) == {"patient_id:pt-1", "doctor:dr.%20smith", "user:dr.%20smith", "meta:_meta"}, docs
+    assert sorted(docs["doctor:dr.%20smith"]["patient_doc_ids"]) == ["p1", "p2"]
+    assert patient_index.index_ready()
+    assert patient_index.find_user_by_name("dr. smith") == ("u1", "doctor")
+    print("  ✅ Rebuild test PASSED")
+
+
+def main():
+    print("\n" + "="*60)
+    print("🧪 MedTrust AI - Patient Index Test Suite")
+    print("="*60)
+    try:
+        test_patient_writes_keep_index()
+        test_misses_expire_quickly()
+        test_rebuild_groups_and_prunes()
+        print("\n✅ ALL TESTS PASSED!\n")
+        return 0
+    except Exception as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Test script for patient access timelines (appends, page rollover, paging, backfill)
+Runs against the in-memory Firestore in fake_firestore.py
+"""
+
+import sys
+import os
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fake_firestore
+
+fake = fake_firestore.install()
+
+import log_store
+import patient_timeline
+from log_archive import LogArchive
+
+PAGE_SIZE = 3
+
+
+def reset():
+    fake.reset()
+    log_store._known_days.clear()
+    log_store._legacy_state.clear()
+    log_store.log_archive = LogArchive(tempfile.mkdtemp())
+    patient_timeline._patient_ids.clear()
+    patient_timeline.TIMELINE_PAGE_SIZE = PAGE_SIZE
+    fake.collection("patients").document("alice").set({"name": "Alice", "patient_id": "PT-A"})
+    fake.collection("patients").document("bob").set({"name": "Bob"})   # no patient_id yet
+
+
+def access(patient, timestamp, action="View"):
+    return log_store.write_event({"doctor_name": "Dr A", "doctor_role": "doctor", "patient_name": patient,
+                                  "action": action, "status": "Granted", "timestamp": timestamp})
+
+
+def pages(patient_id):
+    prefix = f"{patient_timeline.TIMELINE_COLLECTION}/{patient_id}/{patient_timeline.PAGE_COLLECTION}/"
+    return sorted(path[len(prefix):] for path in fake.docs if path.startswith(prefix))
+
+
+def test_append_and_head_rollover():
+    """A full page rolls the head over to the next one; no page ever holds more than TIMELINE_PAGE_SIZE"""
+    print("\n🕓 Testing timeline appends...")
+    reset()
+    ids = [access("Alice" if i % 2 else "alice", f"2026-04-01 08:0{i}:00", f"a{i}") for i in range(PAGE_SIZE + 1)]
+    access("bob", "2026-04-01 09:00:00")
+    access("N/A", "2026-04-01 09:30:00")
+
+    assert pages("PT-A") == ["1-000000", "1-000001"], pages("PT-A")
+    head = fake.collection("patient_timelines").document("PT-A").get().to_dict()
+    assert head["live_page"] == 1 and head["live_count"] == 1 and head["since"] == "2026-04-01 08:00:00"
+    first = fake.docs["patient_timelines/PT-A/pages/1-000000"]["events"]
+    assert len(first) == PAGE_SIZE and [e["log_id"] for e in first] == ids[:PAGE_SIZE]
+    # bob has no patient_id and "N/A" names nobody: neither gets a timeline
+    assert {p.split("/")[1] for p in fake.docs if p.startswith("patient_timelines/")} == {"PT-A"}
+    print("  ✅ Rollover test PASSED")
+
+
+def test_timeline_paging():
+    print("\n🕓 Testing timeline paging...")
+    reset()
+    for i in range(PAGE_SIZE * 2 + 1):
+        access("alice", f"2026-04-01 08:{i:02d}:00", f"a{i}")
+
+    events, cursor = patient_timeline.timeline("PT-A", page_count=1)
+    assert [e["action"] for e in events] == ["a6"] and cursor
+    events, cursor = patient_timeline.timeline("PT-A", cursor, page_count=1)
+    assert [e["action"] for e in events] == ["a5", "a4", "a3"] and cursor
+    events, cursor = patient_timeline.timeline("PT-A", cursor, page_count=2)
+    assert [e["action"] for e in events] == ["a2", "a1", "a0"] and cursor is None
+    assert "log_id" not in events[0] and events[0]["id"]
+    assert patient_timeline.timeline("PT-NONE") == ([], None)
+    print("  ✅ Paging test PASSED")
+
+
+def test_backfill_sorts_before_live():
+    """Backfilled days go to the 0- series, skip events already live, and apply once"""
+    print("\n🕓 Testing timeline backfill...")
+    reset()
+    live = access("alice", "2026-04-01 12:00:00", "live")
+    old = [patient_timeline.timeline_entry(f"2026-03-01/o{i}", {"patient_name": "alice", "action": f"old{i}",
+                                                                "timestamp": f"2026-03-01 0{i}:00:00"})
+           for i in range(PAGE_SIZE + 1)]
+    late = patient_timeline.timeline_entry(live, {"action": "live", "timestamp": "2026-04-01 12:00:00"})
+
+    assert patient_timeline.backfill_day("PT-A", "2026-03-01", old) == PAGE_SIZE + 1
+    assert patient_timeline.backfill_day("PT-A", "2026-03-01", old) == 0, "Backfill applied twice"
+    assert patient_timeline.backfill_day("PT-A", "2026-04-01", [late]) == 0, "Live event backfilled"
+    assert pages("PT-A") == ["0-000000", "0-000001", "1-000000"]
+
+    events, cursor = patient_timeline.timeline("PT-A", page_count=5)
+    assert [e["action"] for e in events] == ["live", "old3", "old2", "old1", "old0"] and cursor is None
+    print("  ✅ Backfill test PASSED")
+
+
+def main():
+    print("\n" + "="*60)
+    print("🧪 MedTrust AI - Patient Timeline Test Suite")
+    print("="*60)
+    try:
+        test_append_and_head_rollover()
+        test_timeline_paging()
+        test_backfill_sorts_before_live()
+        print("\n✅ ALL TESTS PASSED!\n")
+        return 0
+    except Exception as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Test script for the content-addressed PDF report cache
+"""
+
+import sys
+import os
+import tempfile
+import shutil
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from pdf_cache import PDFCache, report_key
+
+
+def test_report_key_tracks_content():
+    print("\n🗂️ Testing report keys...")
+    patient = {"name": "Jane", "diagnosis": "gAAAA-encrypted", "notes": ""}
+    key = report_key(patient, "1", "2024-01-02")
+    assert key == report_key(dict(patient), "1", "2024-01-02"), "Key is not deterministic!"
+    assert key != report_key(dict(patient, diagnosis="gAAAA-other"), "1", "2024-01-02")
+    assert key != report_key(patient, "2", "2024-01-02"), "Template version ignored!"
+    assert key != report_key(patient, "1", "2024-01-03"), "Report date ignored!"
+    assert key == report_key(dict(patient, trust_score=10), "1", "2024-01-02"), "Unrelated field changed key"
+    print("  ✅ Report key test PASSED")
+
+
+def test_memory_lru_budget():
+    print("\n🗂️ Testing in-memory LRU budget...")
+    cache = PDFCache(max_bytes=300)
+    for key in ("a", "b", "c"):
+        cache.put(key, key.encode() * 100)
+    assert cache.get("a").read() == b"a" * 100
+    cache.put("d", b"d" * 100)  # evicts "b", the least recently used
+    assert "b" not in cache and "a" in cache and "d" in cache
+    assert cache.size == 300
+    cache.put("huge", b"x" * 301)
+    assert "huge" not in cache, "Oversized report was cached"
+    print("  ✅ Memory LRU test PASSED")
+
+
+def test_disk_cache_survives_restart():
+    print("\n🗂️ Testing disk cache...")
+    directory = tempfile.mkdtemp()
+    try:
+        cache = PDFCache(max_bytes=250, directory=directory)
+        cache.put("a", b"%PDF-a" + b"a" * 94)
+        cache.put("b", b"%PDF-b" + b"b" * 94)
+        with cache.get("b") as f:
+            assert f.read().startswith(b"%PDF-b")
+
+        reopened = PDFCache(max_bytes=250, directory=directory)
+        assert len(reopened) == 2 and reopened.size == 200
+        reopened.put("c", b"c" * 100)
+        assert sorted(os.listdir(directory)) == ["b.pdf", "c.pdf"], "LRU file not evicted"
+        assert reopened.get("a") is None and reopened.misses == 1
+    finally:
+        shutil.rmtree(directory)
+    print("  ✅ Disk cache test PASSED")
+
+
+def test_disk_cache_shared_between_workers():
+    """Two caches on one directory see each other's reports and share one byte budget"""
+    print("\n🗂️ Testing shared disk cache...")
+    directory = tempfile.mkdtemp()
+    try:
+        worker_a = PDFCache(max_bytes=250, directory=directory)
+        worker_b = PDFCache(max_bytes=250, directory=directory)
+        worker_a.put("a", b"a" * 100)
+        with worker_b.get("a") as f:
+            assert f.read() == b"a" * 100, "Report rendered by another worker was a miss"
+        assert worker_b.hits == 1 and worker_b.misses == 0
+
+        worker_b.put("b", b"b" * 100)
+        worker_a.put("c", b"c" * 100)
+        total = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+        assert total <= 250 and sorted(os.listdir(directory)) == ["b.pdf", "c.pdf"], os.listdir(directory)
+        assert worker_b.get("a") is None, "Evicted report still served"
+
+        # A failed write leaves no temp file behind
+        original = os.replace
+        os.replace = lambda *args: (_ for _ in ()).throw(OSError("disk full"))
+        try:
+            worker_a.put("d", b"d" * 10)
+            assert False, "Write error swallowed"
+        except OSError:
+            pass
+        finally:
+            os.replace = original
+        assert not [name for name in os.listdir(directory) if name.endswith(".tmp")], "Temp file leaked"
+    finally:
+        shutil.rmtree(directory)
+    print("  ✅ Shared disk cache test PASSED")
+
+
+def main():
+    print("\n" + "="*60)
+    print("🧪 MedTrust AI - PDF Cache Test Suite")
+    print("="*60)
+    try:
+        test_report_key_tracks_content()
+        test_memory_lru_budget()
+        test_disk_cache_survives_restart()
+        test_disk_cache_shared_between_workers()
+        print("\n✅ ALL TESTS PASSED!\n")
+        return 0
+    except Exception as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+
+
+if __name__ == "__main__":
+    exit(main())
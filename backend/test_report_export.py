@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Test script for the bulk report export (process pool + streamed ZIP)
+"""
+
+import sys
+import os
+import io
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from encryption import encrypt_sensitive_data
+from report_export import create_export_job, get_export_job, stream_reports_zip
+
+
+def make_patients(n):
+    for i in range(n):
+        yield encrypt_sensitive_data({
+            "name": f"Patient {i % 7}",   # repeated names must not collide in the archive
+            "age": 30 + i, "gender": "F", "email": f"p{i}@example.com",
+            "diagnosis": f"Diagnosis {i}", "treatment": "Rest", "notes": "",
+        }, ["diagnosis", "treatment", "notes"])
+
+
+def test_streamed_zip_is_valid():
+    print("\n📦 Testing streamed export archive...")
+    job = create_export_job("tester", "unit test")
+    with ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context("spawn")) as pool:
+        chunks = list(stream_reports_zip(job, make_patients(12), total=12, pool=pool))
+    assert len(chunks) >= 12, "Archive was not streamed per report"
+    archive = zipfile.ZipFile(io.BytesIO(b"".join(chunks)))
+    assert archive.testzip() is None, "Corrupt archive!"
+    names = archive.namelist()
+    assert len(names) == 12 and len(set(names)) == 12, names
+    assert all(archive.read(n).startswith(b"%PDF") for n in names)
+    status = get_export_job(job.id).to_dict()
+    assert status["status"] == "completed" and status["done"] == 12 and status["failed"] == 0, status
+    assert status["bytes_sent"] == sum(map(len, chunks))
+    print("  ✅ Streamed archive test PASSED")
+
+
+def test_client_disconnect_cancels():
+    print("\n📦 Testing client disconnect...")
+    job = create_export_job("tester", "disconnect")
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        stream = stream_reports_zip(job, make_patients(50), pool=pool)
+        next(stream)
+        stream.close()
+    assert job.status == "cancelled" and job.done < 50, job.to_dict()
+    print("  ✅ Disconnect test PASSED")
+
+
+def main():
+    print("\n" + "="*60)
+    print("🧪 MedTrust AI - Report Export Test Suite")
+    print("="*60)
+    try:
+        test_streamed_zip_is_valid()
+        test_client_disconnect_cancels()
+        print("\n✅ ALL TESTS PASSED!\n")
+        return 0
+    except Exception as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Test script for the response cache (per-caller entries, ETags, invalidation)
+Run this to check conditional GETs without Firebase credentials
+"""
+
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask, jsonify
+
+import response_cache
+from response_cache import cached_response, invalidate
+
+
+def new_app():
+    """App whose views count how often they actually run"""
+    app = Flask(__name__)
+    calls = {"items": 0, "user": 0}
+    data = {"items": ["a"]}
+
+    @app.route("/items")
+    @cached_response(ttl=60, tags=("items",))
+    def items():
+        calls["items"] += 1
+        return jsonify({"items": data["items"]}), 200
+
+    @app.route("/user/<name>")
+    @cached_response(ttl=60, tags=lambda name: [f"user:{name}"])
+    def user(name):
+        calls["user"] += 1
+        if name == "missing":
+            return jsonify({"error": "not found"}), 404
+        return jsonify({"name": name}), 200
+
+    response_cache.response_cache.clear()
+    return app.test_client(), calls, data
+
+
+def test_hit_and_conditional_get():
+    print("\n🗃️ Testing cache hits and 304s...")
+    client, calls, _ = new_app()
+    first = client.get("/items", headers={"Authorization": "Bearer a"})
+    assert first.status_code == 200 and first.headers.get("ETag"), first.headers
+    again = client.get("/items", headers={"Authorization": "Bearer a"})
+    assert again.get_data() == first.get_data() and calls["items"] == 1, calls
+
+    etag = first.headers["ETag"]
+    unchanged = client.get("/items", headers={"Authorization": "Bearer a", "If-None-Match": etag})
+    assert unchanged.status_code == 304 and unchanged.get_data() == b"", unchanged.status_code
+    assert unchanged.headers["ETag"] == etag
+    print("  ✅ Hit / 304 test PASSED")
+
+
+def test_entries_are_per_caller():
+    """One caller's cached response is never served to another"""
+    print("\n🗃️ Testing per-caller keys...")
+    client, calls, _ = new_app()
+    client.get("/items", headers={"Authorization": "Bearer a"})
+    client.get("/items", headers={"Authorization": "Bearer b"})
+    client.get("/items")
+    assert calls["items"] == 3, calls
+    print("  ✅ Per-caller test PASSED")
+
+
+def test_invalidation_changes_etag():
+    print("\n🗃️ Testing tag invalidation...")
+    client, calls, data = new_app()
+    etag = client.get("/items").headers["ETag"]
+    data["items"] = ["a", "b"]
+    assert client.get("/items", headers={"If-None-Match": etag}).status_code == 304  # still cached
+
+    invalidate("items")
+    fresh = client.get("/items", headers={"If-None-Match": etag})
+    assert fresh.status_code == 200 and fresh.get_json()["items"] == ["a", "b"], fresh.get_json()
+    assert fresh.headers["ETag"] != etag and calls["items"] == 2
+
+    client.get("/user/ann")
+    invalidate("user:bob")
+    client.get("/user/ann")
+    assert calls["user"] == 1, "Unrelated tag invalidated the entry!"
+    print("  ✅ Invalidation test PASSED")
+
+
+def test_errors_and_ttl_not_cached():
+    print("\n🗃️ Testing error responses and expiry...")
+    client, calls, _ = new_app()
+    assert client.get("/user/missing").status_code == 404
+    assert client.get("/user/missing").status_code == 404
+    assert calls["user"] == 2, "Error response was cached!"
+
+    clock = [0.0]
+    response_cache.response_cache = response_cache.ResponseCache(clock=lambda: clock[0])
+    try:
+        client.get("/user/ann")
+        clock[0] += 61
+        client.get("/user/ann")
+        assert calls["user"] == 4, calls
+    finally:
+        response_cache.response_cache = response_cache.ResponseCache()
+    print("  ✅ Error / TTL test PASSED")
+
+
+def main():
+    print("\n" + "="*60)
+    print("🧪 MedTrust AI - Response Cache Test Suite")
+    print("="*60)
+    try:
+        test_hit_and_conditional_get()
+        test_entries_are_per_caller()
+        test_invalidation_changes_etag()
+        test_errors_and_ttl_not_cached()
+        print("\n✅ ALL TESTS PASSED!\n")
+        return 0
+    except Exception as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+
+
+if __name__ == "__main__":
+    exit(main())
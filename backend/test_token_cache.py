@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Test script for the verified-token cache
+Run this to check token caching and cert prefetching without Firebase credentials
+"""
+
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import token_cache
+from token_cache import TokenCache, CertPrefetcher
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class FakeResponse:
+    def __init__(self, status=200, data=b"{}"):
+        self.status = status
+        self.data = data
+        self.headers = {}
+
+
+def test_expiry_bounded_by_token_exp():
+    """Cached claims must not outlive the token's own exp"""
+    print("\n🔑 Testing expiry bounded by exp...")
+    clock = FakeClock()
+    cache = TokenCache(max_ttl=3600, skew=0, clock=clock)
+    cache.put("tok", {"email": "admin@ehr.com", "exp": clock.now + 60})
+
+    assert cache.get("tok")["email"] == "admin@ehr.com", "Fresh token not cached!"
+    clock.now += 61
+    assert cache.get("tok") is None, "Expired token still served!"
+    print("  ✅ Expiry test PASSED")
+
+
+def test_already_expired_not_cached():
+    print("\n🔑 Testing already-expired claims...")
+    clock = FakeClock()
+    cache = TokenCache(skew=30, clock=clock)
+    cache.put("tok", {"exp": clock.now + 10})
+    assert cache.get("tok") is None, "Token inside skew window was cached!"
+    print("  ✅ Already-expired test PASSED")
+
+
+def test_lru_bound():
+    print("\n🔑 Testing LRU bound...")
+    cache = TokenCache(max_entries=2, clock=FakeClock())
+    cache.put("a", {})
+    cache.put("b", {})
+    cache.get("a")
+    cache.put("c", {})
+    assert cache.get("b") is None, "Least recently used entry not evicted!"
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert len(cache) == 2
+    print("  ✅ LRU test PASSED")
+
+
+def test_verify_only_once():
+    print("\n🔑 Testing verify_id_token_cached...")
+    calls = []
+
+    def fake_verify(token):
+        calls.append(token)
+        return {"email": "admin@ehr.com", "exp": 2 ** 40}
+
+    original = token_cache.auth.verify_id_token
+    token_cache.auth.verify_id_token = fake_verify
+    token_cache.token_cache.clear()
+    try:
+        for _ in range(5):
+            claims = token_cache.verify_id_token_cached("same-token")
+        assert claims["email"] == "admin@ehr.com"
+        assert len(calls) == 1, f"Token verified {len(calls)} times!"
+    finally:
+        token_cache.auth.verify_id_token = original
+        token_cache.token_cache.clear()
+    print("  ✅ Verify-once test PASSED")
+
+
+def test_cert_prefetcher_serves_from_memory():
+    print("\n🔑 Testing cert prefetcher...")
+    fetched = []
+
+    def delegate(url, method="GET", body=None, headers=None, timeout=None, **kwargs):
+        fetched.append(url)
+        return FakeResponse()
+
+    prefetcher = CertPrefetcher(delegate, ["https://certs"])
+    prefetcher.refresh()
+    assert fetched == ["https://certs"]
+
+    for _ in range(3):
+        assert prefetcher("https://certs").status == 200
+    assert len(fetched) == 1, "Cert request went to the network after prefetch!"
+
+    prefetcher("https://other")
+    assert fetched[-1] == "https://other", "Non-cert URLs must pass through"
+    print("  ✅ Cert prefetcher test PASSED")
+
+
+def main():
+    print("\n" + "="*60)
+    print("🧪 MedTrust AI - Token Cache Test Suite")
+    print("="*60)
+    try:
+        test_expiry_bounded_by_token_exp()
+        test_already_expired_not_cached()
+        test_lru_bound()
+        test_verify_only_once()
+        test_cert_prefetcher_serves_from_memory()
+        print("\n✅ ALL TESTS PASSED!\n")
+        return 0
+    except Exception as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,185 @@
+"""
+Token verification cache for MedTrust AI
+Caches verified Firebase ID token claims and keeps Google's signing certs warm
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from firebase_admin import auth
+
+# ---------- CONFIGURATION ----------
+TOKEN_CACHE_MAX_ENTRIES = 1024
+TOKEN_CACHE_MAX_TTL = 3600          # seconds, never cache longer than a Firebase ID token lives
+TOKEN_EXPIRY_SKEW = 30              # seconds, drop cached claims slightly before the token's own exp
+CERT_REFRESH_INTERVAL = 3600        # seconds between background cert refreshes
+
+
+class TokenCache:
+    """Bounded LRU cache of verified token claims, keyed by a hash of the token"""
+
+    def __init__(self, max_entries=TOKEN_CACHE_MAX_ENTRIES, max_ttl=TOKEN_CACHE_MAX_TTL,
+                 skew=TOKEN_EXPIRY_SKEW, clock=time.time):
+        self.max_entries = max_entries
+        self.max_ttl = max_ttl
+        self.skew = skew
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token):
+        # Never keep raw bearer tokens in memory longer than the request needs them
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token):
+        """
+        Return cached claims for a token
+
+        Args:
+            token: Raw Firebase ID token
+
+        Returns:
+            Claims dict, or None if the token is not cached or has expired
+        """
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            claims, expires_at = entry
+            if self._clock() >= expires_at:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return dict(claims)
+
+    def put(self, token, claims):
+        """
+        Cache verified claims until the token's own expiry (bounded by max_ttl)
+
+        Args:
+            token: Raw Firebase ID token
+            claims: Claims dict returned by auth.verify_id_token
+        """
+        now = self._clock()
+        expires_at = now + self.max_ttl
+        exp = claims.get("exp")
+        if exp:
+            expires_at = min(expires_at, float(exp) - self.skew)
+        if expires_at <= now:
+            return
+
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (dict(claims), expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class CertPrefetcher:
+    """
+    google-auth transport wrapper that serves Google's public signing certs from memory.
+    Certs are refreshed by a background thread so token verification never blocks on a fetch.
+    """
+
+    def __init__(self, delegate, cert_urls, refresh_interval=CERT_REFRESH_INTERVAL):
+        self._delegate = delegate
+        self._cert_urls = set(cert_urls)
+        self.refresh_interval = refresh_interval
+        self._responses = {}
+        self._thread = None
+        self._stop = threading.Event()
+
+    def __call__(self, url, method="GET", body=None, headers=None, timeout=None, **kwargs):
+        if method == "GET" and url in self._cert_urls:
+            response = self._responses.get(url)
+            if response is not None:
+                return response
+            # Cold start: fetch inline once, later calls are served from memory
+            return self._fetch(url)
+        return self._delegate(url, method=method, body=body, headers=headers, timeout=timeout, **kwargs)
+
+    def _fetch(self, url):
+        response = self._delegate(url, method="GET")
+        if response.status == 200:
+            # Touch the body so the cached response never reads from a closed connection
+            _ = response.data
+            self._responses[url] = response
+        return response
+
+    def refresh(self):
+        """Fetch every cert URL now, keeping the previous certs if a fetch fails"""
+        for url in self._cert_urls:
+            try:
+                self._fetch(url)
+            except Exception as e:
+                print(f"⚠️ Cert prefetch failed for {url}: {e}")
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.refresh()
+            self._stop.wait(self.refresh_interval)
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="cert-prefetcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+
+# Global token cache shared by the admin decorator and admin login
+token_cache = TokenCache()
+
+
+def verify_id_token_cached(token):
+    """
+    Verify a Firebase ID token, reusing previously verified claims when possible
+
+    Args:
+        token: Raw Firebase ID token (without the "Bearer " prefix)
+
+    Returns:
+        Verified claims dict
+
+    Raises:
+        Whatever auth.verify_id_token raises for invalid or expired tokens
+    """
+    claims = token_cache.get(token)
+    if claims is not None:
+        return claims
+    claims = auth.verify_id_token(token)
+    token_cache.put(token, claims)
+    return claims
+
+
+def start_cert_prefetcher(app=None, refresh_interval=CERT_REFRESH_INTERVAL):
+    """
+    Install a CertPrefetcher on the Firebase token verifier and start its refresh thread.
+    Safe to call more than once.
+    """
+    from firebase_admin import _token_gen
+
+    verifier = auth._get_client(app)._token_verifier
+    if isinstance(verifier.request, CertPrefetcher):
+        return verifier.request
+
+    prefetcher = CertPrefetcher(verifier.request, [_token_gen.ID_TOKEN_CERT_URI], refresh_interval)
+    verifier.request = prefetcher
+    prefetcher.start()
+    print("🔑 Google cert prefetcher started")
+    return prefetcher
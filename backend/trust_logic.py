@@ -2,6 +2,8 @@
 from firebase_init import db, firebase_admin_initialized
 from google.cloud.firestore import FieldFilter
 from datetime import datetime
+import log_store
+import response_cache
 
 def get_trust_score(name):
     if not firebase_admin_initialized or db is None:
@@ -29,23 +31,24 @@ def update_trust_score(name, delta):
                 "trust_score": new_score,
                 "last_update": datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
             })
+            response_cache.invalidate("users", f"trust:{name}")
             print(f"🔁 Trust score updated: {name} {current} → {new_score}")
             return new_score
     except Exception as e:
         print("update_trust_score error:", e)
     return None
 
-def safe_log_access(log_data):
+def safe_log_access(log_data, clinician=None, flag_priority=None):
     """
     Attempts to log access to Firestore with a short timeout.
     Swallows errors to prevent non-critical logging from blocking the app.
+    Pass clinician=(role, name) to also add the event to that doctor's or
+    nurse's history, and flag_priority to queue a flagged event for review
+    (see log_store).
     """
     if not firebase_admin_initialized or db is None:
         return
     try:
-        # Note: timeout argument might differ based on library version, 
-        # but standard python firestore client uses timeout in calls if supported.
-        # If timeout causes issues, remove it.
-        db.collection("access_logs").add(log_data, timeout=5)
+        log_store.write_event(log_data, clinician, flag_priority=flag_priority)
     except Exception as e:
         print(f"⚠️ Logging failed (non-fatal): {e}")
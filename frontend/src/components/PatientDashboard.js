@@ -17,6 +17,16 @@ import {
   FaSync,
 } from "react-icons/fa";
 
+const normalizeLog = (log) => ({
+  doctor: log.doctor_name || log.user || "Unknown User",
+  role: log.doctor_role || "Doctor",
+  accessType: log.action || "Data Access",
+  justification: log.justification || "Routine Checkup",
+  status: log.status || "Pending",
+  timestamp: log.timestamp || "—",
+  source: log.source || "system"
+});
+
 const PatientDashboard = ({ user, onBack }) => {
   const navigate = useNavigate();
 
@@ -24,6 +34,9 @@ const PatientDashboard = ({ user, onBack }) => {
   const [logs, setLogs] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
+  // Older history is paged: the endpoint returns the newest entries plus a cursor for the rest
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   const fetchLogs = useCallback(async () => {
     if (!user?.name) return;
@@ -35,21 +48,9 @@ const PatientDashboard = ({ user, onBack }) => {
         `${API_URL}/patient_access_history/${user.name}`
       );
       if (res.data.success) {
-        // Sort specifically by timestamp if not already sorted
-        const sortedLogs = (res.data.logs || []).sort((a, b) => 
-            new Date(b.timestamp) - new Date(a.timestamp)
-        );
-
-        const normalizedLogs = sortedLogs.map((log) => ({
-          doctor: log.doctor_name || log.user || "Unknown User",
-          role: log.doctor_role || "Doctor",
-          accessType: log.action || "Data Access",
-          justification: log.justification || "Routine Checkup",
-          status: log.status || "Pending",
-          timestamp: log.timestamp || "—",
-          source: log.source || "system"
-        }));
-        setLogs(normalizedLogs);
+        // Already newest first (patient timeline order)
+        setLogs((res.data.logs || []).map(normalizeLog));
+        setNextCursor(res.data.next_cursor || null);
       }
     } catch (error) {
       console.error("Error fetching access logs:", error);
@@ -59,6 +60,26 @@ const PatientDashboard = ({ user, onBack }) => {
     }
   }, [user?.name]);
 
+  const loadMore = async () => {
+    if (!nextCursor || loadingMore) return;
+    try {
+      setLoadingMore(true);
+      const res = await axios.get(
+        `${API_URL}/patient_access_history/${user.name}`,
+        { params: { cursor: nextCursor } }
+      );
+      if (res.data.success) {
+        setLogs((prev) => [...prev, ...(res.data.logs || []).map(normalizeLog)]);
+        setNextCursor(res.data.next_cursor || null);
+      }
+    } catch (error) {
+      console.error("Error fetching older access logs:", error);
+      setError("Failed to load older access history. Please check your connection.");
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   useEffect(() => {
     if (user?.name) {
       fetchLogs();
@@ -129,7 +150,7 @@ const PatientDashboard = ({ user, onBack }) => {
           </div>
           <div className="stat-content">
             <span className="stat-label">Total Access Records</span>
-            <span className="stat-value">{logs.length}</span>
+            <span className="stat-value">{logs.length}{nextCursor ? "+" : ""}</span>
           </div>
         </div>
         <div className="stat-item">
@@ -286,6 +307,17 @@ const PatientDashboard = ({ user, onBack }) => {
             )}
           </div>
         )}
+
+        {!loading && !error && nextCursor && (
+          <button
+            className="fallback-btn"
+            style={{ display: "block", margin: "20px auto" }}
+            onClick={loadMore}
+            disabled={loadingMore}
+          >
+            {loadingMore ? "Loading..." : "Load older records"}
+          </button>
+        )}
       </section>
 
       {/* ✅ Footer Info */}